@@ -0,0 +1,104 @@
+import math
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+class Overloaded(Exception):
+    """A chat was turned away; the route answers 503 with `retry_after` in the Retry-After header."""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+class AdmissionControl:
+    """Per-process cap on concurrent chats, with a bounded wait queue in front of it.
+
+    Up to `max_active` chats run at once; each keeps its slot for all of its LLM calls. Up to
+    `max_queued` more wait at most `queue_timeout` seconds for a slot. Beyond that, on a timed-out
+    wait, or once `drain` has started, `acquire` raises Overloaded. Retry-After is estimated from
+    recent chat durations and the queue length.
+    """
+
+    def __init__(self, max_active=8, max_queued=32, queue_timeout=10.0):
+        self.max_active = max_active
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.condition = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+        self.draining = False
+        self.average_seconds = 5.0
+        self.stats = Counter()
+
+    def retry_after(self):
+        backlog = (self.waiting + 1) / max(self.max_active, 1)
+        return max(1, min(60, math.ceil(self.average_seconds * backlog)))
+
+    def _reject(self, reason, stat):
+        self.stats[stat] += 1
+        raise Overloaded(reason, self.retry_after())
+
+    def acquire(self):
+        """Takes a slot, waiting in the queue if needed; returns the start time to pass to release()."""
+        with self.condition:
+            if self.draining:
+                self._reject("server is shutting down", "rejected_draining")
+            if self.active >= self.max_active:
+                if self.waiting >= self.max_queued:
+                    self._reject("too many chats in progress", "rejected_full")
+                self.waiting += 1
+                deadline = time.monotonic() + self.queue_timeout
+                try:
+                    while self.active >= self.max_active and not self.draining:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._reject("timed out waiting for a free slot", "rejected_timeout")
+                        self.condition.wait(remaining)
+                    if self.draining:
+                        self._reject("server is shutting down", "rejected_draining")
+                finally:
+                    self.waiting -= 1
+            self.active += 1
+            self.stats["admitted"] += 1
+        return time.monotonic()
+
+    def release(self, started):
+        with self.condition:
+            self.active -= 1
+            # Moving average of chat duration, for Retry-After
+            self.average_seconds = 0.9 * self.average_seconds + 0.1 * (time.monotonic() - started)
+            self.condition.notify_all()
+
+    @contextmanager
+    def slot(self):
+        started = self.acquire()
+        try:
+            yield
+        finally:
+            self.release(started)
+
+    def stop_admitting(self):
+        """Turns away new chats and those still queued; chats already running keep their slots."""
+        with self.condition:
+            self.draining = True
+            self.condition.notify_all()
+
+    def drain(self, timeout=30.0):
+        """Stops admitting chats (queued ones are turned away too) and waits up to `timeout` seconds
+        for those in flight. Returns True when none are left."""
+        self.stop_admitting()
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while self.active:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+        return True
+
+    def snapshot(self):
+        with self.condition:
+            return {"active": self.active, "waiting": self.waiting, "max_active": self.max_active,
+                    "max_queued": self.max_queued, "draining": self.draining, **self.stats}
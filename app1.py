@@ -1,53 +1,93 @@
 import uuid
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+import base64
+import hmac
+from langchain_core.messages import HumanMessage, AIMessage, AIMessageChunk, SystemMessage, ToolMessage
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 import os
-import fitz
-import pickle
 import traceback
-from google.auth.transport.requests import Request
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from langchain_community.tools import tool
+from langchain_core.tools import tool
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_groq import ChatGroq
-from langchain_community.tools.tavily_search import TavilySearchResults
-from typing import Annotated, Dict, List
+from typing import Annotated, Dict, List, Optional
 from typing_extensions import TypedDict
 from langgraph.graph.message import AnyMessage, add_messages
-from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import END, StateGraph, START
-from langgraph.prebuilt import tools_condition, ToolNode
+from langgraph.prebuilt import tools_condition
 import json
 import pytz
 import sqlite3
-from flask import Flask, jsonify, request, send_from_directory, render_template
+import time as time_module
+from flask import Flask, Response, jsonify, request, send_from_directory, render_template, stream_with_context
 from langchain_core.runnables import RunnableConfig
+from knowledge import KnowledgeManager
+from response_cache import ResponseCache, SQLiteStore, create_response_cache, normalize_query
+from checkpointer import SQLiteCheckpointer
+from thread_store import ThreadStore
+from appointments_db import AppointmentRepository, BulkConflictError, ConnectionPool, SlotTakenError
+from availability import AvailabilityIndex
+from booking_form import FIELDS, BookingForm
+from intent_router import IntentRouter
+from single_flight import SingleFlight
+from web_search import SearchRateLimiter, WebSearch, local_hit
+from history import HistoryPolicy, count_tokens, message_text
+from llm_resilience import CircuitBreaker, CircuitOpenError, ResilientLLM
+from tool_runner import ParallelToolNode
+from admission import AdmissionControl, Overloaded
+from telemetry import TracedNode, annotate, span, tracer
+from calendar_client import CalendarClient
+from calendar_sync import CalendarSyncWorker
 
 load_dotenv()
 
-# Load PDF's data
-def load_pdf_data(pdf_path):
-    try:
-        doc = fitz.open(pdf_path)
-        text = "\n".join([page.get_text("text") for page in doc])
-        doc.close()
-        return text if text.strip() else "No relevant data found."
-    except Exception as e:
-        return f"Error loading PDF: {e}"
+# Tracing: every graph node, tool call, LLM call and Calendar sync is a span. Metrics are served on
+# /metrics; TRACE_SPANS_PATH also appends each span as a JSON line for offline analysis. With several
+# worker processes, METRICS_DIR lets each scrape report the totals of all of them.
+tracer.configure(spans_path=os.getenv("TRACE_SPANS_PATH"), metrics_dir=os.getenv("METRICS_DIR"))
 
-# Check if PDF files exist and load data
+# Hospital data: clinic.json for structured lookups, plus the PDF, which is parsed once per content hash,
+# cached on disk and loaded on the first question that needs it. Both are reloaded when the files change;
+# request code reads knowledge.current once and never blocks on a reload.
 pdf_path = "Sunrise Medical Center - AI-Powered Chatbot & Hospital Information.pdf"
-if os.path.exists(pdf_path):
-    medical_data = load_pdf_data(pdf_path)
-    hospital_data = load_pdf_data(pdf_path)
-    print(f"Medical data loaded: {medical_data[:100]}...")
-    print(f"Hospital data loaded: {hospital_data[:100]}...")
-else:
-    medical_data = "Medical center data not available. Please upload the PDF file."
-    hospital_data = "Hospital data not available. Please upload the PDF file."
-    print("PDF not found. Using fallback data.")
+knowledge = KnowledgeManager(
+    "clinic.json",
+    pdf_path,
+    cache_dir=os.getenv("KB_CACHE_DIR", ".kb_cache"),
+    interval=float(os.getenv("KNOWLEDGE_RELOAD_INTERVAL", "5"))
+)
+knowledge.load()
+MEDICAL_DATA_FALLBACK = "Medical center data not available. Please upload the PDF file."
+HOSPITAL_DATA_FALLBACK = "Hospital data not available. Please upload the PDF file."
+
+# Retrieval setup: "bm25" sends only the top-k relevant PDF chunks to the LLM, "full" sends the whole document
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "bm25").lower()
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "4"))
+
+def build_context(query, fallback):
+    knowledge_base = knowledge.current.knowledge_base
+    full_text = knowledge_base.text if knowledge_base else None
+    if full_text is None:
+        return fallback
+    if RETRIEVAL_MODE == "full" or knowledge_base.index is None:
+        return full_text
+    # Fall back to the whole document when nothing matches lexically
+    return knowledge_base.index.context_for(query, RETRIEVAL_TOP_K) or full_text
+
+def annotate_prompt(messages):
+    """Records the retrieval mode and prompt size on the tool's span; the llm.tools span has the tokens and latency."""
+    annotate(retrieval_mode=RETRIEVAL_MODE, prompt_chars=sum(len(message.content) for message in messages))
+
+def symptom_hint(symptoms):
+    matches = knowledge.current.clinic_index.symptom_matcher.match(symptoms)[:3]
+    if not matches:
+        return ""
+    listed = "; ".join(f"{match['department']} (matched: {', '.join(match['symptoms'])})" for match in matches)
+    return f"\n            Departments whose common symptoms match: {listed}."
+
+# Cache of LLM tool answers, invalidated when the PDF or clinic.json changes
+response_cache = create_response_cache([pdf_path, "clinic.json"])
+# Identical symptom and hospital questions asked at the same time share one LLM call
+tool_flights = SingleFlight(timeout=float(os.getenv("TOOL_SHARED_CALL_TIMEOUT", "60")))
 
 # Google Calendar API setup
 CLIENT_CONFIG = {
@@ -62,99 +102,128 @@ CLIENT_CONFIG = {
     }
 }
 SCOPES = ['https://www.googleapis.com/auth/calendar.events']
-creds = None
-
-def ensure_credentials():
-    global creds
-    if os.path.exists('token.pickle'):
-        with open('token.pickle', 'rb') as token:
-            creds = pickle.load(token)
-        if not creds.valid and creds.expired and creds.refresh_token:
-            try:
-                creds.refresh(Request())
-                with open('token.pickle', 'wb') as token:
-                    pickle.dump(creds, token)
-            except Exception as e:
-                print(f"Error refreshing credentials: {str(e)}")
-    if not creds or not creds.valid:
-        flow = InstalledAppFlow.from_client_config(CLIENT_CONFIG, SCOPES)
-        creds = flow.run_local_server(port=8080)
-        with open('token.pickle', 'wb') as token:
-            pickle.dump(creds, token)
+calendar_client = CalendarClient(CLIENT_CONFIG, SCOPES, token_path='token.pickle')
+
+# Appointments database: pooled WAL connections shared by every tool and route
+appointment_repo = AppointmentRepository(ConnectionPool(
+    os.getenv("APPOINTMENTS_DB", "appointments.db"),
+    size=int(os.getenv("DB_POOL_SIZE", "5")),
+    busy_timeout_ms=int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+))
 
 # Initialize database schema
 def initialize_database():
-    conn = sqlite3.connect('appointments.db')
-    cursor = conn.cursor()
-    cursor.execute('''CREATE TABLE IF NOT EXISTS appointments (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        appointment_date TEXT NOT NULL,
-        appointment_time TEXT NOT NULL,
-        patient_name TEXT NOT NULL,
-        phone_number TEXT,
-        email TEXT,
-        city TEXT,
-        message TEXT,
-        event_id TEXT,
-        thread_id TEXT,
-        department TEXT,
-        doctor TEXT
-    )''')
-    # Add columns if they don't exist (for backward compatibility)
-    cursor.execute("PRAGMA table_info(appointments)")
-    columns = [row[1] for row in cursor.fetchall()]
-    if "department" not in columns:
-        cursor.execute("ALTER TABLE appointments ADD COLUMN department TEXT")
-    if "doctor" not in columns:
-        cursor.execute("ALTER TABLE appointments ADD COLUMN doctor TEXT")
-    conn.commit()
-    conn.close()
-
-# Initialize LLM
-llm = ChatGroq(
-    model="qwen-qwq-32b",
-    api_key=os.getenv("GROQ_API_KEY")
+    appointment_repo.initialize()
+
+# Calendar writes go through the calendar_outbox table; this worker sends them to Google in the background
+APPOINTMENT_DURATION = timedelta(hours=1)
+calendar_sync = CalendarSyncWorker(
+    appointment_repo,
+    calendar_client.service,
+    poll_interval=float(os.getenv("CALENDAR_SYNC_INTERVAL", "1")),
+    max_attempts=int(os.getenv("CALENDAR_SYNC_MAX_ATTEMPTS", "8")),
+    max_delay=float(os.getenv("CALENDAR_SYNC_MAX_DELAY", "300"))
 )
 
+def event_times(date, time):
+    start_time = datetime.strptime(f"{date} {time}", "%Y-%m-%d %H:%M")
+    end_time = start_time + APPOINTMENT_DURATION
+    return {
+        "start": {"dateTime": start_time.isoformat(), "timeZone": "Asia/Kolkata"},
+        "end": {"dateTime": end_time.isoformat(), "timeZone": "Asia/Kolkata"},
+    }
+
+# Free-slot lookups per doctor; the booking transaction itself rejects clashes
+availability = AvailabilityIndex(
+    appointment_repo,
+    knowledge.current.clinic_index,
+    duration_minutes=int(APPOINTMENT_DURATION.total_seconds() // 60),
+    slot_minutes=int(os.getenv("SLOT_MINUTES", "60"))
+)
+
+def clinic_now():
+    return datetime.now(pytz.timezone('Asia/Kolkata')).replace(tzinfo=None)
+
+def canonical_date(date):
+    """'2026-10-5' -> '2026-10-05': dates are stored and compared as strings, so they need one spelling."""
+    return datetime.strptime(date, "%Y-%m-%d").strftime("%Y-%m-%d")
+
+def canonical_doctor(doctor):
+    """Maps 'Verma' or 'dr rajesh verma' to the clinic.json name so clash checks compare like with like."""
+    found = knowledge.current.clinic_index.find_doctors(doctor) if doctor else []
+    return found[0]["name"] if len(found) == 1 else doctor
+
+def describe_free_slots(doctor, date):
+    slots = availability.free_slots(doctor, date, after=clinic_now())[:6]
+    return f"Free slots for {doctor} on {date}: {', '.join(slots)}." if slots else f"{doctor} has no free slots on {date}."
+
+# Initialize LLM: each request has its own timeout and no SDK-level retries; retries with backoff,
+# the circuit breaker and the optional fallback model are handled by ResilientLLM
+PRIMARY_MODEL = "qwen-qwq-32b"
+FALLBACK_MODEL = os.getenv("GROQ_FALLBACK_MODEL")
+
+def groq_model(model):
+    return ChatGroq(
+        model=model,
+        api_key=os.getenv("GROQ_API_KEY"),
+        timeout=float(os.getenv("LLM_TIMEOUT", "20")),
+        max_retries=0
+    )
+
+llm = groq_model(PRIMARY_MODEL)
+fallback_llm = groq_model(FALLBACK_MODEL) if FALLBACK_MODEL else None
+breaker_settings = {
+    "failure_threshold": int(os.getenv("LLM_BREAKER_FAILURES", "5")),
+    "reset_timeout": float(os.getenv("LLM_BREAKER_RESET", "30"))
+}
+primary_breaker = CircuitBreaker(f"groq:{PRIMARY_MODEL}", **breaker_settings)
+fallback_breaker = CircuitBreaker(f"groq:{FALLBACK_MODEL}", **breaker_settings)
+
+def resilient(primary, fallback=None, name="llm"):
+    return ResilientLLM(
+        primary,
+        fallback,
+        breaker=primary_breaker,
+        fallback_breaker=fallback_breaker,
+        max_attempts=int(os.getenv("LLM_MAX_ATTEMPTS", "3")),
+        deadline=float(os.getenv("LLM_DEADLINE", "45")),
+        request_timeout=float(os.getenv("LLM_TIMEOUT", "20")),
+        name=name
+    )
+
+# For the tools' own LLM calls (symptom analysis, hospital info, history summaries)
+tool_llm = resilient(llm, fallback_llm, name="tools")
+
 # Tools
 
 ## Tool 1: Book an Appointment
 @tool
 def book_appointment_with_user_details(date: str, time: str, name: str, phone: str, email: str, city: str, user_message: str, department: str, doctor: str, config: RunnableConfig) -> str:
     """Books an appointment on Google Calendar and stores user details, department, and doctor in the database."""
-    ensure_credentials()
-    if not creds or not creds.valid:
-        return "Authentication failed. Please re-authenticate."
     configuration = config.get("configurable", {})
     thread_id = configuration.get("thread_id", None)
     if not thread_id:
         return "Error: No thread ID found in configuration."
 
     try:
-        start_time = datetime.strptime(f"{date} {time}", "%Y-%m-%d %H:%M")
-        end_time = start_time + timedelta(hours=1)
         event = {
             "summary": "Medical Appointment",
             "location": "Sunrise Medical Center",
             "description": f"Patient: {name}\nPhone: {phone}\nEmail: {email}\nCity: {city}\nMessage: {user_message}\nDepartment: {department}\nDoctor: {doctor}",
-            "start": {"dateTime": start_time.isoformat(), "timeZone": "Asia/Kolkata"},
-            "end": {"dateTime": end_time.isoformat(), "timeZone": "Asia/Kolkata"},
+            **event_times(date, time),
             "reminders": {"useDefault": False, "overrides": [{"method": "email", "minutes": 30}, {"method": "popup", "minutes": 10}]},
         }
-        service = build('calendar', 'v3', credentials=creds)
-        event_result = service.events().insert(calendarId='primary', body=event).execute()
-        event_id = event_result.get('id')
-
-        conn = sqlite3.connect('appointments.db')
-        cursor = conn.cursor()
-        cursor.execute('''INSERT INTO appointments 
-            (appointment_date, appointment_time, patient_name, phone_number, email, city, message, event_id, thread_id, department, doctor)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', 
-            (date, time, name, phone, email, city, user_message, event_id, thread_id, department, doctor))
-        conn.commit()
-        conn.close()
+        date, time = canonical_date(date), datetime.strptime(time, "%H:%M").strftime("%H:%M")
+        doctor = canonical_doctor(doctor)
+        # Hex UUIDs are valid Calendar event IDs, so retried inserts can't create duplicates
+        event_id = uuid.uuid4().hex
+        appointment_repo.insert(date, time, name, phone, email, city, user_message, event_id, thread_id, department, doctor,
+                                event_body=event, duration_minutes=availability.duration)
+        calendar_sync.notify()
 
         return f"Appointment successfully booked. Event ID: {event_id}. Assigned to {department} with {doctor}."
+    except SlotTakenError as e:
+        return f"Not booked: {doctor} already has an appointment at {date} {time}. {describe_free_slots(doctor, date)}"
     except ValueError as e:
         return f"Failed to book appointment due to invalid date or time format: {str(e)}. Please use YYYY-MM-DD for date and HH:MM for time."
     except sqlite3.Error as e:
@@ -166,47 +235,28 @@ def book_appointment_with_user_details(date: str, time: str, name: str, phone: s
 @tool
 def update_google_calendar_appointment(event_id: str, new_date: str, new_time: str, config: RunnableConfig) -> str:
     """Updates an appointment on Google Calendar and in the database."""
-    ensure_credentials()
-    if not creds or not creds.valid:
-        return "Authentication failed. Please re-authenticate."
     configuration = config.get("configurable", {})
     current_thread_id = configuration.get("thread_id", None)
     if not current_thread_id:
         return "Error: No thread ID found in configuration."
     
-    conn = sqlite3.connect('appointments.db')
-    cursor = conn.cursor()
-    cursor.execute('SELECT thread_id FROM appointments WHERE event_id = ?', (event_id,))
-    result = cursor.fetchone()
-    if not result:
-        conn.close()
-        return f"No appointment found with event ID {event_id}."
-    
     # Authorization check removed for update to allow any thread to update appointments
     
     try:
-        service = build('calendar', 'v3', credentials=creds)
-        event = service.events().get(calendarId='primary', eventId=event_id).execute()
-        original_start = datetime.fromisoformat(event['start']['dateTime'].replace('Z', '+00:00'))
-        original_end = datetime.fromisoformat(event['end']['dateTime'].replace('Z', '+00:00'))
-        duration = original_end - original_start
-        new_start_time = datetime.strptime(f"{new_date} {new_time}", "%Y-%m-%d %H:%M")
-        new_end_time = new_start_time + duration
-        event['start'] = {'dateTime': new_start_time.isoformat(), 'timeZone': 'Asia/Kolkata'}
-        event['end'] = {'dateTime': new_end_time.isoformat(), 'timeZone': 'Asia/Kolkata'}
-        service.events().update(calendarId='primary', eventId=event_id, body=event).execute()
-        
-        cursor.execute('''
-            UPDATE appointments
-            SET appointment_date = ?, appointment_time = ?
-            WHERE event_id = ?
-        ''', (new_date, new_time, event_id))
-        conn.commit()
-        conn.close()
+        event_patch = event_times(new_date, new_time)
+        new_date, new_time = canonical_date(new_date), datetime.strptime(new_time, "%H:%M").strftime("%H:%M")
+        if not appointment_repo.reschedule(event_id, new_date, new_time, event_patch=event_patch,
+                                           duration_minutes=availability.duration):
+            return f"No appointment found with event ID {event_id}."
+        calendar_sync.notify()
         
         return f"Appointment with event ID {event_id} successfully updated to {new_date} at {new_time}."
+    except SlotTakenError as e:
+        return f"Not updated: {e.doctor} already has an appointment at {new_date} {new_time}. {describe_free_slots(e.doctor, new_date)}"
     except ValueError as e:
         return f"Failed to update appointment due to invalid date or time format: {str(e)}. Please use YYYY-MM-DD for date and HH:MM for time."
+    except sqlite3.Error as e:
+        return f"Database error: {str(e)}"
     except Exception as e:
         return f"Failed to update appointment: {str(e)}"
 
@@ -214,48 +264,111 @@ def update_google_calendar_appointment(event_id: str, new_date: str, new_time: s
 @tool
 def cancel_google_calendar_appointment(event_id: str, config: RunnableConfig) -> str:
     """Cancels an appointment on Google Calendar and removes it from the database."""
-    ensure_credentials()
-    if not creds or not creds.valid:
-        return "Authentication failed. Please re-authenticate."
     configuration = config.get("configurable", {})
     current_thread_id = configuration.get("thread_id", None)
     if not current_thread_id:
         return "Error: No thread ID found in configuration."
     
-    conn = sqlite3.connect('appointments.db')
-    cursor = conn.cursor()
-    cursor.execute('SELECT thread_id FROM appointments WHERE event_id = ?', (event_id,))
-    result = cursor.fetchone()
-    if not result:
-        conn.close()
-        return f"No appointment found with event ID {event_id}."
-    
-    
-    
-    
     try:
-        service = build('calendar', 'v3', credentials=creds)
-        service.events().delete(calendarId='primary', eventId=event_id).execute()
-        
-        cursor.execute('''
-            DELETE FROM appointments
-            WHERE event_id = ?
-        ''', (event_id,))
-        conn.commit()
-        conn.close()
+        if not appointment_repo.delete(event_id, sync_calendar=True):
+            return f"No appointment found with event ID {event_id}."
+        calendar_sync.notify()
         
         return f"Appointment with event ID {event_id} successfully cancelled."
+    except sqlite3.Error as e:
+        return f"Database error: {str(e)}"
     except Exception as e:
         return f"Failed to cancel appointment: {str(e)}"
 
+## Tool: Free slots
+@tool
+def check_availability(department: str = "", doctor: str = "", date: str = "", count: int = 5) -> str:
+    """Lists real free appointment slots: for a doctor on a date (YYYY-MM-DD), or the next free slots in a department."""
+    clinic_index = knowledge.current.clinic_index
+    try:
+        if date:
+            date = canonical_date(date)
+        if doctor and date:
+            return describe_free_slots(canonical_doctor(doctor), date)
+        if not department and doctor:
+            found = clinic_index.find_doctors(doctor)
+            if len(found) == 1:
+                department = clinic_index.department_for_specialty(found[0]["specialty"])
+        departments = clinic_index.resolve_departments(department) if department else []
+        if not departments:
+            return "Please provide a doctor and date, or a department, to check availability."
+        after = clinic_now()
+        if date:
+            after = max(after, datetime.strptime(date, "%Y-%m-%d"))
+        slots = availability.next_free_slots(departments[0], count=max(1, min(int(count), 20)), after=after)
+        if not slots:
+            return f"No free slots in {departments[0]} in the next two weeks."
+        listed = "; ".join(f"{slot['date']} {slot['time']} with {slot['doctor']}" for slot in slots)
+        return f"Next free slots in {departments[0]}: {listed}."
+    except ValueError as e:
+        return f"Invalid date: {str(e)}. Please use YYYY-MM-DD."
+
+## Bulk changes: move or cancel every appointment matching a filter, e.g. when a doctor is off sick
+def bulk_change_appointments(action, filters, new_date=None, shift_days=None):
+    """Applies a bulk reschedule or cancel in one SQLite transaction and queues the Calendar changes.
+
+    Reschedules keep each appointment's time and move it to `new_date`, or by `shift_days`; if any
+    would clash with a doctor's other appointments or land outside opening hours (a Sunday, say),
+    BulkConflictError is raised and nothing moves.
+    Returns [(event_id, outbox_id), ...] for progress tracking.
+    """
+    filters = {name: canonical_date(value) if name in ("date_from", "date_to") else value
+               for name, value in filters.items() if value}
+    if action == "cancel":
+        queued = appointment_repo.bulk_delete(**filters)
+    elif action == "reschedule":
+        if not new_date and not shift_days:
+            raise ValueError("Rescheduling needs new_date or shift_days")
+        new_date = canonical_date(new_date) if new_date else None
+        def plan(row):
+            date = new_date or (datetime.strptime(row["appointment_date"], "%Y-%m-%d") + timedelta(days=int(shift_days))).strftime("%Y-%m-%d")
+            return date, row["appointment_time"], event_times(date, row["appointment_time"])
+        queued = appointment_repo.bulk_reschedule(plan, duration_minutes=availability.duration, hours=availability.hours, **filters)
+    else:
+        raise ValueError("action must be 'reschedule' or 'cancel'")
+    calendar_sync.notify()
+    return queued
+
+@tool
+def bulk_update_appointments(action: str, config: RunnableConfig, doctor: str = "", department: str = "", date_from: str = "", date_to: str = "", new_date: str = "", shift_days: int = 0) -> str:
+    """Staff only: reschedules (action='reschedule' with new_date YYYY-MM-DD or shift_days) or cancels (action='cancel') every appointment matching doctor, department and date range."""
+    configuration = config.get("configurable", {})
+    if not configuration.get("is_admin"):
+        return "Bulk changes are only available to clinic staff."
+    try:
+        queued = bulk_change_appointments(
+            action,
+            {"doctor": doctor, "department": department, "date_from": date_from, "date_to": date_to},
+            new_date=new_date, shift_days=shift_days
+        )
+        verb = "cancelled" if action == "cancel" else "rescheduled"
+        return f"{len(queued)} appointments {verb}. Google Calendar is being updated in the background."
+    except BulkConflictError as e:
+        listed = "; ".join(f"{row['doctor']} {row['appointment_date']} {row['appointment_time']} -> {date} {time}"
+                           f"{' (closed)' if clash is None else ''}" for row, date, time, clash in e.conflicts[:10])
+        return f"Nothing was changed: {e}. Blocked moves: {listed}. Narrow the filter or pick another date."
+    except ValueError as e:
+        return f"Failed to apply bulk change: {str(e)}. Dates use YYYY-MM-DD."
+    except sqlite3.Error as e:
+        return f"Database error: {str(e)}"
+
 ## Tool 4: Symptom Analysis
 @tool
 def symptom_analysis_tool(symptoms: str) -> str:
     """Analyzes user symptoms and provides possible medical conditions and relevant departments."""
     if not symptoms or not isinstance(symptoms, str):
         return "Please provide valid symptoms (e.g., 'fever, cough')."
-    try:
-        response = llm.invoke([
+    cached = response_cache.get("symptoms", symptoms) if response_cache else None
+    annotate(cache="hit" if cached else "miss")
+    if cached:
+        return cached
+    def analyse():
+        messages = [
             SystemMessage(content="""You are a compassionate AI health assistant. 
             Provide friendly, concise, and informative responses based on the medical data provided.
             If the user's symptoms match an entry in the medical data, list the possible conditions and the relevant department.
@@ -263,10 +376,17 @@ def symptom_analysis_tool(symptoms: str) -> str:
             or suggest consulting a general practitioner if no reasonable match is found.
             Do not suggest booking links, phone numbers, or specific treatments."""),
             HumanMessage(content=f"""A user is experiencing: {symptoms}.
-            Based on the medical data below, provide the possible conditions and the relevant medical department.
-            Medical Data:\n{medical_data}""")
-        ])
+            Based on the medical data below, provide the possible conditions and the relevant medical department.{symptom_hint(symptoms)}
+            Medical Data:\n{build_context(symptoms, MEDICAL_DATA_FALLBACK)}""")
+        ]
+        annotate_prompt(messages)
+        response = tool_llm.invoke(messages)
+        if response_cache and response.content:
+            response_cache.set("symptoms", symptoms, response.content)
         return response.content
+
+    try:
+        return tool_flights.do(("symptoms", normalize_query(symptoms)), analyse)
     except Exception as e:
         return f"Error in symptom analysis: {str(e)}. Please try again or consult a healthcare provider."
 
@@ -276,8 +396,16 @@ def hospital_info_tool(query: str) -> str:
     """Provides information about hospitals, doctors, or departments based on user query."""
     if not query or not isinstance(query, str):
         return "Please provide a valid query (e.g., 'doctors in cardiology')."
-    try:
-        response = llm.invoke([
+    answer = knowledge.current.clinic_index.answer(query)
+    if answer:
+        annotate(cache="structured")
+        return answer
+    cached = response_cache.get("hospital_info", query) if response_cache else None
+    annotate(cache="hit" if cached else "miss")
+    if cached:
+        return cached
+    def look_up():
+        messages = [
             SystemMessage(content="""You are a concise hospital information assistant.
             Based on the user's query and the hospital data provided, provide only the requested information.
             Supported query types:
@@ -288,51 +416,66 @@ def hospital_info_tool(query: str) -> str:
             Do not include hospital addresses, contact details, hours, fees, or links unless explicitly asked."""),
             HumanMessage(content=f"""User query: {query}.
             Based on the hospital data below, provide the specific information requested.
-            Hospital Data:\n{hospital_data}""")
-        ])
+            Hospital Data:\n{build_context(query, HOSPITAL_DATA_FALLBACK)}""")
+        ]
+        annotate_prompt(messages)
+        response = tool_llm.invoke(messages)
+        if response_cache and response.content:
+            response_cache.set("hospital_info", query, response.content)
         return response.content
+
+    try:
+        return tool_flights.do(("hospital_info", normalize_query(query)), look_up)
     except Exception as e:
         return f"Error retrieving hospital info: {str(e)}. Please try again."
 
 # State Definition
 class State(TypedDict):
     messages: Annotated[list[AnyMessage], add_messages]
+    booking: Optional[dict]
+    summary: Optional[str]
+    # Estimated prompt tokens sent to the LLM during the current turn
+    prompt_tokens: Optional[int]
 
 # Assistant Class
 class Assistant:
-    def __init__(self, runnable):
+    def __init__(self, runnable, prompt=None):
         self.runnable = runnable
+        self.prompt = prompt
 
     def __call__(self, state: State, config):
         max_retries = 3
-        retry_count = 0
-        
-        while retry_count < max_retries:
-            configuration = config.get("configurable", {})
-            passenger_id = configuration.get("user_id", None)
-            state = {**state, "user_info": passenger_id}
-            
+        prompt_tokens = state.get("prompt_tokens") or 0
+        configuration = config.get("configurable", {})
+        passenger_id = configuration.get("user_id", None)
+        state = {
+            **state,
+            "user_info": passenger_id,
+            "booking_summary": booking_summary(state.get("booking")),
+            "conversation_summary": state.get("summary") or "none",
+        }
+        attempt_state = state
+
+        for retry_count in range(max_retries):
             try:
-                result = self.runnable.invoke(state)
-                if not result.tool_calls and (
-                    not result.content or 
-                    (isinstance(result.content, list) and not result.content[0].get("text"))
-                ):
-                    messages = state["messages"] + [HumanMessage(content="Please provide a complete response.")]
-                    state = {**state, "messages": messages}
-                    retry_count += 1
-                else:
-                    break
+                if self.prompt is not None:
+                    call_tokens = count_tokens(self.prompt.invoke(attempt_state).to_messages())
+                    prompt_tokens += call_tokens
+                    annotate(estimated_prompt_tokens=call_tokens, history_messages=len(attempt_state["messages"]))
+                # Transient Groq errors are retried with backoff inside the resilient runnable
+                result = self.runnable.invoke(attempt_state)
+            except CircuitOpenError as e:
+                print(f"Error in Assistant: {str(e)}")
+                return {"messages": [AIMessage(content="Our assistant is temporarily unavailable. Please try again in a minute.")], "prompt_tokens": prompt_tokens}
             except Exception as e:
                 print(f"Error in Assistant: {str(e)}")
-                messages = state["messages"] + [AIMessage(content="I encountered a technical issue. Please try again later.")]
-                return {"messages": messages}
-        
-        if retry_count >= max_retries:
-            messages = state["messages"] + [AIMessage(content="I'm having trouble generating a response. Please try again later.")]
-            return {"messages": messages}
-        
-        return {"messages": state["messages"] + [result]}
+                return {"messages": [AIMessage(content="I encountered a technical issue. Please try again later.")], "prompt_tokens": prompt_tokens}
+            if result.tool_calls or (result.content and not (isinstance(result.content, list) and not result.content[0].get("text"))):
+                return {"messages": [result], "prompt_tokens": prompt_tokens}
+            # Empty reply: retry with a single nudge that is not saved to the conversation
+            attempt_state = {**state, "messages": state["messages"] + [HumanMessage(content="Please provide a complete response.")]}
+
+        return {"messages": [AIMessage(content="I'm having trouble generating a response. Please try again later.")], "prompt_tokens": prompt_tokens}
 
 # Prompt Setup
 primary_assistant_prompt = ChatPromptTemplate.from_messages(
@@ -342,7 +485,7 @@ primary_assistant_prompt = ChatPromptTemplate.from_messages(
             "You are a friendly and helpful customer support assistant for Sunrise Medical Center. Your goal is to assist users in booking appointments in a conversational, step-by-step manner. The required information is: appointment date (YYYY-MM-DD format, e.g., 2025-12-25), appointment time (24-hour HH:MM format, e.g., 14:30), full name, phone number, email address, city, and reason for the appointment.\n\n"
             "When a user wants to book an appointment:\n"
             "- Start by asking only for their preferred date in YYYY-MM-DD format.\n"
-            "- Once they provide the date, acknowledge it and ask for the preferred time in HH:MM format.\n"
+            "- Once they provide the date, call the `check_availability` tool with the recommended doctor (or department) and that date, offer the free slots it returns, and ask them to pick one.\n"
             "- Continue this pattern, asking for one piece of information at a time: full name, phone number, email address, city, and reason for the appointment.\n"
             "- If the user provides any details in their initial message or during the conversation, acknowledge what they've given and ask for the next missing piece.\n"
             "- If a detail is in the wrong format (e.g., '25/12/2025' instead of '2025-12-25'), politely ask them to provide it in the correct format.\n"
@@ -350,7 +493,10 @@ primary_assistant_prompt = ChatPromptTemplate.from_messages(
             "- Once all information is collected, summarize the details (including department and doctor if provided) and ask the user to confirm before booking.\n"
             "- After confirmation, call the `book_appointment_with_user_details` tool with the parameters: date, time, name, phone, email, city, user_message, department, and doctor.\n"
             "- When calling the `book_appointment_with_user_details` tool, include the `department` and `doctor` parameters if they have been recommended. If not available, ask the user for their preferred department or doctor.\n\n"
-            "For updates or cancellations, ask for the event ID and guide the user step-by-step as needed, using the `update_google_calendar_appointment` or `cancel_google_calendar_appointment` tools.\n\n"
+            "For updates or cancellations, ask for the event ID and guide the user step-by-step as needed, using the `update_google_calendar_appointment` or `cancel_google_calendar_appointment` tools.\n"
+            "If clinic staff ask to move or cancel every appointment for a doctor, department or date range, use the `bulk_update_appointments` tool instead of changing appointments one by one.\n\n"
+            "Booking details already collected in this conversation: {booking_summary}. Don't ask for these again.\n"
+            "Summary of earlier messages in this conversation: {conversation_summary}\n\n"
             "Always be friendly, concise, and clear in your responses, guiding the user one step at a time. Avoid using emojis and excessive formatting like asterisks.\n"
             "Current time (IST): {time}.",
         ),
@@ -360,64 +506,236 @@ primary_assistant_prompt = ChatPromptTemplate.from_messages(
 
 # Tool Setup
 os.environ["TAVILY_API_KEY"] = os.getenv("TAVILY_API_KEY")
+
+def tavily_backend():
+    # langchain_community is slow to import, so it is only loaded for the first web search
+    from langchain_community.tools.tavily_search import TavilySearchResults
+    return TavilySearchResults(max_results=1)
+
+def local_search_answer(query):
+    current = knowledge.current
+    answer = current.clinic_index.answer(query)
+    if answer:
+        return answer
+    knowledge_base = current.knowledge_base
+    return local_hit(knowledge_base.index, query) if knowledge_base else None
+
+# Web search: hospital data first, then a persistent cache of results, then Tavily, with concurrent
+# identical searches sharing one request and a per-conversation and global limit on new searches
+web_searcher = WebSearch(
+    tavily_backend,
+    cache=ResponseCache(
+        SQLiteStore(
+            os.getenv("WEB_SEARCH_CACHE_PATH", "web_search_cache.db"),
+            max_entries=int(os.getenv("WEB_SEARCH_CACHE_MAX_ENTRIES", "5000"))
+        ),
+        ttl=int(os.getenv("WEB_SEARCH_CACHE_TTL", "21600"))
+    ),
+    limiter=SearchRateLimiter(
+        global_per_minute=int(os.getenv("WEB_SEARCH_RATE_PER_MINUTE", "30")),
+        thread_per_minute=int(os.getenv("WEB_SEARCH_THREAD_RATE_PER_MINUTE", "4"))
+    ),
+    local_answer=local_search_answer if os.getenv("WEB_SEARCH_LOCAL_FIRST", "on").lower() != "off" else None
+)
+
+@tool("tavily_search_results_json")
+def web_search(query: str, config: RunnableConfig) -> str:
+    """A search engine optimized for comprehensive, accurate, and trusted results. Useful for when you need to answer questions about current events. Input should be a search query."""
+    return web_searcher.search(query, thread_id=config.get("configurable", {}).get("thread_id"))
+
 part_1_tools = [
-    TavilySearchResults(max_results=1),
+    web_search,
     book_appointment_with_user_details,
     update_google_calendar_appointment,
     cancel_google_calendar_appointment,
+    bulk_update_appointments,
+    check_availability,
     symptom_analysis_tool,
     hospital_info_tool
 ]
+# Tools that change appointments; these run in the order the model called them
+part_1_write_tools = [
+    book_appointment_with_user_details,
+    update_google_calendar_appointment,
+    cancel_google_calendar_appointment,
+    bulk_update_appointments
+]
 
 # Bind Tools to LLM
-part_1_assistant_runnable = primary_assistant_prompt | llm.bind_tools(part_1_tools)
+part_1_assistant_runnable = resilient(
+    primary_assistant_prompt | llm.bind_tools(part_1_tools),
+    primary_assistant_prompt | fallback_llm.bind_tools(part_1_tools) if fallback_llm else None,
+    name="assistant"
+)
+
+# Booking slot filling: a rule-based form answers the routine booking turns before the LLM sees them
+booking_form = BookingForm(knowledge.current.clinic_index, availability, now=clinic_now)
+
+# FAQ fast path: greetings, hours, contact and emergency numbers, doctors, payment and policies are answered
+# from clinic.json by keyword rules and a small local classifier; INTENT_ROUTER=off sends every turn to the LLM
+intent_router = IntentRouter(knowledge.current.clinic_index) if os.getenv("INTENT_ROUTER", "on").lower() != "off" else None
+
+def on_knowledge_reload(snapshot):
+    # Plain attribute swaps: a lookup already running keeps the index it started with
+    availability.set_clinic_index(snapshot.clinic_index)
+    booking_form.clinic_index = snapshot.clinic_index
+    if intent_router:
+        intent_router.clinic_index = snapshot.clinic_index
+
+knowledge.listeners.append(on_knowledge_reload)
+BOOKING_FORM_CALL = "booking_form_"
+
+def booking_summary(booking):
+    if not booking:
+        return "none"
+    return ", ".join(f"{field}: {value}" for field, value in booking.items() if not field.startswith("_") and value)
+
+def slot_filler(state: State):
+    messages = state["messages"]
+    last = messages[-1]
+    if isinstance(last, ToolMessage) and last.tool_call_id.startswith(BOOKING_FORM_CALL):
+        outcome = booking_form.after_booking(state.get("booking"), str(last.content))
+        return {"booking": outcome["booking"], "messages": [AIMessage(content=outcome["reply"])]}
+    if not isinstance(last, HumanMessage) or not isinstance(last.content, str):
+        return {}
+    recent = " ".join(str(message.content) for message in messages[-5:-1] if not isinstance(message, HumanMessage))
+    step = booking_form.step(state.get("booking"), last.content, recent)
+    if step["action"] == "reply":
+        return {"booking": step["booking"], "messages": [AIMessage(content=step["reply"])], "prompt_tokens": 0}
+    if step["action"] == "book":
+        call = {"name": "book_appointment_with_user_details", "args": step["args"], "id": f"{BOOKING_FORM_CALL}{uuid.uuid4().hex}"}
+        return {"booking": step["booking"], "messages": [AIMessage(content="", tool_calls=[call])], "prompt_tokens": 0}
+    return {"booking": step["booking"], "prompt_tokens": 0}
+
+def route_slot_filler(state: State):
+    last = state["messages"][-1]
+    if isinstance(last, AIMessage):
+        return "tools" if last.tool_calls else END
+    return "intent_router"
+
+def answer_faq(state: State):
+    last = state["messages"][-1]
+    if not intent_router or not isinstance(last, HumanMessage) or not isinstance(last.content, str):
+        return {}
+    routed = intent_router.route(last.content)
+    if routed is None:
+        annotate(intent="llm")
+        return {}
+    annotate(intent=routed["intent"], by=routed["by"])
+    reply = routed["reply"]
+    # A question asked mid-booking: answer it, then pick the form up where it left off
+    booking = state.get("booking") or {}
+    expecting = booking.get("_expecting")
+    if expecting in FIELDS:
+        reply += f"\n\n{booking_form.question(booking, expecting)}"
+    elif expecting == "confirm":
+        reply += f"\n\n{booking_form.summary(booking)}"
+    return {"messages": [AIMessage(content=reply)], "prompt_tokens": 0}
+
+def route_after_intent(state: State):
+    return END if isinstance(state["messages"][-1], AIMessage) else "compact_history"
+
+# History budget: older tool output is digested and old turns folded into a summary before the LLM sees them
+def summarize_with_llm(summary, turns):
+    transcript = "\n".join(f"{type(message).__name__}: {message_text(message)}" for turn in turns for message in turn)
+    response = tool_llm.invoke([
+        SystemMessage(content="Update the running summary of a clinic support chat. Keep names, dates, doctors, departments, event IDs and anything still unresolved. Reply with the summary only, under 120 words."),
+        HumanMessage(content=f"Summary so far:\n{summary or 'none'}\n\nNew messages:\n{transcript}")
+    ])
+    return message_text(response)
+
+history_policy = HistoryPolicy(
+    max_tokens=int(os.getenv("HISTORY_MAX_TOKENS", "3000")),
+    keep_turns=int(os.getenv("HISTORY_KEEP_TURNS", "6")),
+    tool_digest_tokens=int(os.getenv("HISTORY_TOOL_DIGEST_TOKENS", "120")),
+    summarize=summarize_with_llm if os.getenv("HISTORY_SUMMARY", "extractive") == "llm" else None
+)
+
+def compact_history(state: State):
+    return history_policy.compact(state["messages"], state.get("summary"))
+
+def route_after_tools(state: State):
+    # Tool results for a form-issued booking are phrased by the form; everything else goes back to the LLM
+    for message in reversed(state["messages"]):
+        if isinstance(message, AIMessage):
+            if any(call["id"].startswith(BOOKING_FORM_CALL) for call in message.tool_calls):
+                return "slot_filler"
+            return "assistant"
+    return "assistant"
 
 # Graph Setup
 builder = StateGraph(State)
-builder.add_node("assistant", Assistant(part_1_assistant_runnable))
-builder.add_node("tools", ToolNode(part_1_tools))
-builder.add_edge(START, "assistant")
+builder.add_node("slot_filler", TracedNode("slot_filler", slot_filler, tracer))
+builder.add_node("intent_router", TracedNode("intent_router", answer_faq, tracer))
+builder.add_node("compact_history", TracedNode("compact_history", compact_history, tracer))
+builder.add_node("assistant", TracedNode("assistant", Assistant(part_1_assistant_runnable, prompt=primary_assistant_prompt), tracer))
+# Independent tool calls in one turn run concurrently; calendar writes stay in order per conversation
+builder.add_node("tools", TracedNode("tools", ParallelToolNode(
+    part_1_tools,
+    ordered_tools=[tool.name for tool in part_1_write_tools],
+    max_workers=int(os.getenv("TOOL_WORKERS", "4"))
+), tracer))
+builder.add_edge(START, "slot_filler")
+builder.add_conditional_edges("slot_filler", route_slot_filler, ["intent_router", "tools", END])
+builder.add_conditional_edges("intent_router", route_after_intent, ["compact_history", END])
+builder.add_edge("compact_history", "assistant")
 builder.add_conditional_edges("assistant", tools_condition)
-builder.add_edge("tools", "assistant")
-memory = MemorySaver()
+builder.add_conditional_edges("tools", route_after_tools, ["assistant", "slot_filler"])
+memory = SQLiteCheckpointer(
+    os.getenv("CHECKPOINT_DB", "checkpoints.db"),
+    max_cached_threads=int(os.getenv("CHECKPOINT_CACHE_THREADS", "1000")),
+    history_limit=int(os.getenv("CHECKPOINT_HISTORY_LIMIT", "20")),
+    idle_ttl=int(os.getenv("CHECKPOINT_IDLE_TTL", "0")),
+    compaction_interval=int(os.getenv("CHECKPOINT_COMPACTION_INTERVAL", "300"))
+)
+memory.start_compaction()
 part_1_graph = builder.compile(checkpointer=memory)
 
-# Database setup
-def initialize_database():
-    conn = sqlite3.connect('appointments.db')
-    cursor = conn.cursor()
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS appointments (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        appointment_date TEXT NOT NULL,
-        appointment_time TEXT NOT NULL,
-        patient_name TEXT NOT NULL,
-        phone_number TEXT,
-        email TEXT,
-        city TEXT,
-        message TEXT,
-        event_id TEXT,
-        thread_id TEXT,
-        department TEXT,
-        doctor TEXT
-    )
-    ''')
-    # Add columns if they don't exist (for backward compatibility)
-    cursor.execute("PRAGMA table_info(appointments)")
-    columns = [row[1] for row in cursor.fetchall()]
-    if "department" not in columns:
-        cursor.execute("ALTER TABLE appointments ADD COLUMN department TEXT")
-    if "doctor" not in columns:
-        cursor.execute("ALTER TABLE appointments ADD COLUMN doctor TEXT")
-    conn.commit()
-    conn.close()
-
 # Initialize database
 initialize_database()
+availability.load()
+calendar_sync.start()
+knowledge.start()
 
 # Flask App Setup
 app = Flask(__name__, static_folder='static')
-threads = {}
+# Conversation ids live in SQLite next to the checkpoints so any worker can resume any conversation
+thread_store = ThreadStore(os.getenv("CHECKPOINT_DB", "checkpoints.db"), ttl=int(os.getenv("THREAD_TTL", "86400")))
+thread_store.start_purging(on_expire=memory.delete_thread)
+
+# Backpressure: at most CHAT_CONCURRENCY chats (and so their LLM calls) run at once in this process, and
+# up to CHAT_QUEUE more wait for a slot; anything beyond that is answered 503 with Retry-After
+chat_admission = AdmissionControl(
+    max_active=int(os.getenv("CHAT_CONCURRENCY", "8")),
+    max_queued=int(os.getenv("CHAT_QUEUE", "32")),
+    queue_timeout=float(os.getenv("CHAT_QUEUE_TIMEOUT", "10"))
+)
+
+def overloaded_response(error):
+    return jsonify({"error": f"The assistant is busy ({error.reason}). Please try again shortly."}), 503, {"Retry-After": str(error.retry_after)}
+
+def shutdown(timeout=30):
+    """Graceful stop (called by gunicorn's worker_exit hook, after gunicorn has waited for in-flight
+    requests): refuses new chats, waits up to `timeout` seconds for any still running, then stops the
+    background threads."""
+    drained = chat_admission.drain(timeout)
+    print(f"[shutdown] in-flight chats {'drained' if drained else 'still running after the timeout'}")
+    calendar_sync.stop(timeout=min(timeout, 5))
+    knowledge.stop()
+    thread_store.stop_purging()
+    memory.stop_compaction()
+    tracer.metrics.stop()
+
+def is_admin_request():
+    """Staff requests carry the ADMIN_TOKEN in X-Admin-Token; admin features are off when it is unset."""
+    admin_token = os.getenv("ADMIN_TOKEN")
+    return bool(admin_token) and hmac.compare_digest(request.headers.get("X-Admin-Token", ""), admin_token)
+
+def resolve_thread_id(thread_id):
+    if not thread_id or not thread_store.touch(thread_id):
+        thread_id = str(uuid.uuid4())
+        thread_store.register(thread_id)
+    return thread_id
 
 @app.route('/')
 def index():
@@ -427,6 +745,32 @@ def index():
 def serve_static(path):
     return send_from_directory('static', path)
 
+@app.route('/health', methods=['GET'])
+def health():
+    # The knowledge version changes when clinic.json or the hospital PDF is reloaded
+    return jsonify({
+        "status": "ok",
+        "knowledge": knowledge.current.describe(),
+        "chats": chat_admission.snapshot(),
+        "calendar_outbox": appointment_repo.outbox_counts()
+    })
+
+def process_gauges():
+    snapshot = chat_admission.snapshot()
+    yield "chats_active", {}, snapshot["active"]
+    yield "chats_waiting", {}, snapshot["waiting"]
+    yield "knowledge_generation", {}, knowledge.current.generation
+    yield "spans_dropped", {}, tracer.writer.dropped if tracer.writer else 0
+    for status, count in appointment_repo.outbox_counts().items():
+        yield "calendar_outbox_entries", {"status": status}, count
+
+tracer.metrics.collectors.append(process_gauges)
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus text format: span durations per node/tool/LLM call, token, retry and cache counters, gauges."""
+    return Response(tracer.metrics.render(), mimetype="text/plain; version=0.0.4")
+
 @app.route('/chat', methods=['POST'])
 def chat():
     try:
@@ -438,16 +782,17 @@ def chat():
         if not isinstance(message, str):
             return jsonify({"error": "Message must be a string"}), 400
         
-        thread_id = data.get('thread_id')
-        if not thread_id or thread_id not in threads:
-            thread_id = str(uuid.uuid4())
-            threads[thread_id] = part_1_graph
+        thread_id = resolve_thread_id(data.get('thread_id'))
         
         new_message = HumanMessage(content=message)
-        result = threads[thread_id].invoke(
-            {"messages": [new_message]},
-            config={"configurable": {"passenger_id": "User", "thread_id": thread_id}}
-        )
+        try:
+            with span("chat", thread_id=thread_id), chat_admission.slot():
+                result = part_1_graph.invoke(
+                    {"messages": [new_message]},
+                    config={"configurable": {"passenger_id": "User", "thread_id": thread_id, "is_admin": is_admin_request()}}
+                )
+        except Overloaded as e:
+            return overloaded_response(e)
         
         assistant_messages = [msg for msg in result["messages"] if isinstance(msg, AIMessage)]
         if not assistant_messages:
@@ -458,68 +803,236 @@ def chat():
         
         return jsonify({
             "thread_id": thread_id,
-            "response": response_content
+            "response": response_content,
+            "prompt_tokens": result.get("prompt_tokens") or 0
         })
     except Exception as e:
         print(f"Error in chat endpoint: {str(e)}")
         traceback.print_exc()
         return jsonify({"error": "Sorry, there was an error processing your request. Please try again."}), 500
 
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    data = request.get_json()
+    if not data or 'message' not in data:
+        return jsonify({"error": "Invalid request: 'message' is required"}), 400
+
+    message = data['message']
+    if not isinstance(message, str):
+        return jsonify({"error": "Message must be a string"}), 400
+
+    thread_id = resolve_thread_id(data.get('thread_id'))
+    config = {"configurable": {"passenger_id": "User", "thread_id": thread_id, "is_admin": is_admin_request()}}
+
+    def generate():
+        with span("chat.stream", thread_id=thread_id):
+            yield from stream_events()
+
+    def stream_events():
+        started = time_module.perf_counter()
+        first_token_at = None
+        yield sse_event("thread", {"thread_id": thread_id})
+        try:
+            for mode, chunk in part_1_graph.stream(
+                {"messages": [HumanMessage(content=message)]},
+                config=config,
+                stream_mode=["messages", "updates"]
+            ):
+                if mode == "messages":
+                    message_chunk, metadata = chunk
+                    # Only the assistant's reply is user-facing; tool-internal LLM calls stream too
+                    if metadata.get("langgraph_node") != "assistant" or not isinstance(message_chunk, AIMessageChunk):
+                        continue
+                    if isinstance(message_chunk.content, str) and message_chunk.content:
+                        if first_token_at is None:
+                            first_token_at = time_module.perf_counter()
+                        yield sse_event("token", {"content": message_chunk.content})
+                else:
+                    for node, update in chunk.items():
+                        tool_calls = [
+                            call["name"] for msg in (update or {}).get("messages", [])[-1:]
+                            for call in getattr(msg, "tool_calls", [])
+                        ]
+                        yield sse_event("node", {"node": node, "tool_calls": tool_calls})
+
+            values = part_1_graph.get_state(config).values
+            messages = values.get("messages", [])
+            assistant_messages = [msg for msg in messages if isinstance(msg, AIMessage)]
+            finished = time_module.perf_counter()
+            ttfb_ms = (first_token_at - started) * 1000 if first_token_at else None
+            total_ms = (finished - started) * 1000
+            prompt_tokens = values.get("prompt_tokens") or 0
+            annotate(ttfb_ms=ttfb_ms, conversation_prompt_tokens=prompt_tokens)
+            yield sse_event("done", {
+                "thread_id": thread_id,
+                "response": assistant_messages[-1].content if assistant_messages else "",
+                "ttfb_ms": ttfb_ms,
+                "total_ms": total_ms,
+                "prompt_tokens": prompt_tokens
+            })
+        except Exception as e:
+            print(f"Error in chat stream endpoint: {str(e)}")
+            traceback.print_exc()
+            yield sse_event("error", {"error": "Sorry, there was an error processing your request. Please try again."})
+
+    # Taken last, so nothing between here and call_on_close can fail and leak the slot
+    try:
+        started_at = chat_admission.acquire()
+    except Overloaded as e:
+        return overloaded_response(e)
+    response = Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+    # The slot is held until the stream is closed, including when the client disconnects early
+    response.call_on_close(lambda: chat_admission.release(started_at))
+    return response
+
 @app.route('/reset', methods=['POST'])
 def reset_conversation():
     try:
         data = request.get_json()
         thread_id = data.get('thread_id')
         
-        if thread_id and thread_id in threads:
-            threads[thread_id] = part_1_graph
+        if thread_id and thread_store.touch(thread_id):
+            # Drop the checkpointed history; the id stays registered so the client can keep using it
+            memory.delete_thread(thread_id)
             return jsonify({"status": "success", "message": "Conversation reset successfully"})
         else:
             return jsonify({"error": "Invalid thread_id"}), 400
     except Exception as e:
         return jsonify({"error": f"An error occurred: {str(e)}"}), 500
 
+def appointment_to_dict(row):
+    return {
+        "id": row["id"],
+        "date": row["appointment_date"],
+        "time": row["appointment_time"],
+        "name": row["patient_name"],
+        "phone": row["phone_number"],
+        "email": row["email"],
+        "city": row["city"],
+        "message": row["message"],
+        "event_id": row["event_id"],
+        "thread_id": row["thread_id"],
+        "department": row["department"],
+        "doctor": row["doctor"],
+        "sync_status": row["sync_status"]
+    }
+
+def encode_cursor(row):
+    key = [row["appointment_date"], row["appointment_time"], row["id"]]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError for anything that isn't a [date, time, id] key."""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        raise ValueError("invalid cursor")
+    if not (isinstance(key, list) and len(key) == 3 and isinstance(key[0], str) and isinstance(key[1], str)
+            and isinstance(key[2], int) and not isinstance(key[2], bool)):
+        raise ValueError("invalid cursor")
+    return tuple(key)
+
 @app.route('/appointments', methods=['GET'])
 def get_appointments():
+    """Lists appointments in schedule order with keyset pagination.
+
+    Filters: date_from, date_to (YYYY-MM-DD), department, doctor, thread_id. Pass `cursor` from the
+    previous page's `next_cursor` to continue; `export=1` streams every matching row instead of a page.
+    """
     try:
-        conn = sqlite3.connect('appointments.db')
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM appointments ORDER BY appointment_date, appointment_time')
-        appointments = cursor.fetchall()
-        conn.close()
-
-        appointment_list = [
-            {
-                "id": app[0],
-                "date": app[1],
-                "time": app[2],
-                "name": app[3],
-                "phone": app[4],
-                "email": app[5],
-                "city": app[6],
-                "message": app[7],
-                "event_id": app[8],
-                "thread_id": app[9],
-                "department": app[10] if len(app) > 10 else None,
-                "doctor": app[11] if len(app) > 11 else None
-            } for app in appointments
-        ]
+        filters = {
+            name: request.args.get(name)
+            for name in ("date_from", "date_to", "department", "doctor", "thread_id")
+        }
+        for name in ("date_from", "date_to"):
+            if filters[name]:
+                filters[name] = canonical_date(filters[name])
+        if request.args.get('export') == '1':
+            def generate():
+                yield '{"appointments": ['
+                for n, row in enumerate(appointment_repo.iterate(**filters)):
+                    yield ("," if n else "") + json.dumps(appointment_to_dict(row))
+                yield ']}'
+            return Response(stream_with_context(generate()), mimetype="application/json")
 
-        return jsonify({"appointments": appointment_list})
+        limit = min(max(int(request.args.get('limit', 100)), 1), 500)
+        cursor = request.args.get('cursor')
+        after = decode_cursor(cursor) if cursor else None
+        rows = appointment_repo.page(after=after, limit=limit + 1, **filters)
+        next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+        return jsonify({
+            "appointments": [appointment_to_dict(row) for row in rows[:limit]],
+            "next_cursor": next_cursor
+        })
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": f"Invalid pagination parameters: {str(e)}"}), 400
+    except Exception as e:
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+
+@app.route('/admin/appointments/bulk', methods=['POST'])
+def bulk_appointments():
+    """Bulk reschedule or cancel for staff. Streams NDJSON progress: one `queued` line once the database
+    change is committed, an `item` line as each Calendar change finishes, then `done`."""
+    if not is_admin_request():
+        return jsonify({"error": "Admin token required"}), 403
+    data = request.get_json() or {}
+    try:
+        queued = bulk_change_appointments(
+            data.get("action"),
+            {name: data.get(name) for name in ("doctor", "department", "date_from", "date_to")},
+            new_date=data.get("new_date"), shift_days=data.get("shift_days")
+        )
+    except BulkConflictError as e:
+        return jsonify({"error": f"Nothing was changed: {e}", "conflicts": [
+            {"event_id": row["event_id"], "doctor": row["doctor"], "date": row["appointment_date"],
+             "time": row["appointment_time"], "new_date": date, "new_time": time, "clashes_with": clash,
+             "reason": "clash" if clash else "closed"}
+            for row, date, time, clash in e.conflicts
+        ]}), 409
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": f"An error occurred: {str(e)}"}), 500
 
+    timeout = float(os.getenv("BULK_PROGRESS_TIMEOUT", "120"))
+    def generate():
+        yield json.dumps({"event": "queued", "action": data.get("action"), "count": len(queued)}) + "\n"
+        counts = {"done": 0, "failed": 0}
+        waiting = {}
+        for event_id, entry_id in queued:
+            if entry_id is None:
+                counts["done"] += 1
+                yield json.dumps({"event": "item", "event_id": event_id, "status": "done"}) + "\n"
+            else:
+                waiting[entry_id] = event_id
+        deadline = time_module.monotonic() + timeout
+        while waiting and time_module.monotonic() < deadline:
+            for entry_id, entry in appointment_repo.outbox_entries(list(waiting)).items():
+                if entry["status"] in counts:
+                    counts[entry["status"]] += 1
+                    del waiting[entry_id]
+                    yield json.dumps({"event": "item", "event_id": entry["event_id"], "status": entry["status"],
+                                      "attempts": entry["attempts"], "error": entry["last_error"]}) + "\n"
+            if waiting:
+                time_module.sleep(0.25)
+        yield json.dumps({"event": "done", "synced": counts["done"], "failed": counts["failed"], "pending": len(waiting)}) + "\n"
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
 @app.route('/clear_appointments', methods=['POST'])
 def clear_appointments():
     try:
-        conn = sqlite3.connect('appointments.db')
-        cursor = conn.cursor()
-        cursor.execute('DELETE FROM appointments')
-        conn.commit()
-        conn.close()
+        appointment_repo.clear()
         return jsonify({"status": "success", "message": "All appointments cleared"})
     except Exception as e:
         return jsonify({"error": f"An error occurred: {str(e)}"}), 500
 
+# Development server. In production: gunicorn -c gunicorn.conf.py wsgi:app
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,466 @@
+import json
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+class ConnectionPool:
+    """Fixed-size pool of SQLite connections in WAL mode, safe to share between request threads."""
+
+    def __init__(self, path, size=5, busy_timeout_ms=5000):
+        self.path = path
+        self.size = size
+        self.busy_timeout_ms = busy_timeout_ms
+        self.connections = queue.LifoQueue(maxsize=size)
+        self.created = 0
+        self.lock = threading.Lock()
+
+    def _connect(self):
+        # Autocommit mode: transactions are opened explicitly with BEGIN IMMEDIATE in transaction()
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=self.busy_timeout_ms / 1000,
+                               isolation_level=None, cached_statements=128)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        try:
+            conn = self.connections.get_nowait()
+        except queue.Empty:
+            with self.lock:
+                can_create = self.created < self.size
+                if can_create:
+                    self.created += 1
+            if can_create:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self.lock:
+                        self.created -= 1
+                    raise
+            else:
+                try:
+                    conn = self.connections.get(timeout=self.busy_timeout_ms / 1000)
+                except queue.Empty:
+                    raise sqlite3.OperationalError("Timed out waiting for a database connection")
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self.connections.put(conn)
+
+    @contextmanager
+    def transaction(self):
+        """Yields a connection inside BEGIN IMMEDIATE; commits on success and rolls back on any error."""
+        with self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+
+    def close_all(self):
+        while True:
+            try:
+                self.connections.get_nowait().close()
+            except queue.Empty:
+                break
+        with self.lock:
+            self.created = 0
+
+class SlotTakenError(Exception):
+    """The doctor already has an appointment overlapping the requested slot."""
+
+    def __init__(self, doctor, date, time, event_id):
+        super().__init__(f"{doctor} is already booked at {date} {time}")
+        self.doctor = doctor
+        self.date = date
+        self.time = time
+        self.event_id = event_id
+
+class BulkConflictError(Exception):
+    """A bulk reschedule would double-book doctors or move appointments outside opening hours; nothing was changed.
+
+    `conflicts` lists (row, new_date, new_time, clashing_event_id) for each appointment that can't move;
+    clashing_event_id is None when the new slot is outside opening hours.
+    """
+
+    def __init__(self, conflicts):
+        super().__init__(f"{len(conflicts)} appointments would clash with other bookings or fall outside opening hours")
+        self.conflicts = conflicts
+
+def _minutes(time):
+    hours, mins = map(int, time.split(":"))
+    return hours * 60 + mins
+
+def _shift_time(time, minutes):
+    """Adds minutes to an HH:MM string, clamped to the same day."""
+    total = min(max(_minutes(time) + minutes, 0), 23 * 60 + 59)
+    return f"{total // 60:02d}:{total % 60:02d}"
+
+class AppointmentRepository:
+    """All reads and writes of the appointments table go through here.
+
+    Listeners are called as listener(change, **details) after each committed change: "insert",
+    "reschedule", "delete", or "reload" after bulk changes.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.listeners = []
+
+    def _notify(self, change, **details):
+        for listener in self.listeners:
+            try:
+                listener(change, **details)
+            except Exception as e:
+                print(f"Appointment listener error: {str(e)}")
+
+    @staticmethod
+    def _check_slot(conn, doctor, date, time, duration_minutes, event_id=None):
+        """Raises SlotTakenError if `doctor` has another appointment starting within duration_minutes of `time`.
+        Run inside the write transaction so the check and the write are atomic."""
+        clash = conn.execute('''SELECT event_id FROM appointments
+            WHERE doctor = ? AND appointment_date = ? AND appointment_time BETWEEN ? AND ?
+            AND (? IS NULL OR event_id IS NOT ?) LIMIT 1''',
+            (doctor, date, _shift_time(time, 1 - duration_minutes), _shift_time(time, duration_minutes - 1),
+             event_id, event_id)).fetchone()
+        if clash:
+            raise SlotTakenError(doctor, date, time, clash[0])
+
+    def initialize(self):
+        with self.pool.transaction() as conn:
+            conn.execute('''CREATE TABLE IF NOT EXISTS appointments (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                appointment_date TEXT NOT NULL,
+                appointment_time TEXT NOT NULL,
+                patient_name TEXT NOT NULL,
+                phone_number TEXT,
+                email TEXT,
+                city TEXT,
+                message TEXT,
+                event_id TEXT,
+                thread_id TEXT,
+                department TEXT,
+                doctor TEXT
+            )''')
+            # Add columns if they don't exist (for backward compatibility)
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(appointments)")]
+            if "department" not in columns:
+                conn.execute("ALTER TABLE appointments ADD COLUMN department TEXT")
+            if "doctor" not in columns:
+                conn.execute("ALTER TABLE appointments ADD COLUMN doctor TEXT")
+            if "sync_status" not in columns:
+                conn.execute("ALTER TABLE appointments ADD COLUMN sync_status TEXT NOT NULL DEFAULT 'synced'")
+            # Dates are compared as strings: pad any stored before the tools wrote them as YYYY-MM-DD
+            for row in conn.execute("SELECT id, appointment_date FROM appointments WHERE length(appointment_date) < 10").fetchall():
+                try:
+                    year, month, day = map(int, row["appointment_date"].split("-"))
+                except ValueError:
+                    continue
+                conn.execute("UPDATE appointments SET appointment_date = ? WHERE id = ?",
+                             (f"{year:04d}-{month:02d}-{day:02d}", row["id"]))
+            # Calendar changes waiting to be sent to Google, written in the same transaction as the appointment row
+            conn.execute('''CREATE TABLE IF NOT EXISTS calendar_outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                event_id TEXT NOT NULL,
+                operation TEXT NOT NULL,
+                payload TEXT,
+                idempotency_key TEXT NOT NULL UNIQUE,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                last_error TEXT,
+                created_at REAL NOT NULL
+            )''')
+            outbox_columns = [row[1] for row in conn.execute("PRAGMA table_info(calendar_outbox)")]
+            if "owner" not in outbox_columns:
+                conn.execute("ALTER TABLE calendar_outbox ADD COLUMN owner TEXT")
+            if "lease_until" not in outbox_columns:
+                conn.execute("ALTER TABLE calendar_outbox ADD COLUMN lease_until REAL")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_calendar_outbox_due ON calendar_outbox (status, next_attempt_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_calendar_outbox_event ON calendar_outbox (event_id, status, id)")
+            # Lookups by event and thread, and the keyset order used for listing and filtering
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_appointments_event_id ON appointments (event_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_appointments_thread_id ON appointments (thread_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_appointments_schedule ON appointments (appointment_date, appointment_time, id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_appointments_department ON appointments (department, appointment_date, appointment_time, id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_appointments_doctor ON appointments (doctor, appointment_date, appointment_time, id)")
+
+    def _enqueue(self, conn, event_id, operation, payload, idempotency_key):
+        """Queues a Calendar change on the caller's transaction and returns the outbox entry id."""
+        conn.execute('''INSERT OR IGNORE INTO calendar_outbox
+            (event_id, operation, payload, idempotency_key, next_attempt_at, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)''',
+            (event_id, operation, json.dumps(payload), idempotency_key, time.time(), time.time()))
+        return conn.execute("SELECT id FROM calendar_outbox WHERE idempotency_key = ?", (idempotency_key,)).fetchone()[0]
+
+    @staticmethod
+    def _update_key(conn, event_id):
+        """Idempotency key for the next update of event_id: one per change, so moving an appointment back
+        to an earlier slot queues a new patch instead of matching the one already sent."""
+        version = conn.execute("SELECT COUNT(*) FROM calendar_outbox WHERE event_id = ? AND operation = 'update'",
+                               (event_id,)).fetchone()[0] + 1
+        return f"update:{event_id}:{version}"
+
+    def insert(self, date, time, name, phone, email, city, message, event_id, thread_id, department, doctor,
+               event_body=None, duration_minutes=None):
+        """Stores the appointment; with event_body, also queues the Calendar insert in the same transaction.
+        With duration_minutes, raises SlotTakenError instead of double-booking the doctor."""
+        with self.pool.transaction() as conn:
+            if duration_minutes and doctor:
+                self._check_slot(conn, doctor, date, time, duration_minutes)
+            cursor = conn.execute('''INSERT INTO appointments
+                (appointment_date, appointment_time, patient_name, phone_number, email, city, message, event_id, thread_id, department, doctor, sync_status)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                (date, time, name, phone, email, city, message, event_id, thread_id, department, doctor,
+                 "pending" if event_body else "synced"))
+            if event_body:
+                self._enqueue(conn, event_id, "insert", event_body, f"insert:{event_id}")
+        self._notify("insert", id=cursor.lastrowid, event_id=event_id, doctor=doctor, date=date, time=time)
+        return cursor.lastrowid
+
+    def find_by_event_id(self, event_id):
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT * FROM appointments WHERE event_id = ?", (event_id,)).fetchone()
+
+    def reschedule(self, event_id, date, time, event_patch=None, duration_minutes=None):
+        with self.pool.transaction() as conn:
+            if duration_minutes:
+                row = conn.execute("SELECT doctor FROM appointments WHERE event_id = ?", (event_id,)).fetchone()
+                if row and row["doctor"]:
+                    self._check_slot(conn, row["doctor"], date, time, duration_minutes, event_id=event_id)
+            updated = conn.execute(
+                "UPDATE appointments SET appointment_date = ?, appointment_time = ?, sync_status = ? WHERE event_id = ?",
+                (date, time, "pending" if event_patch else "synced", event_id)).rowcount
+            if updated and event_patch:
+                self._enqueue(conn, event_id, "update", event_patch, self._update_key(conn, event_id))
+        if updated:
+            self._notify("reschedule", event_id=event_id, date=date, time=time)
+        return updated
+
+    def delete(self, event_id, sync_calendar=False):
+        with self.pool.transaction() as conn:
+            deleted = conn.execute("DELETE FROM appointments WHERE event_id = ?", (event_id,)).rowcount
+            if deleted and sync_calendar:
+                self._enqueue(conn, event_id, "delete", None, f"delete:{event_id}")
+        if deleted:
+            self._notify("delete", event_id=event_id)
+        return deleted
+
+    @staticmethod
+    def _bulk_conflicts(conn, moves, duration_minutes):
+        """Moves in `moves` [(row, new_date, new_time, event_patch)] that would overlap an appointment
+        staying put or another moved one, as (row, new_date, new_time, clashing_event_id)."""
+        moving = {row["id"] for row, *_ in moves}
+        conflicts = []
+        placed = {}
+        for row, new_date, new_time, _ in moves:
+            doctor = row["doctor"]
+            if not doctor:
+                continue
+            clash = None
+            for other in conn.execute('''SELECT id, event_id FROM appointments
+                    WHERE doctor = ? AND appointment_date = ? AND appointment_time BETWEEN ? AND ?''',
+                    (doctor, new_date, _shift_time(new_time, 1 - duration_minutes),
+                     _shift_time(new_time, duration_minutes - 1))):
+                if other["id"] not in moving:
+                    clash = other["event_id"]
+                    break
+            if clash is None:
+                start = _minutes(new_time)
+                for other_start, other_event_id in placed.get((doctor, new_date), ()):
+                    if abs(other_start - start) < duration_minutes:
+                        clash = other_event_id
+                        break
+            if clash is None:
+                placed.setdefault((doctor, new_date), []).append((_minutes(new_time), row["event_id"]))
+            else:
+                conflicts.append((row, new_date, new_time, clash))
+        return conflicts
+
+    @staticmethod
+    def _closed_moves(moves, hours, duration_minutes):
+        """Moves whose new slot isn't within opening hours, `hours` being {weekday: (open, close)} in minutes."""
+        closed = []
+        for row, new_date, new_time, _ in moves:
+            opening, closing = hours.get(datetime.strptime(new_date, "%Y-%m-%d").weekday(), (0, 0))
+            if not opening <= _minutes(new_time) <= closing - duration_minutes:
+                closed.append((row, new_date, new_time, None))
+        return closed
+
+    def bulk_reschedule(self, plan, duration_minutes=None, hours=None, **filters):
+        """Moves every appointment matching `filters` in one transaction and queues the Calendar patches.
+
+        `plan(row)` returns (new_date, new_time, event_patch). Raises BulkConflictError and changes
+        nothing if, with `hours`, any new slot is outside opening hours or, with duration_minutes, any
+        moved appointment would overlap another of the doctor's appointments, moved or not. Returns
+        [(event_id, outbox_id), ...]; outbox_id is None for rows without a Calendar event.
+        """
+        queued = []
+        with self.pool.transaction() as conn:
+            moves = [(row, *plan(row)) for row in self._select(conn, **filters)]
+            conflicts = self._closed_moves(moves, hours, duration_minutes or 0) if hours is not None else []
+            if duration_minutes:
+                closed = {row["id"] for row, *_ in conflicts}
+                conflicts += self._bulk_conflicts(
+                    conn, [move for move in moves if move[0]["id"] not in closed], duration_minutes)
+            if conflicts:
+                raise BulkConflictError(conflicts)
+            for row, new_date, new_time, event_patch in moves:
+                has_event = bool(row["event_id"])
+                conn.execute(
+                    "UPDATE appointments SET appointment_date = ?, appointment_time = ?, sync_status = ? WHERE id = ?",
+                    (new_date, new_time, "pending" if has_event else "synced", row["id"]))
+                if has_event:
+                    entry_id = self._enqueue(conn, row["event_id"], "update", event_patch,
+                                             self._update_key(conn, row["event_id"]))
+                    queued.append((row["event_id"], entry_id))
+                else:
+                    queued.append((row["event_id"], None))
+        self._notify("reload")
+        return queued
+
+    def bulk_delete(self, **filters):
+        """Deletes every appointment matching `filters` in one transaction and queues the Calendar deletes."""
+        queued = []
+        with self.pool.transaction() as conn:
+            rows = self._select(conn, **filters)
+            for row in rows:
+                conn.execute("DELETE FROM appointments WHERE id = ?", (row["id"],))
+                entry_id = None
+                if row["event_id"]:
+                    entry_id = self._enqueue(conn, row["event_id"], "delete", None, f"delete:{row['event_id']}")
+                queued.append((row["event_id"], entry_id))
+        self._notify("reload")
+        return queued
+
+    # Calendar outbox
+
+    def claim_outbox(self, owner, limit=20, lease_seconds=300):
+        """Claims due outbox entries for `owner` and returns them, so each is sent by one worker at a time.
+
+        Claimed entries are 'in_flight' until finished or retried; one whose lease ran out (its worker
+        died mid-send) goes back to pending. An entry queued behind an earlier pending or in-flight entry
+        for the same event waits, so changes to one event are applied in order across workers.
+        """
+        now = time.time()
+        with self.pool.transaction() as conn:
+            conn.execute('''UPDATE calendar_outbox SET status = 'pending', owner = NULL, lease_until = NULL
+                WHERE status = 'in_flight' AND lease_until < ?''', (now,))
+            ids = [row[0] for row in conn.execute('''SELECT o.id FROM calendar_outbox o
+                WHERE o.status = 'pending' AND o.next_attempt_at <= ?
+                AND NOT EXISTS (
+                    SELECT 1 FROM calendar_outbox p
+                    WHERE p.event_id = o.event_id AND p.status IN ('pending', 'in_flight') AND p.id < o.id
+                )
+                ORDER BY o.id LIMIT ?''', (now, limit))]
+            if not ids:
+                return []
+            placeholders = ",".join("?" * len(ids))
+            conn.execute(f"UPDATE calendar_outbox SET status = 'in_flight', owner = ?, lease_until = ? WHERE id IN ({placeholders})",
+                         [owner, now + lease_seconds, *ids])
+            return conn.execute(f"SELECT * FROM calendar_outbox WHERE id IN ({placeholders}) ORDER BY id", ids).fetchall()
+
+    def finish_outbox(self, entry_id, event_id, status, error=None):
+        """Marks an outbox entry done or failed and updates the appointment's sync_status to match."""
+        with self.pool.transaction() as conn:
+            conn.execute("UPDATE calendar_outbox SET status = ?, last_error = ?, owner = NULL, lease_until = NULL WHERE id = ?",
+                         (status, error, entry_id))
+            if status == "failed":
+                sync_status = "failed"
+            else:
+                pending = conn.execute(
+                    "SELECT 1 FROM calendar_outbox WHERE event_id = ? AND status IN ('pending', 'in_flight') LIMIT 1",
+                    (event_id,)).fetchone()
+                sync_status = "pending" if pending else "synced"
+            conn.execute("UPDATE appointments SET sync_status = ? WHERE event_id = ?", (sync_status, event_id))
+
+    def retry_outbox(self, entry_id, attempts, next_attempt_at, error):
+        """Releases a claimed entry back to pending, due again at next_attempt_at."""
+        with self.pool.transaction() as conn:
+            conn.execute('''UPDATE calendar_outbox SET status = 'pending', owner = NULL, lease_until = NULL,
+                attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?''',
+                (attempts, next_attempt_at, error, entry_id))
+
+    def outbox_entries(self, entry_ids):
+        """Current status of the given outbox entries, keyed by id."""
+        if not entry_ids:
+            return {}
+        placeholders = ",".join("?" * len(entry_ids))
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                f"SELECT id, event_id, operation, status, attempts, last_error FROM calendar_outbox WHERE id IN ({placeholders})",
+                list(entry_ids)).fetchall()
+        return {row["id"]: row for row in rows}
+
+    def outbox_counts(self):
+        with self.pool.connection() as conn:
+            return dict(conn.execute("SELECT status, COUNT(*) FROM calendar_outbox GROUP BY status").fetchall())
+
+    @staticmethod
+    def _filter_clauses(date_from=None, date_to=None, department=None, doctor=None, thread_id=None):
+        clauses, params = [], []
+        if date_from:
+            clauses.append("appointment_date >= ?")
+            params.append(date_from)
+        if date_to:
+            clauses.append("appointment_date <= ?")
+            params.append(date_to)
+        for column, value in (("department", department), ("doctor", doctor), ("thread_id", thread_id)):
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        return clauses, params
+
+    def _select(self, conn, **filters):
+        clauses, params = self._filter_clauses(**filters)
+        if not clauses:
+            raise ValueError("Bulk changes need at least one filter")
+        query = "SELECT * FROM appointments WHERE " + " AND ".join(clauses)
+        return conn.execute(query + " ORDER BY appointment_date, appointment_time, id", params).fetchall()
+
+    def page(self, after=None, limit=100, **filters):
+        """Returns up to `limit` rows in schedule order, starting after the (date, time, id) key `after`.
+
+        Filters: date_from, date_to, department, doctor, thread_id.
+        """
+        clauses, params = self._filter_clauses(**filters)
+        if after:
+            clauses.insert(0, "(appointment_date, appointment_time, id) > (?, ?, ?)")
+            params[:0] = after
+        query = "SELECT * FROM appointments"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY appointment_date, appointment_time, id LIMIT ?"
+        params.append(limit)
+        with self.pool.connection() as conn:
+            return conn.execute(query, params).fetchall()
+
+    def iterate(self, batch_size=500, **filters):
+        """Yields every matching row, one keyset page at a time so no connection is held between batches."""
+        after = None
+        while True:
+            rows = self.page(after=after, limit=batch_size, **filters)
+            yield from rows
+            if len(rows) < batch_size:
+                break
+            last = rows[-1]
+            after = (last["appointment_date"], last["appointment_time"], last["id"])
+
+    def clear(self):
+        """Deletes every appointment and cancels their queued Calendar inserts and updates, so the sync
+        worker doesn't create events for appointments that no longer exist. Queued deletes still go out."""
+        with self.pool.transaction() as conn:
+            conn.execute("DELETE FROM appointments")
+            conn.execute("UPDATE calendar_outbox SET status = 'cancelled', owner = NULL, lease_until = NULL "
+                         "WHERE status IN ('pending', 'in_flight') AND operation != 'delete'")
+        self._notify("reload")
@@ -0,0 +1,164 @@
+import bisect
+import re
+import threading
+from datetime import datetime, timedelta
+
+from clinic_index import normalize
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+def doctor_key(name):
+    return normalize(name or "").removeprefix("dr ")
+
+def to_minutes(time):
+    hours, minutes = map(int, time.split(":"))
+    return hours * 60 + minutes
+
+def to_time(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+def _clock_minutes(text):
+    match = re.match(r"(\d{1,2})(?::(\d{2}))?\s*([AaPp][Mm])", text.strip())
+    hours, minutes, meridiem = int(match.group(1)), int(match.group(2) or 0), match.group(3).lower()
+    return (hours % 12 + (12 if meridiem == "pm" else 0)) * 60 + minutes
+
+def parse_operating_hours(operating_hours):
+    """Turns clinic.json hours such as {"monday_saturday": "8 AM – 8 PM"} into {weekday: (open, close)} minutes."""
+    hours = {}
+    for days, span in operating_hours.items():
+        names = days.split("_")
+        if not all(name in WEEKDAYS for name in names):
+            continue
+        first, last = WEEKDAYS.index(names[0]), WEEKDAYS.index(names[-1])
+        try:
+            opening, closing = re.split(r"\s*[–-]\s*", span, maxsplit=1)
+            span_minutes = (_clock_minutes(opening), _clock_minutes(closing))
+        except (AttributeError, ValueError):
+            continue
+        for weekday in range(first, last + 1):
+            hours[weekday] = span_minutes
+    return hours
+
+class AvailabilityIndex:
+    """Per-doctor, per-day sorted arrays of booked start times, kept current through repository listeners.
+
+    Lookups are a bisect per candidate slot. The index only suggests slots; AppointmentRepository
+    re-checks the doctor's schedule inside the booking transaction, so a stale index (e.g. another
+    worker booked meanwhile) can't cause a double booking.
+    """
+
+    def __init__(self, repo, clinic_index, duration_minutes=60, slot_minutes=60, operating_hours=None):
+        self.repo = repo
+        self.duration = duration_minutes
+        self.step = slot_minutes
+        self.operating_hours = operating_hours
+        self.set_clinic_index(clinic_index)
+        self.lock = threading.Lock()
+        self.starts = {}    # (doctor_key, date) -> sorted start minutes
+        self.bookings = {}  # event_id (or row id) -> (doctor_key, date, start)
+        repo.listeners.append(self.on_change)
+
+    # Maintenance
+
+    def set_clinic_index(self, clinic_index):
+        """Switches to a reloaded clinic.json (roster and operating hours); booked slots are unaffected."""
+        hospital = clinic_index.data.get("hospital", {})
+        self.hours = self.operating_hours or parse_operating_hours(hospital.get("operating_hours", {})) \
+            or {weekday: (8 * 60, 20 * 60) for weekday in range(6)}
+        self.clinic_index = clinic_index
+
+    def load(self, from_date=None):
+        """Rebuilds the index from the appointments table, from `from_date` (default today) onwards."""
+        from_date = from_date or datetime.now().strftime("%Y-%m-%d")
+        starts, bookings = {}, {}
+        for row in self.repo.iterate(batch_size=2000, date_from=from_date):
+            if row["doctor"]:
+                self._add(starts, bookings, row["event_id"] or row["id"], row["doctor"],
+                          row["appointment_date"], row["appointment_time"])
+        with self.lock:
+            self.starts, self.bookings = starts, bookings
+
+    @staticmethod
+    def _add(starts, bookings, key, doctor, date, time):
+        try:
+            start = to_minutes(time)
+        except ValueError:
+            return
+        day = (doctor_key(doctor), date)
+        bisect.insort(starts.setdefault(day, []), start)
+        bookings[key] = (day[0], date, start)
+
+    def _remove(self, key):
+        booking = self.bookings.pop(key, None)
+        if booking:
+            day = booking[:2]
+            day_starts = self.starts.get(day, [])
+            index = bisect.bisect_left(day_starts, booking[2])
+            if index < len(day_starts) and day_starts[index] == booking[2]:
+                day_starts.pop(index)
+
+    def on_change(self, change, **details):
+        if change == "reload":
+            self.load()
+            return
+        with self.lock:
+            if change == "insert" and details.get("doctor"):
+                self._add(self.starts, self.bookings, details["event_id"] or details["id"],
+                          details["doctor"], details["date"], details["time"])
+            elif change == "reschedule":
+                booking = self.bookings.get(details["event_id"])
+                if booking:
+                    self._remove(details["event_id"])
+                    day_starts = self.starts.setdefault((booking[0], details["date"]), [])
+                    bisect.insort(day_starts, to_minutes(details["time"]))
+                    self.bookings[details["event_id"]] = (booking[0], details["date"], to_minutes(details["time"]))
+            elif change == "delete":
+                self._remove(details["event_id"])
+
+    # Queries
+
+    def _overlaps(self, day_starts, start):
+        # Every appointment lasts `duration`, so only the nearest booked start on each side can overlap
+        index = bisect.bisect_left(day_starts, start)
+        if index < len(day_starts) and day_starts[index] < start + self.duration:
+            return True
+        return index > 0 and day_starts[index - 1] + self.duration > start
+
+    def is_free(self, doctor, date, time):
+        with self.lock:
+            return not self._overlaps(self.starts.get((doctor_key(doctor), date), []), to_minutes(time))
+
+    def free_slots(self, doctor, date, after=None):
+        """Free start times ("HH:MM") for the doctor on date (YYYY-MM-DD), optionally only after a datetime."""
+        day = datetime.strptime(date, "%Y-%m-%d")
+        hours = self.hours.get(day.weekday())
+        if not hours:
+            return []
+        opening, closing = hours
+        if after is not None and after.strftime("%Y-%m-%d") == date:
+            earliest = after.hour * 60 + after.minute
+            opening = max(opening, -(-earliest // self.step) * self.step)
+        elif after is not None and after.strftime("%Y-%m-%d") > date:
+            return []
+        with self.lock:
+            day_starts = self.starts.get((doctor_key(doctor), date), [])
+            return [
+                to_time(start) for start in range(opening, closing - self.duration + 1, self.step)
+                if not self._overlaps(day_starts, start)
+            ]
+
+    def next_free_slots(self, department, count=5, after=None, days=14):
+        """The earliest `count` free slots across the department's doctors: [{"doctor", "date", "time"}]."""
+        doctors = self.clinic_index.doctors_by_department.get(department, [])
+        after = after or datetime.now()
+        found = []
+        for offset in range(days):
+            date = (after + timedelta(days=offset)).strftime("%Y-%m-%d")
+            day_slots = [
+                (time, doctor["name"]) for doctor in doctors for time in self.free_slots(doctor["name"], date, after)
+            ]
+            for time, name in sorted(day_slots):
+                found.append({"doctor": name, "date": date, "time": time})
+                if len(found) == count:
+                    return found
+        return found
@@ -0,0 +1,87 @@
+# Slot lookups from the in-memory AvailabilityIndex against querying SQLite for each candidate slot,
+# plus a race: many threads booking the same doctor and slot at once must produce exactly one booking.
+# Run from the repository root: python benchmarks/availability_bench.py [appointments] [racers]
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from appointments_db import AppointmentRepository, ConnectionPool, SlotTakenError
+from availability import AvailabilityIndex
+from clinic_index import load_clinic_index
+
+def sql_free_slots(repo, doctor, date):
+    # The obvious implementation: one indexed query per candidate hour between 8 AM and 8 PM
+    free = []
+    with repo.pool.connection() as conn:
+        for hour in range(8, 20):
+            slot = f"{hour:02d}:00"
+            taken = conn.execute(
+                "SELECT 1 FROM appointments WHERE doctor = ? AND appointment_date = ? AND appointment_time = ? LIMIT 1",
+                (doctor, date, slot)).fetchone()
+            if not taken:
+                free.append(slot)
+    return free
+
+def timed(fn, repeats):
+    started = time.perf_counter()
+    for _ in range(repeats):
+        result = fn()
+    return (time.perf_counter() - started) / repeats * 1e6, result
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    racers = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    clinic_index = load_clinic_index("clinic.json")
+    doctors = [(department, doctor["name"]) for department, listed in clinic_index.doctors_by_department.items()
+               for doctor in listed]
+    start_day = datetime.now() + timedelta(days=1)
+    rng = random.Random(0)
+
+    with tempfile.TemporaryDirectory() as directory:
+        repo = AppointmentRepository(ConnectionPool(os.path.join(directory, "appointments.db"), size=racers))
+        repo.initialize()
+        for n in range(count):
+            department, doctor = rng.choice(doctors)
+            date = (start_day + timedelta(days=rng.randrange(30))).strftime("%Y-%m-%d")
+            repo.insert(date, f"{rng.randrange(8, 20):02d}:00", f"Patient {n}", "555-0100", "p@example.com",
+                        "Wellness City", "Checkup", f"evt{n}", f"thread-{n}", department, doctor)
+        index = AvailabilityIndex(repo, clinic_index)
+        load_started = time.perf_counter()
+        index.load()
+        load_ms = (time.perf_counter() - load_started) * 1000
+
+        department, doctor = doctors[0]
+        date = (start_day + timedelta(days=3)).strftime("%Y-%m-%d")
+        sql_us, sql_slots = timed(lambda: sql_free_slots(repo, doctor, date), 200)
+        index_us, index_slots = timed(lambda: index.free_slots(doctor, date), 2000)
+        next_us, next_slots = timed(lambda: index.next_free_slots(department, count=5, after=start_day), 2000)
+
+        # Everyone wants the same free slot
+        target = (start_day + timedelta(days=40)).strftime("%Y-%m-%d")
+        outcomes = []
+        def race(n):
+            try:
+                repo.insert(target, "10:00", f"Racer {n}", "555-0100", "r@example.com", "Wellness City", "Checkup",
+                            f"race{n}", f"race-{n}", department, doctor, duration_minutes=60)
+                outcomes.append("booked")
+            except SlotTakenError:
+                outcomes.append("rejected")
+        threads = [threading.Thread(target=race, args=(n,)) for n in range(racers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        overlapping = index.is_free(doctor, target, "10:30")
+
+    print(f"appointments: {count}, index load: {load_ms:.1f} ms")
+    print(f"free slots for {doctor} on {date}: SQL per slot {sql_us:.0f} us, index {index_us:.1f} us "
+          f"(same answer: {sql_slots == index_slots})")
+    print(f"next 5 free slots in {department}: {next_us:.1f} us")
+    print(f"{racers} concurrent bookings of one slot: {outcomes.count('booked')} booked, "
+          f"{outcomes.count('rejected')} rejected; 10:30 shown free afterwards: {overlapping}")
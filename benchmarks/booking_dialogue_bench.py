@@ -0,0 +1,134 @@
+# LLM calls per completed booking over a scripted conversation corpus. Before: every user turn is an
+# assistant LLM call (the prompt collects one field per turn), plus one more to phrase the booking
+# tool's result. After: the rule-based BookingForm answers the turns it understands and only hands the
+# rest to the LLM. Also totals the message history re-sent to the model, in characters. A second corpus
+# of untidy answers ("Fever since Tuesday" as the reason, "this is urgent", "in Cardiology") checks that
+# the form doesn't file them under the wrong field: it counts booked fields that differ from the expected ones.
+# Run from the repository root: python benchmarks/booking_dialogue_bench.py
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from appointments_db import AppointmentRepository, ConnectionPool
+from availability import AvailabilityIndex
+from booking_form import BookingForm
+from clinic_index import load_clinic_index
+
+NOW = datetime(2030, 1, 7, 9, 0)  # a Monday morning
+SYSTEM_PROMPT_CHARS = 2600        # size of primary_assistant_prompt's system message
+
+# (recent assistant text before the conversation, user turns)
+CORPUS = [
+    ("", ["I want to book an appointment", "Cardiology", "2030-01-09", "14:30", "Rahul Mehta",
+          "9876543210", "rahul@example.com", "Pune", "Chest pain when climbing stairs", "yes"]),
+    ("", ["Book an appointment with Dr. Priya Sharma on 2030-01-10 at 11:00. My name is Asha Rao, I live in Mumbai, "
+          "asha.rao@example.com, +91 98200 12345", "Frequent migraines", "yes"]),
+    ("Based on your symptoms, I recommend Dr. Rohan Bhatia in Orthopedics.",
+     ["ok, book an appointment please", "tomorrow", "3 pm", "my name is Kiran Joshi", "98450 67890",
+      "kiran.joshi@example", "kiran.joshi@example.com", "Bengaluru", "Knee pain after running", "confirm"]),
+    ("", ["schedule an appointment with dr kapoor", "Anil Kapoor", "12/01/2030", "10:00",
+          "Meera Pillai", "9123456780", "meera@example.com", "Chennai", "Follow-up after chemotherapy", "yes"]),
+    ("", ["I need an appointment", "pediatrics", "next wednesday", "what are the visiting hours?", "09:00",
+          "Sanjay Gupta", "98111 22233", "sanjay@example.com", "Delhi", "Vaccination for my daughter", "yes"]),
+    ("", ["book an appointment with Dr. Rajesh Verma for 2030-01-08", "10:00", "11:00", "Vivek Nair",
+          "9988776655", "vivek@example.com", "Kochi", "Palpitations", "yes"]),
+    ("", ["can I book an appointment for dermatology?", "the day after tomorrow at 4pm",
+          "I'm Farah Khan", "farah@example.com 9090909090", "I live in Hyderabad", "Skin rash on arms", "yes"]),
+    ("", ["book appointment", "I'm not sure, I keep getting dizzy and tired", "General Medicine", "2030-01-11",
+          "12:00", "Lata Iyer", "9000011111", "lata@example.com", "Nagpur", "Dizziness and fatigue", "yes"]),
+]
+
+# (recent assistant text, user turns, fields the booking must end up with)
+UNTIDY = [
+    ("", ["I want to book an appointment in Cardiology", "2030-01-09", "15:00", "Rahul Mehta", "9876543210",
+          "rahul@example.com", "Pune", "Fever since Tuesday", "yes"],
+     {"date": "2030-01-09", "time": "15:00", "city": "Pune", "user_message": "Fever since Tuesday"}),
+    ("", ["this is urgent, I need an appointment with Dr. Priya Sharma", "2030-01-10", "11:30", "I am Feeling dizzy",
+          "Asha Rao", "98200 12345", "asha@example.com", "in Mumbai", "chest pain since 10 am today", "yes"],
+     {"date": "2030-01-10", "time": "11:30", "name": "Asha Rao", "city": "Mumbai",
+      "user_message": "chest pain since 10 am today"}),
+    ("", ["I want to book an appointment in January with Dr Verma", "2030-01-14", "09:30", "I'm Kiran Joshi",
+          "98450 67890", "kiran@example.com", "Cardiology", "Nagpur", "yes", "Routine follow-up", "yes"],
+     {"date": "2030-01-14", "time": "09:30", "name": "Kiran Joshi", "city": "Nagpur", "user_message": "Routine follow-up"}),
+    ("", ["book an appointment with dr kapoor", "Anil Kapoor", "2030-01-10", "12:00", "Meera Pillai", "9123456780",
+          "meera@example.com", "change the date to 2030-01-11", "Chennai", "Swelling since January", "yes"],
+     {"date": "2030-01-11", "time": "12:00", "name": "Meera Pillai", "user_message": "Swelling since January"}),
+]
+
+def history_chars(history):
+    return SYSTEM_PROMPT_CHARS + sum(len(text) for text in history)
+
+def run_before(turns):
+    calls, sent, history = 0, 0, []
+    for n, text in enumerate(turns):
+        history.append(text)
+        calls += 1
+        sent += history_chars(history)
+        if n == len(turns) - 1:
+            # The model emits the tool call, then is called again to phrase the tool result
+            calls += 1
+            sent += history_chars(history) + 200
+        history.append("x" * 120)  # the assistant's question or reply
+    return calls, sent
+
+def run_after(form, recent, turns):
+    calls, sent, history, booking, booked = 0, 0, [recent] if recent else [], None, None
+    for text in turns:
+        history.append(text)
+        step = form.step(booking, text, recent)
+        booking = step["booking"]
+        if step["action"] == "llm":
+            calls += 1
+            sent += history_chars(history)
+            history.append("x" * 120)
+        elif step["action"] == "book":
+            outcome = form.after_booking(booking, "Appointment successfully booked. Event ID: abc.")
+            booking, booked = outcome["booking"], step["args"]
+            history.append(outcome["reply"])
+        else:
+            history.append(step["reply"])
+        recent = history[-1]
+    return calls, sent, booked
+
+if __name__ == "__main__":
+    clinic_index = load_clinic_index("clinic.json")
+    with tempfile.TemporaryDirectory() as directory:
+        repo = AppointmentRepository(ConnectionPool(os.path.join(directory, "appointments.db")))
+        repo.initialize()
+        # Dr. Verma's 10:00 on 2030-01-08 is taken, so conversation 6 has to pick another slot
+        repo.insert("2030-01-08", "10:00", "Existing Patient", "", "", "", "", "evt-existing", "t", "Cardiology", "Dr. Rajesh Verma")
+        availability = AvailabilityIndex(repo, clinic_index)
+        availability.load(from_date="2030-01-01")
+        form = BookingForm(clinic_index, availability, now=lambda: NOW)
+
+        before_calls = before_sent = after_calls = after_sent = completed = 0
+        started = time.perf_counter()
+        for recent, turns in CORPUS:
+            calls, sent = run_before(turns)
+            before_calls += calls
+            before_sent += sent
+            calls, sent, booked = run_after(form, recent, turns)
+            after_calls += calls
+            after_sent += sent
+            completed += booked is not None
+        form_ms = (time.perf_counter() - started) * 1000
+
+        untidy_completed, wrong = 0, []
+        for recent, turns, expected in UNTIDY:
+            _, _, booked = run_after(form, recent, turns)
+            untidy_completed += booked is not None
+            wrong.extend(f"{field}={(booked or {}).get(field)!r} (expected {value!r})"
+                         for field, value in expected.items() if (booked or {}).get(field) != value)
+
+    bookings = len(CORPUS)
+    print(f"conversations: {bookings}, user turns: {sum(len(turns) for _, turns in CORPUS)}, "
+          f"completed by the form: {completed}/{bookings}")
+    print(f"before: {before_calls / bookings:.1f} LLM calls per booking, {before_sent / bookings / 1000:.1f}k prompt chars per booking")
+    print(f"after:  {after_calls / bookings:.1f} LLM calls per booking, {after_sent / bookings / 1000:.1f}k prompt chars per booking")
+    print(f"form time for the whole corpus: {form_ms:.1f} ms")
+    print(f"untidy answers: completed {untidy_completed}/{len(UNTIDY)}, "
+          f"wrong fields: {len(wrong)}{' - ' + '; '.join(wrong) if wrong else ''}")
@@ -0,0 +1,64 @@
+# Booking throughput under concurrent writers: a fresh sqlite3.connect per booking (the old tool code)
+# against the pooled WAL repository in appointments_db.py.
+# Run from the repository root: python benchmarks/booking_throughput.py [writers] [bookings_per_writer]
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from appointments_db import AppointmentRepository, ConnectionPool
+
+def booking(n):
+    return ("2025-12-25", f"{9 + n % 10:02d}:00", f"Patient {n}", "555-0100", f"p{n}@example.com",
+            "Wellness City", "Routine checkup", f"evt{n}", f"thread-{n}", "Cardiology", "Dr. Rajesh Verma")
+
+def old_insert(path, values):
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    cursor.execute('''INSERT INTO appointments
+        (appointment_date, appointment_time, patient_name, phone_number, email, city, message, event_id, thread_id, department, doctor)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', values)
+    conn.commit()
+    conn.close()
+
+def run(writers, per_writer, insert):
+    errors = []
+    def write(offset):
+        for n in range(offset, offset + per_writer):
+            try:
+                insert(booking(n))
+            except sqlite3.Error as e:
+                errors.append(str(e))
+    threads = [threading.Thread(target=write, args=(w * per_writer,)) for w in range(writers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, errors
+
+if __name__ == "__main__":
+    writers = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    per_writer = int(sys.argv[2]) if len(sys.argv) > 2 else 250
+    total = writers * per_writer
+    with tempfile.TemporaryDirectory() as directory:
+        old_path = os.path.join(directory, "old.db")
+        # The old code used SQLite defaults: rollback journal, new connection per booking
+        schema_pool = ConnectionPool(old_path)
+        AppointmentRepository(schema_pool).initialize()
+        schema_pool.close_all()
+        with sqlite3.connect(old_path) as conn:
+            conn.execute("PRAGMA journal_mode=DELETE")
+        old_seconds, old_errors = run(writers, per_writer, lambda values: old_insert(old_path, values))
+
+        repo = AppointmentRepository(ConnectionPool(os.path.join(directory, "new.db"), size=writers))
+        repo.initialize()
+        new_seconds, new_errors = run(writers, per_writer, lambda values: repo.insert(*values))
+
+    print(f"writers: {writers}, bookings: {total}")
+    print(f"connect per booking: {total / old_seconds:.0f} bookings/s, errors: {len(old_errors)}")
+    print(f"pooled WAL repository: {total / new_seconds:.0f} bookings/s, errors: {len(new_errors)}")
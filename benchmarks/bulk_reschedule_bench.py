@@ -0,0 +1,74 @@
+# Moving a sick doctor's appointments: one update tool call per event (a DB lookup, events().get and
+# events().update each) against a single bulk transaction whose Calendar patches go out as batch requests.
+# Run from the repository root: python benchmarks/bulk_reschedule_bench.py [appointments] [latency_s]
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from appointments_db import AppointmentRepository, ConnectionPool
+from calendar_sync import CalendarSyncWorker
+from fake_calendar import FakeCalendarService
+
+DOCTOR = "Dr. Rajesh Verma"
+
+def event_times(date, time):
+    start = datetime.strptime(f"{date} {time}", "%Y-%m-%d %H:%M")
+    return {
+        "start": {"dateTime": start.isoformat(), "timeZone": "Asia/Kolkata"},
+        "end": {"dateTime": (start + timedelta(hours=1)).isoformat(), "timeZone": "Asia/Kolkata"},
+    }
+
+def seed(repo, calendar, count):
+    for n in range(count):
+        date, time_ = "2025-12-25", f"{9 + n % 10:02d}:{n % 6 * 10:02d}"
+        event_id = uuid.uuid4().hex
+        calendar.events_by_id[event_id] = dict(event_times(date, time_), id=event_id)
+        repo.insert(date, time_, f"Patient {n}", "555-0100", f"p{n}@example.com", "Wellness City",
+                    "Follow-up", event_id, f"thread-{n}", "Cardiology", DOCTOR)
+
+def plan(row):
+    return "2025-12-27", row["appointment_time"], event_times("2025-12-27", row["appointment_time"])
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 120
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.05
+
+    with tempfile.TemporaryDirectory() as directory:
+        old_calendar = FakeCalendarService(latency=latency)
+        old_repo = AppointmentRepository(ConnectionPool(os.path.join(directory, "old.db")))
+        old_repo.initialize()
+        seed(old_repo, old_calendar, count)
+        started = time.perf_counter()
+        for row in list(old_repo.iterate(doctor=DOCTOR)):
+            event_id = row["event_id"]
+            old_repo.find_by_event_id(event_id)
+            event = old_calendar.events().get(calendarId='primary', eventId=event_id).execute()
+            event.update(event_times("2025-12-27", row["appointment_time"]))
+            old_calendar.events().update(calendarId='primary', eventId=event_id, body=event).execute()
+            old_repo.reschedule(event_id, "2025-12-27", row["appointment_time"])
+        old_seconds = time.perf_counter() - started
+
+        calendar = FakeCalendarService(latency=latency)
+        repo = AppointmentRepository(ConnectionPool(os.path.join(directory, "new.db")))
+        repo.initialize()
+        seed(repo, calendar, count)
+        worker = CalendarSyncWorker(repo, lambda: calendar, poll_interval=0.05)
+        started = time.perf_counter()
+        queued = repo.bulk_reschedule(plan, doctor=DOCTOR)
+        commit_seconds = time.perf_counter() - started
+        while repo.outbox_counts().get("pending"):
+            worker.process_due()
+        new_seconds = time.perf_counter() - started
+        moved = sum(
+            calendar.events_by_id[event_id]["start"]["dateTime"].startswith("2025-12-27") for event_id, _ in queued)
+
+    print(f"appointments: {count}, calendar latency: {latency * 1000:.0f} ms")
+    print(f"one tool call per event: {old_seconds:.2f} s, {old_calendar.round_trips} Calendar round-trips")
+    print(f"bulk + batch: {new_seconds:.2f} s ({commit_seconds * 1000:.1f} ms to commit), "
+          f"{calendar.round_trips} Calendar round-trips, {moved}/{len(queued)} events moved")
@@ -0,0 +1,45 @@
+# Per-call cost of getting a Calendar service: unpickle token.pickle and build() on every tool call
+# (the old ensure_credentials + build path) against the shared CalendarClient. Runs fully offline.
+# Run from the repository root: python benchmarks/calendar_client_bench.py [calls] [discovery_latency_s]
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from calendar_client import CalendarClient
+from fake_calendar import FakeCredentials, fake_build
+
+EVENT = {"summary": "Medical Appointment", "start": {"dateTime": "2025-12-25T14:30:00"}, "end": {"dateTime": "2025-12-25T15:30:00"}}
+
+def old_path(token_path, discovery_latency):
+    with open(token_path, 'rb') as token:
+        creds = pickle.load(token)
+    service = fake_build(discovery_latency)
+    return service.events().insert(calendarId='primary', body=dict(EVENT)).execute()
+
+def timed(fn, calls):
+    started = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - started) / calls
+
+if __name__ == "__main__":
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    discovery_latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.15
+    with tempfile.TemporaryDirectory() as directory:
+        token_path = os.path.join(directory, "token.pickle")
+        with open(token_path, 'wb') as token:
+            pickle.dump(FakeCredentials(), token)
+
+        old_seconds = timed(lambda: old_path(token_path, discovery_latency), calls)
+        client = CalendarClient({}, [], token_path=token_path, build_service=lambda creds: fake_build(discovery_latency))
+        new_seconds = timed(
+            lambda: client.service().events().insert(calendarId='primary', body=dict(EVENT)).execute(), calls)
+
+    print(f"calls: {calls}, simulated discovery build: {discovery_latency * 1000:.0f} ms")
+    print(f"unpickle + build per call: {old_seconds * 1000:.2f} ms/call")
+    print(f"shared CalendarClient: {new_seconds * 1000:.2f} ms/call (first call pays the build once)")
@@ -0,0 +1,127 @@
+# Write-behind Calendar sync against a fake Calendar that is slow, fails transiently and sometimes
+# loses the response after applying a change. Compares how long a booking blocks the chat turn with
+# the old synchronous insert, then checks the outbox converges: every booking, reschedule and
+# cancellation lands exactly once. Two sync workers drain the outbox, each with its own connection pool,
+# as the two gunicorn workers do. Exits non-zero if the calendar and the database disagree.
+# Run from the repository root: python benchmarks/calendar_outbox_check.py [bookings] [latency_s] [failure_rate]
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from appointments_db import AppointmentRepository, ConnectionPool
+from calendar_sync import CalendarSyncWorker
+from fake_calendar import FakeCalendarService
+
+WRITERS = 8
+
+def event_times(date, time):
+    start = datetime.strptime(f"{date} {time}", "%Y-%m-%d %H:%M")
+    return {
+        "start": {"dateTime": start.isoformat(), "timeZone": "Asia/Kolkata"},
+        "end": {"dateTime": (start + timedelta(hours=1)).isoformat(), "timeZone": "Asia/Kolkata"},
+    }
+
+def booking(n):
+    date, time = "2025-12-25", f"{9 + n % 10:02d}:00"
+    return (date, time, f"Patient {n}", "555-0100", f"p{n}@example.com", "Wellness City", "Routine checkup")
+
+def run_writers(count, book):
+    latencies = []
+    lock = threading.Lock()
+    def write(offset):
+        for n in range(offset, count, WRITERS):
+            started = time.perf_counter()
+            book(n)
+            with lock:
+                latencies.append(time.perf_counter() - started)
+    threads = [threading.Thread(target=write, args=(w,)) for w in range(WRITERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    return latencies
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))] * 1000
+
+if __name__ == "__main__":
+    bookings = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.05
+    failure_rate = float(sys.argv[3]) if len(sys.argv) > 3 else 0.2
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Old path: the tool waits for Google before committing the row (no retries, so failures are lost bookings)
+        old_calendar = FakeCalendarService(latency=latency, failure_rate=failure_rate, seed=1)
+        old_repo = AppointmentRepository(ConnectionPool(os.path.join(directory, "old.db"), size=WRITERS))
+        old_repo.initialize()
+        old_failures = []
+        def old_book(n):
+            date, time_, *details = booking(n)
+            try:
+                event = old_calendar.events().insert(calendarId='primary', body=event_times(date, time_)).execute()
+                old_repo.insert(date, time_, *details, event["id"], f"thread-{n}", "Cardiology", "Dr. Rajesh Verma")
+            except Exception:
+                old_failures.append(n)
+        old_latencies = run_writers(bookings, old_book)
+
+        # Outbox path
+        calendar = FakeCalendarService(latency=latency, failure_rate=failure_rate, lost_response_rate=failure_rate / 2, seed=2)
+        repo = AppointmentRepository(ConnectionPool(os.path.join(directory, "new.db"), size=WRITERS + 1))
+        repo.initialize()
+        worker = CalendarSyncWorker(repo, lambda: calendar, poll_interval=0.05, base_delay=0.01,
+                                    max_delay=0.2, max_attempts=50).start()
+        other_repo = AppointmentRepository(ConnectionPool(os.path.join(directory, "new.db"), size=2))
+        other_worker = CalendarSyncWorker(other_repo, lambda: calendar, poll_interval=0.05, base_delay=0.01,
+                                          max_delay=0.2, max_attempts=50).start()
+        event_ids = {}
+        def new_book(n):
+            date, time_, *details = booking(n)
+            event_ids[n] = uuid.uuid4().hex
+            repo.insert(date, time_, *details, event_ids[n], f"thread-{n}", "Cardiology", "Dr. Rajesh Verma",
+                        event_body=event_times(date, time_))
+            worker.notify()
+        new_latencies = run_writers(bookings, new_book)
+
+        # Reschedule every third booking and cancel every fifth, possibly before its insert has synced
+        started = time.perf_counter()
+        for n in range(0, bookings, 3):
+            repo.reschedule(event_ids[n], "2025-12-26", "16:30", event_patch=event_times("2025-12-26", "16:30"))
+        for n in range(0, bookings, 5):
+            repo.delete(event_ids[n], sync_calendar=True)
+        worker.notify()
+        while repo.outbox_counts().get("pending") or repo.outbox_counts().get("in_flight"):
+            time.sleep(0.05)
+        drain_seconds = time.perf_counter() - started
+        worker.stop()
+        other_worker.stop()
+
+        expected = {}
+        for n, event_id in event_ids.items():
+            if n % 5 == 0:
+                continue
+            expected[event_id] = event_times("2025-12-26", "16:30") if n % 3 == 0 else event_times(*booking(n)[:2])
+        mismatched = [
+            event_id for event_id, times in expected.items()
+            if {key: calendar.events_by_id.get(event_id, {}).get(key) for key in ("start", "end")} != times
+        ]
+        extra = set(calendar.events_by_id) - set(expected)
+        statuses = {row["sync_status"] for row in repo.iterate()}
+        counts = repo.outbox_counts()
+
+    print(f"bookings: {bookings}, writers: {WRITERS}, calendar latency: {latency * 1000:.0f} ms, failure rate: {failure_rate:.0%}")
+    print(f"synchronous insert: p50 {percentile(old_latencies, 0.5):.1f} ms, p95 {percentile(old_latencies, 0.95):.1f} ms, "
+          f"lost bookings: {len(old_failures)}")
+    print(f"outbox commit: p50 {percentile(new_latencies, 0.5):.2f} ms, p95 {percentile(new_latencies, 0.95):.2f} ms")
+    print(f"outbox drained in {drain_seconds:.2f} s after the last change, {calendar.round_trips} Calendar calls, entries: {counts}")
+    print(f"calendar events: {len(calendar.events_by_id)} (expected {len(expected)}), mismatched: {len(mismatched)}, "
+          f"unexpected: {len(extra)}, appointment sync_status values: {sorted(statuses)}")
+    if mismatched or extra or statuses - {"synced"} or counts.get("failed"):
+        sys.exit(1)
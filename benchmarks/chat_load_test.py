@@ -0,0 +1,105 @@
+# Load test of the /chat backpressure. A minimal Flask app guards a stub chat with AdmissionControl
+# exactly as app1's /chat does, and is served by a threaded WSGI server on localhost. The stub LLM
+# stands in for Groq: LLM_SECONDS per call with at most UPSTREAM_CAPACITY calls served at once, so its
+# throughput is fixed and extra load only adds waiting.
+# Reports throughput, p95 latency of answered chats and 503s per client concurrency, without a cap and
+# with CHAT_CONCURRENCY/CHAT_QUEUE style limits.
+# Run from the repository root: python benchmarks/chat_load_test.py [seconds_per_level]
+import http.client
+import json
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify
+from werkzeug.serving import make_server
+
+from admission import AdmissionControl, Overloaded
+
+LLM_SECONDS = 0.25
+UPSTREAM_CAPACITY = 8
+LEVELS = [1, 8, 16, 32, 64]
+
+class StubLLM:
+    """LLM_SECONDS per call, at most UPSTREAM_CAPACITY calls served at once; the rest wait their turn."""
+
+    def __init__(self):
+        self.capacity = threading.Semaphore(UPSTREAM_CAPACITY)
+
+    def invoke(self, prompt):
+        with self.capacity:
+            time.sleep(LLM_SECONDS)
+        return f"reply to {prompt}"
+
+def create_app(admission):
+    app = Flask(__name__)
+    llm = StubLLM()
+
+    @app.route("/chat", methods=["POST"])
+    def chat():
+        try:
+            with admission.slot():
+                response = llm.invoke("hello")
+        except Overloaded as e:
+            return jsonify({"error": e.reason}), 503, {"Retry-After": str(e.retry_after)}
+        return jsonify({"response": response})
+
+    return app
+
+def run_level(port, concurrency, seconds):
+    results = []
+    lock = threading.Lock()
+    stop_at = time.monotonic() + seconds
+
+    def client():
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        local = []
+        while time.monotonic() < stop_at:
+            started = time.perf_counter()
+            connection.request("POST", "/chat", body=json.dumps({"message": "hi"}),
+                               headers={"Content-Type": "application/json"})
+            response = connection.getresponse()
+            response.read()
+            local.append((response.status, time.perf_counter() - started))
+            if response.status == 503:
+                # A well-behaved client backs off; scaled down from Retry-After to keep the test short
+                time.sleep(min(float(response.getheader("Retry-After", "1")), 1.0) / 10)
+        connection.close()
+        with lock:
+            results.extend(local)
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    answered = sorted(latency for status, latency in results if status == 200)
+    rejected = sum(1 for status, _ in results if status == 503)
+    p95 = statistics.quantiles(answered, n=20)[18] if len(answered) > 1 else float("nan")
+    return len(answered) / elapsed, p95, rejected
+
+if __name__ == "__main__":
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 3.0
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    configurations = [
+        ("no cap", AdmissionControl(max_active=10_000, max_queued=0)),
+        ("cap 8, queue 8, wait 1 s", AdmissionControl(max_active=8, max_queued=8, queue_timeout=1.0)),
+    ]
+    print(f"stub LLM: {LLM_SECONDS * 1000:.0f} ms per call, upstream capacity {UPSTREAM_CAPACITY} concurrent calls; "
+          f"{seconds:.0f} s per level")
+    for label, admission in configurations:
+        server = make_server("127.0.0.1", 0, create_app(admission), threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print(f"\n{label}")
+        print(f"{'clients':>8} {'chats/s':>8} {'p95 ms':>8} {'503s':>6}")
+        for concurrency in LEVELS:
+            throughput, p95, rejected = run_level(server.server_port, concurrency, seconds)
+            print(f"{concurrency:>8} {throughput:>8.1f} {p95 * 1000:>8.0f} {rejected:>6}")
+        server.shutdown()
@@ -0,0 +1,58 @@
+# Soak test: writes checkpoints for many synthetic threads and samples process memory as it goes
+# Run from the repository root: python benchmarks/checkpointer_soak.py [threads] [turns_per_thread]
+import os
+import resource
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.base import empty_checkpoint
+
+from checkpointer import SQLiteCheckpointer
+
+def current_rss_mb():
+    # /proc gives the current RSS; ru_maxrss (the peak) is the fallback elsewhere
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+def run(thread_count, turns, path):
+    saver = SQLiteCheckpointer(path, max_cached_threads=1000, history_limit=5)
+    started = time.perf_counter()
+    samples = []
+    for n in range(thread_count):
+        config = {"configurable": {"thread_id": f"soak-{n}", "checkpoint_ns": ""}}
+        messages = []
+        for turn in range(turns):
+            messages = messages + [HumanMessage(content=f"turn {turn} question"), AIMessage(content=f"turn {turn} answer")]
+            checkpoint = empty_checkpoint()
+            checkpoint["id"] = str(uuid.uuid1())
+            checkpoint["channel_values"] = {"messages": messages}
+            config = saver.put(config, checkpoint, {"step": turn, "source": "loop"}, {})
+        if n % 10000 == 0:
+            samples.append((n, current_rss_mb()))
+            saver.compact()
+    elapsed = time.perf_counter() - started
+    samples.append((thread_count, current_rss_mb()))
+    saver.compact()
+    return elapsed, samples, saver
+
+if __name__ == "__main__":
+    thread_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    turns = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    with tempfile.TemporaryDirectory() as directory:
+        elapsed, samples, saver = run(thread_count, turns, os.path.join(directory, "soak.db"))
+        rows = saver.conn.execute("SELECT COUNT(*) FROM checkpoints").fetchone()[0]
+        print(f"threads: {thread_count}, turns per thread: {turns}, elapsed: {elapsed:.1f}s "
+              f"({thread_count * turns / elapsed:.0f} checkpoints/s)")
+        print(f"checkpoint rows on disk after compaction: {rows}, threads cached in memory: {len(saver.cache)}")
+        for n, rss in samples:
+            print(f"after {n:>7} threads: rss {rss:.1f} MB")
+        growth = samples[-1][1] - samples[1][1] if len(samples) > 2 else 0.0
+        print(f"rss growth after warm-up: {growth:.1f} MB")
@@ -0,0 +1,296 @@
+# Offline end-to-end benchmark. Replays the recorded conversations in benchmarks/e2e_conversations.jsonl
+# (booking, reschedule, symptom triage, doctor lookup, FAQ), each REPLICAS times and CONCURRENCY at once,
+# through part_1_graph and through the Flask /chat route. app1 runs unchanged except for its outside
+# services: FakeChatGroq replaces ChatGroq (LLM_SECONDS per call), FakeCalendarService sits behind the
+# calendar sync worker and FakeTavily answers web searches. Databases go to a temporary directory.
+# Reports turns/s, p50/p95/p99 turn latency, LLM calls and prompt tokens per conversation (and the share
+# of turns answered without an LLM call) and peak RSS. Exits 1 when LLM calls or prompt tokens per
+# conversation are worse than benchmarks/e2e_baseline.json by more than the baseline's tolerance; those
+# don't depend on the machine. Timings and RSS do, so they are compared with the baseline but only reported.
+# Run from the repository root: python benchmarks/e2e_bench.py [replicas] [concurrency] [--update-baseline] [--verbose]
+import io
+import json
+import os
+import re
+import resource
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from contextlib import nullcontext, redirect_stdout
+from datetime import timedelta
+from functools import partial
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import langchain_groq
+from langchain_core.messages import AIMessage, HumanMessage
+
+from fake_calendar import FakeCalendarService
+from fake_llm import FakeChatGroq, call_log
+from fake_tavily import FakeTavily
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+CONVERSATIONS_PATH = os.path.join(BENCH_DIR, "e2e_conversations.jsonl")
+BASELINE_PATH = os.path.join(BENCH_DIR, "e2e_baseline.json")
+LLM_SECONDS = 0.05
+CALENDAR_SECONDS = 0.05
+SEARCH_SECONDS = 0.1
+MODES = ["graph", "flask"]
+DEFAULT_TOLERANCE = {
+    "llm_calls_per_conversation": 0.0,  # the fake LLM is deterministic: any extra call is a regression
+    "prompt_tokens": 0.05,              # names and dates differ in length between replicas
+    # Reported, not gated: these depend on the machine
+    "turns_per_second": 0.2,            # below 80% of the baseline
+    "latency": 0.25,                    # above 125% of the baseline p50/p95/p99...
+    "latency_slack_ms": 25,             # ...plus half a fake LLM call: p50 sits between rule-based and LLM turns
+    "peak_rss_mb": 0.15,
+}
+EVENT_ID = re.compile(r"Event ID: ([0-9a-f]{32})")
+NAMES = ["Asha Rao", "Rahul Mehta", "Kiran Joshi", "Meera Pillai", "Vivek Nair", "Farah Khan", "Lata Iyer", "Sanjay Gupta"]
+
+def load_conversations(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+class Slots:
+    """Hands out distinct future (date, time) slots within opening hours, so no two replayed bookings clash."""
+
+    def __init__(self, app1):
+        self.app1 = app1
+        self.lock = threading.Lock()
+        self.slots = self._generate()
+
+    def _generate(self):
+        day = self.app1.clinic_now().date()
+        duration = self.app1.availability.duration
+        while True:
+            day += timedelta(days=1)
+            opening, closing = self.app1.availability.hours.get(day.weekday(), (0, 0))
+            for start in range(opening, closing - duration + 1, 60):
+                yield day.isoformat(), f"{start // 60:02d}:{start % 60:02d}"
+
+    def take(self):
+        with self.lock:
+            return next(self.slots)
+
+def placeholders(slots, doctors, n):
+    date, time_ = slots.take()
+    new_date, new_time = slots.take()
+    name = NAMES[n % len(NAMES)]
+    return {"doctor": doctors[n % len(doctors)], "date": date, "time": time_, "new_date": new_date, "new_time": new_time,
+            "name": name, "email": f"{name.split()[0].lower()}.{n}@example.com", "phone": f"98{n:08d}"}
+
+def graph_turn(app1, client, thread_id, text):
+    config = {"configurable": {"passenger_id": "User", "thread_id": thread_id}}
+    result = app1.part_1_graph.invoke({"messages": [HumanMessage(content=text)]}, config=config)
+    replies = [message for message in result["messages"] if isinstance(message, AIMessage)]
+    return thread_id, str(replies[-1].content)
+
+def flask_turn(app1, client, thread_id, text):
+    response = client.post("/chat", json={"message": text, "thread_id": thread_id})
+    if response.status_code != 200:
+        raise RuntimeError(f"/chat answered {response.status_code}: {response.get_json()}")
+    body = response.get_json()
+    return body["thread_id"], body["response"]
+
+def run_conversation(turn, app1, client, conversation, values):
+    """Replays one conversation; returns (turn latencies, LLM calls, prompt tokens, turns answered without
+    an LLM call). Raises if a turn fails."""
+    thread_id = f"bench-{conversation['name']}-{values['phone']}" if turn is graph_turn else None
+    latencies, calls, local_turns = [], [], 0
+    token = call_log.set(calls)
+    try:
+        for template in conversation["turns"]:
+            text = template.format(**values)
+            started, calls_before = time.perf_counter(), len(calls)
+            thread_id, reply = turn(app1, client, thread_id, text)
+            latencies.append(time.perf_counter() - started)
+            local_turns += len(calls) == calls_before
+            if "technical issue" in reply or "temporarily unavailable" in reply:
+                raise RuntimeError(f"assistant failed on {text!r}: {reply}")
+            found = EVENT_ID.search(reply)
+            if found:
+                values["event_id"] = found.group(1)
+    finally:
+        call_log.reset(token)
+    return latencies, len(calls), sum(tokens for _, tokens in calls), local_turns
+
+def percentile_ms(latencies, q):
+    return round(statistics.quantiles(latencies, n=100, method="inclusive")[q - 1] * 1000, 1)
+
+def run_mode(app1, mode, conversations, replicas, concurrency, slots, doctors, counter):
+    turn = graph_turn if mode == "graph" else flask_turn
+    work = [(conversation, replica) for replica in range(replicas) for conversation in conversations]
+    results, errors = [], []
+    lock = threading.Lock()
+
+    def worker():
+        client = app1.app.test_client() if mode == "flask" else None
+        while True:
+            with lock:
+                if not work:
+                    return
+                conversation, _ = work.pop(0)
+                n = next(counter)
+            values = placeholders(slots, doctors, n)
+            try:
+                latencies, calls, tokens, local_turns = run_conversation(turn, app1, client, conversation, values)
+            except Exception as e:
+                with lock:
+                    errors.append(f"{conversation['name']}: {e!r}")
+                continue
+            with lock:
+                results.append((conversation["name"], latencies, calls, tokens, local_turns))
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    latencies = [latency for _, turns, _, _, _ in results for latency in turns]
+    scenarios = {}
+    for name, turns, calls, tokens, _ in results:
+        scenario = scenarios.setdefault(name, {"conversations": 0, "turns": 0, "llm_calls": 0, "prompt_tokens": 0})
+        scenario["conversations"] += 1
+        scenario["turns"] += len(turns)
+        scenario["llm_calls"] += calls
+        scenario["prompt_tokens"] += tokens
+    return {
+        "conversations": len(results),
+        "errors": errors,
+        "turns_per_second": round(len(latencies) / elapsed, 2),
+        "p50_ms": percentile_ms(latencies, 50),
+        "p95_ms": percentile_ms(latencies, 95),
+        "p99_ms": percentile_ms(latencies, 99),
+        "llm_calls_per_conversation": round(sum(calls for _, _, calls, _, _ in results) / max(len(results), 1), 2),
+        "prompt_tokens_per_conversation": round(sum(tokens for _, _, _, tokens, _ in results) / max(len(results), 1)),
+        "turns_without_llm": round(sum(local for _, _, _, _, local in results) / max(len(latencies), 1), 3),
+        "scenarios": {name: round(scenario["llm_calls"] / scenario["conversations"], 2) for name, scenario in sorted(scenarios.items())},
+        "scenario_prompt_tokens": {name: round(scenario["prompt_tokens"] / scenario["conversations"])
+                                   for name, scenario in sorted(scenarios.items())},
+    }
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def regressions(baseline, results):
+    """Returns (regressions, timing_notes): LLM calls and prompt tokens fail the run, timings are only reported."""
+    tolerance = {**DEFAULT_TOLERANCE, **baseline.get("tolerance", {})}
+    found, notes = [], []
+    for mode in MODES:
+        before, after = baseline["results"][mode], results[mode]
+        for name, calls in after["scenarios"].items():
+            limit = before["scenarios"].get(name, float("inf")) + tolerance["llm_calls_per_conversation"]
+            if calls > limit + 1e-9:
+                found.append(f"{mode} {name} LLM calls per conversation {calls} > baseline {before['scenarios'][name]}")
+        for name, tokens in after["scenario_prompt_tokens"].items():
+            baseline_tokens = before.get("scenario_prompt_tokens", {}).get(name)
+            if baseline_tokens is not None and tokens > baseline_tokens * (1 + tolerance["prompt_tokens"]):
+                found.append(f"{mode} {name} prompt tokens per conversation {tokens} > baseline {baseline_tokens}")
+        if after["turns_per_second"] < before["turns_per_second"] * (1 - tolerance["turns_per_second"]):
+            notes.append(f"{mode} turns/s {after['turns_per_second']} < baseline {before['turns_per_second']}")
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            if after[key] > before[key] * (1 + tolerance["latency"]) + tolerance["latency_slack_ms"]:
+                notes.append(f"{mode} {key} {after[key]} > baseline {before[key]}")
+    if results["peak_rss_mb"] > baseline["results"]["peak_rss_mb"] * (1 + tolerance["peak_rss_mb"]):
+        notes.append(f"peak RSS {results['peak_rss_mb']} MB > baseline {baseline['results']['peak_rss_mb']} MB")
+    return found, notes
+
+def import_app(directory, quiet):
+    os.environ.update({
+        "APPOINTMENTS_DB": os.path.join(directory, "appointments.db"),
+        "CHECKPOINT_DB": os.path.join(directory, "checkpoints.db"),
+        "KB_CACHE_DIR": os.path.join(directory, "kb_cache"),
+        "RESPONSE_CACHE": "memory",
+        "WEB_SEARCH_CACHE_PATH": os.path.join(directory, "web_search_cache.db"),
+    })
+    os.environ.pop("TRACE_SPANS_PATH", None)
+    os.environ.setdefault("GROQ_API_KEY", "offline")
+    os.environ.setdefault("TAVILY_API_KEY", "offline")
+    langchain_groq.ChatGroq = partial(FakeChatGroq, latency=LLM_SECONDS)
+    with quiet():
+        import app1
+        calendar_service = FakeCalendarService(latency=CALENDAR_SECONDS)
+        app1.calendar_sync.get_service = lambda: calendar_service
+        app1.web_searcher.backend = FakeTavily(latency=SEARCH_SECONDS)
+        # Parse the hospital PDF up front so the first hospital question doesn't carry the cold start
+        knowledge_base = app1.knowledge.current.knowledge_base
+        if knowledge_base:
+            knowledge_base.text
+    return app1, calendar_service
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    replicas = int(args[0]) if len(args) > 0 else 6
+    concurrency = int(args[1]) if len(args) > 1 else 8
+    update_baseline = "--update-baseline" in sys.argv
+    settings = {"replicas": replicas, "concurrency": concurrency, "llm_seconds": LLM_SECONDS,
+                "calendar_seconds": CALENDAR_SECONDS, "search_seconds": SEARCH_SECONDS}
+    # app1 logs every prompt and tool call; keep the report readable unless asked
+    quiet = nullcontext if "--verbose" in sys.argv else partial(redirect_stdout, io.StringIO())
+
+    conversations = load_conversations(CONVERSATIONS_PATH)
+    with tempfile.TemporaryDirectory() as directory:
+        app1, calendar_service = import_app(directory, quiet)
+        slots = Slots(app1)
+        doctors = [doctor["name"] for doctor in app1.knowledge.current.clinic_index.data["doctors"]]
+        counter = iter(range(10 ** 9))
+        print(f"{len(conversations)} conversations x {replicas} replicas, {concurrency} at once; "
+              f"LLM {LLM_SECONDS * 1000:.0f} ms, Calendar {CALENDAR_SECONDS * 1000:.0f} ms, search {SEARCH_SECONDS * 1000:.0f} ms per call")
+        # One untimed pass first: fills the response cache, so LLM calls per conversation don't depend on
+        # which replica happened to ask a question first
+        with quiet():
+            run_mode(app1, "graph", conversations, 1, 1, slots, doctors, counter)
+        results = {}
+        for mode in MODES:
+            with quiet():
+                results[mode] = run_mode(app1, mode, conversations, replicas, concurrency, slots, doctors, counter)
+            result = results[mode]
+            print(f"\n{mode}: {result['conversations']} conversations, {result['turns_per_second']} turns/s, "
+                  f"p50 {result['p50_ms']} ms, p95 {result['p95_ms']} ms, p99 {result['p99_ms']} ms, "
+                  f"{result['llm_calls_per_conversation']} LLM calls and {result['prompt_tokens_per_conversation']} "
+                  f"prompt tokens per conversation, "
+                  f"{result['turns_without_llm']:.0%} of turns answered without one")
+            for name, calls in result["scenarios"].items():
+                print(f"  {name:<16} {calls:5.2f} LLM calls, {result['scenario_prompt_tokens'][name]:>6} prompt tokens per conversation")
+            for error in result["errors"]:
+                print(f"  error: {error}")
+        results["peak_rss_mb"] = peak_rss_mb()
+        with quiet():
+            app1.shutdown(timeout=5)
+        print(f"\npeak RSS {results['peak_rss_mb']} MB; Calendar calls {dict(calendar_service.calls)}")
+
+    if any(results[mode]["errors"] for mode in MODES):
+        sys.exit("conversations failed; not comparing with the baseline")
+    for mode in MODES:
+        del results[mode]["errors"]
+    if update_baseline:
+        tolerance = DEFAULT_TOLERANCE
+        if os.path.exists(BASELINE_PATH):
+            with open(BASELINE_PATH, encoding="utf-8") as f:
+                tolerance = json.load(f).get("tolerance", tolerance)
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump({"settings": settings, "tolerance": tolerance, "results": results}, f, indent=2)
+            f.write("\n")
+        print(f"baseline written to {os.path.relpath(BASELINE_PATH)}")
+        sys.exit(0)
+    if not os.path.exists(BASELINE_PATH):
+        sys.exit(f"no baseline at {os.path.relpath(BASELINE_PATH)}; run with --update-baseline first")
+    with open(BASELINE_PATH, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline["settings"] != settings:
+        sys.exit(f"settings {settings} differ from the baseline's {baseline['settings']}; not comparing")
+    found, notes = regressions(baseline, results)
+    for note in notes:
+        print(f"slower than the baseline (not gated; timings depend on the machine): {note}")
+    for regression in found:
+        print(f"REGRESSION: {regression}")
+    if found:
+        sys.exit(1)
+    print("no regressions against the baseline")
@@ -0,0 +1,147 @@
+# Local stand-in for the Google Calendar v3 events API, with injectable latency and failures
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+
+class FakeResponse:
+    def __init__(self, status):
+        self.status = status
+        self.reason = "Injected failure" if status >= 500 else "Fake error"
+
+class FakeHttpError(Exception):
+    """Shaped like googleapiclient.errors.HttpError: the status code is on `resp.status`."""
+
+    def __init__(self, status, message=""):
+        super().__init__(f"<HttpError {status}: {message}>")
+        self.resp = FakeResponse(status)
+        self.status_code = status
+
+class FakeCredentials:
+    def __init__(self, token="fake-token"):
+        self.token = token
+        self.valid = True
+        self.expired = False
+        self.refresh_token = None
+        self.expiry = None
+
+class FakeRequest:
+    def __init__(self, service, name, action):
+        self.service = service
+        self.name = name
+        self.action = action
+
+    def execute(self, http=None, num_retries=0):
+        return self.service.call(self.name, self.action)
+
+class FakeEvents:
+    def __init__(self, service):
+        self.service = service
+
+    def insert(self, calendarId, body):
+        def action():
+            event_id = body.get("id") or uuid.uuid4().hex
+            if event_id in self.service.events_by_id:
+                raise FakeHttpError(409, "The requested identifier already exists.")
+            event = dict(body, id=event_id, status="confirmed")
+            self.service.events_by_id[event_id] = event
+            return dict(event)
+        return FakeRequest(self.service, "insert", action)
+
+    def get(self, calendarId, eventId):
+        def action():
+            if eventId not in self.service.events_by_id:
+                raise FakeHttpError(404, "Not Found")
+            return dict(self.service.events_by_id[eventId])
+        return FakeRequest(self.service, "get", action)
+
+    def update(self, calendarId, eventId, body):
+        def action():
+            if eventId not in self.service.events_by_id:
+                raise FakeHttpError(404, "Not Found")
+            self.service.events_by_id[eventId] = dict(body, id=eventId)
+            return dict(self.service.events_by_id[eventId])
+        return FakeRequest(self.service, "update", action)
+
+    def patch(self, calendarId, eventId, body):
+        def action():
+            if eventId not in self.service.events_by_id:
+                raise FakeHttpError(404, "Not Found")
+            self.service.events_by_id[eventId].update(body)
+            return dict(self.service.events_by_id[eventId])
+        return FakeRequest(self.service, "patch", action)
+
+    def delete(self, calendarId, eventId):
+        def action():
+            if self.service.events_by_id.pop(eventId, None) is None:
+                raise FakeHttpError(410, "Resource has been deleted")
+            return ""
+        return FakeRequest(self.service, "delete", action)
+
+class FakeBatch:
+    """Shaped like googleapiclient.http.BatchHttpRequest: one round-trip, per-part callbacks."""
+
+    def __init__(self, service, callback):
+        self.service = service
+        self.callback = callback
+        self.parts = []
+
+    def add(self, request, callback=None, request_id=None):
+        self.parts.append((request, callback or self.callback, request_id or str(len(self.parts) + 1)))
+
+    def execute(self, http=None):
+        self.service.round_trip("batch")
+        for request, callback, request_id in self.parts:
+            try:
+                response, exception = self.service.apply(request.name, request.action), None
+            except FakeHttpError as e:
+                response, exception = None, e
+            callback(request_id, response, exception)
+
+class FakeCalendarService:
+    """Keeps events in memory; every call sleeps `latency` seconds and fails with `failure_rate` probability.
+    With `lost_response_rate`, a call is applied but still reports a failure, like a timeout after the
+    server committed the change."""
+
+    def __init__(self, latency=0.0, failure_rate=0.0, failure_status=503, seed=0, lost_response_rate=0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.lost_response_rate = lost_response_rate
+        self.failure_status = failure_status
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.events_by_id = {}
+        self.calls = Counter()
+        self.round_trips = 0
+
+    def events(self):
+        return FakeEvents(self)
+
+    def new_batch_http_request(self, callback=None):
+        return FakeBatch(self, callback)
+
+    def round_trip(self, name):
+        if self.latency:
+            time.sleep(self.latency)
+        with self.lock:
+            self.calls[name] += 1
+            self.round_trips += 1
+
+    def call(self, name, action):
+        self.round_trip(name)
+        return self.apply(name, action)
+
+    def apply(self, name, action):
+        with self.lock:
+            if self.failure_rate and self.random.random() < self.failure_rate:
+                raise FakeHttpError(self.failure_status, f"{name} failed")
+            result = action()
+            if self.lost_response_rate and self.random.random() < self.lost_response_rate:
+                raise FakeHttpError(504, f"{name} response lost")
+            return result
+
+def fake_build(discovery_latency=0.15, **service_kwargs):
+    """Stands in for googleapiclient.discovery.build, including the cost of loading the discovery document."""
+    time.sleep(discovery_latency)
+    return FakeCalendarService(**service_kwargs)
@@ -0,0 +1,227 @@
+# Local stand-ins for a Groq chat model: FakeChatModel, with an injectable latency distribution, 429/5xx
+# errors, request timeouts, empty replies and outage windows, and FakeChatGroq, a scripted LangChain chat
+# model that can replace ChatGroq in app1 for offline end-to-end runs
+import contextvars
+import hashlib
+import re
+import random
+import threading
+import time
+from collections import Counter
+from typing import ClassVar, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+class FakeHTTPResponse:
+    def __init__(self, status, headers=None):
+        self.status_code = status
+        self.headers = headers or {}
+
+class FakeAPIStatusError(Exception):
+    """Shaped like groq.APIStatusError: `status_code` and `response.headers` (for Retry-After)."""
+
+    def __init__(self, status, retry_after=None):
+        super().__init__(f"Error code: {status} - injected failure")
+        self.status_code = status
+        self.response = FakeHTTPResponse(status, {"retry-after": str(retry_after)} if retry_after else {})
+
+class FakeAPITimeoutError(Exception):
+    """Shaped like groq.APITimeoutError: raised when a request exceeds the client's timeout."""
+
+class FakeReply:
+    def __init__(self, content, tool_calls=None):
+        self.content = content
+        self.tool_calls = tool_calls or []
+
+class FakeChatModel:
+    """`invoke` sleeps for a lognormal latency (with an occasional slow tail), then fails or replies.
+
+    With `timeout` set, requests slower than it raise FakeAPITimeoutError after `timeout` seconds, like
+    ChatGroq(timeout=...); without it, slow requests just take as long as they take. `fail_between`
+    is a (start, end) window in seconds since the model was created during which every call gets a 503.
+    """
+
+    def __init__(self, median_latency=0.02, tail_rate=0.02, tail_latency=1.0, error_rate=0.0,
+                 rate_limit_rate=0.0, retry_after=None, empty_rate=0.0, timeout=None, fail_between=None,
+                 seed=0, reply="Dr. Neha Tripathi in General Medicine can see you."):
+        self.median_latency = median_latency
+        self.tail_rate = tail_rate
+        self.tail_latency = tail_latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.empty_rate = empty_rate
+        self.timeout = timeout
+        self.fail_between = fail_between
+        self.reply = reply
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.calls = Counter()
+
+    def _draw(self):
+        with self.lock:
+            roll = self.random.random()
+            latency = self.median_latency * self.random.lognormvariate(0, 0.5)
+            if self.random.random() < self.tail_rate:
+                latency += self.tail_latency
+            server_error = self.random.choice(["500", "502", "503"])
+        return roll, latency, server_error
+
+    def invoke(self, input, *args, **kwargs):
+        roll, latency, server_error = self._draw()
+        elapsed = time.monotonic() - self.started
+        with self.lock:
+            self.calls["requests"] += 1
+        if self.fail_between and self.fail_between[0] <= elapsed < self.fail_between[1]:
+            time.sleep(self.median_latency / 4)
+            with self.lock:
+                self.calls["503"] += 1
+            raise FakeAPIStatusError(503)
+        if self.timeout is not None and latency > self.timeout:
+            time.sleep(self.timeout)
+            with self.lock:
+                self.calls["timeout"] += 1
+            raise FakeAPITimeoutError("Request timed out.")
+        time.sleep(latency)
+        if roll < self.rate_limit_rate:
+            outcome = "429"
+        elif roll < self.rate_limit_rate + self.error_rate:
+            outcome = server_error
+        elif roll < self.rate_limit_rate + self.error_rate + self.empty_rate:
+            outcome = "empty"
+        else:
+            outcome = "ok"
+        with self.lock:
+            self.calls[outcome] += 1
+        if outcome == "429":
+            raise FakeAPIStatusError(429, self.retry_after)
+        if outcome not in ("ok", "empty"):
+            raise FakeAPIStatusError(int(outcome))
+        log = call_log.get()
+        if log is not None:
+            log.append(("text", len(str(input)) // 4))
+        return FakeReply("" if outcome == "empty" else self.reply)
+
+EVENT_ID = re.compile(r"\b[0-9a-f]{32}\b")
+DOCTOR_NAME = re.compile(r"\bDr\.? [A-Z][a-z]+ [A-Z][a-z]+")
+ISO_DAY = re.compile(r"\b\d{4}-\d{2}-\d{2}\b")
+CLOCK = re.compile(r"\b\d{1,2}:\d{2}\b")
+SYMPTOM_WORDS = re.compile(r"\b(pain|ache|aches|fever|cough|rash|dizzy|dizziness|breath|headaches?|migraines?|nausea|symptoms?)\b")
+LOOKUP_WORDS = re.compile(r"\b(doctors?|dr|who|specialists?|cardiologists?|neurologists?|departments?|hours)\b")
+SLOT_WORDS = re.compile(r"\b(free|slots?|available|availability)\b")
+SEARCH_WORDS = re.compile(r"\b(news|latest|outbreak)\b")
+# Harnesses set this to a list to collect the calls made on behalf of one conversation, as (kind,
+# prompt tokens) pairs; it follows the graph into its node and tool threads, which run in copies of the
+# caller's context
+call_log = contextvars.ContextVar("fake_llm_call_log", default=None)
+# Keyword -> (department, doctor) for the symptom tool's canned analysis
+TRIAGE = [
+    ("chest", "Cardiology", "Dr. Rajesh Verma"),
+    ("breath", "Pulmonology", "Dr. Preeti Choudhary"),
+    ("headache", "Neurology", "Dr. Priya Sharma"),
+    ("migraine", "Neurology", "Dr. Priya Sharma"),
+    ("rash", "Dermatology", "Dr. Arjun Nair"),
+    ("stomach", "Gastroenterology", "Dr. Kavita Iyer"),
+]
+
+class FakeChatGroq(BaseChatModel):
+    """Deterministic, rule-based stand-in for ChatGroq; accepts ChatGroq's constructor arguments.
+
+    Bound to tools (the assistant), it reads the last message: a user message is routed to tool calls
+    by keywords (symptoms, doctor lookups, free slots, web search, reschedule/cancel with an event ID)
+    or answered in text; tool results are summarised back to the user. Unbound (the tools' own calls,
+    history summaries), it returns a canned analysis. Each call sleeps `latency` seconds, scaled by up
+    to +/-`jitter` from a hash of the prompt, so a replayed conversation takes the same time every run.
+    `calls` counts calls across all instances; `call_log` collects them per conversation.
+    """
+
+    model: str = "fake-groq"
+    api_key: Optional[str] = None
+    timeout: Optional[float] = None
+    max_retries: int = 0
+    latency: float = 0.05
+    jitter: float = 0.3
+
+    calls: ClassVar[Counter] = Counter()
+    lock: ClassVar[threading.Lock] = threading.Lock()
+
+    @property
+    def _llm_type(self):
+        return "fake-groq"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    def _generate(self, messages, stop=None, run_manager=None, tools=None, **kwargs):
+        prompt = "\n".join(str(message.content) for message in messages)
+        digest = int.from_bytes(hashlib.blake2b(prompt.encode(), digest_size=8).digest(), "big")
+        time.sleep(self.latency * (1 + self.jitter * (2 * (digest % 1000) / 999 - 1)))
+        names = {tool["function"]["name"] for tool in tools or []}
+        message = self._respond(messages, names, digest) if names else AIMessage(content=self._analyse(messages[-1]))
+        with self.lock:
+            self.calls["tools" if message.tool_calls else "text"] += 1
+            self.calls["requests"] += 1
+        log = call_log.get()
+        if log is not None:
+            log.append(("tools" if message.tool_calls else "text", len(prompt) // 4))
+        message.usage_metadata = {"input_tokens": len(prompt) // 4, "output_tokens": len(str(message.content)) // 4,
+                                  "total_tokens": (len(prompt) + len(str(message.content))) // 4}
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    @staticmethod
+    def _analyse(message):
+        text = str(message.content)
+        if text.startswith("Summary so far"):
+            return "Patient asked about appointments and symptoms; nothing unresolved."
+        if "A user is experiencing" in text:
+            lowered = text.lower()
+            department, doctor = next(((department, doctor) for keyword, department, doctor in TRIAGE if keyword in lowered),
+                                      ("General Medicine", "Dr. Radhika Menon"))
+            return (f"These symptoms are often linked to conditions treated in {department}. "
+                    f"{doctor} is the right specialist to see; seek emergency care if they get worse.")
+        return "Sunrise Medical Center has specialists in that area; please ask about a specific doctor or department."
+
+    def _respond(self, messages, names, digest):
+        last = messages[-1]
+        if isinstance(last, ToolMessage):
+            results = []
+            for message in reversed(messages):
+                if not isinstance(message, ToolMessage):
+                    break
+                results.insert(0, str(message.content))
+            return AIMessage(content="Here is what I found. " + " ".join(results)[:400])
+        text = str(last.content) if isinstance(last, HumanMessage) else ""
+        lowered = text.lower()
+        calls = []
+        def call(name, **args):
+            if name in names:
+                calls.append({"name": name, "args": args, "id": f"call_{digest:016x}_{len(calls)}", "type": "tool_call"})
+
+        event_id = EVENT_ID.search(lowered)
+        if event_id and "cancel" in lowered:
+            call("cancel_google_calendar_appointment", event_id=event_id.group())
+        elif event_id:
+            day, clock = ISO_DAY.search(text), CLOCK.search(text)
+            if not (day and clock):
+                return AIMessage(content="Which date (YYYY-MM-DD) and time (HH:MM) would you like instead?")
+            call("update_google_calendar_appointment", event_id=event_id.group(), new_date=day.group(), new_time=clock.group())
+        elif re.search(r"\b(reschedule|cancel)\b", lowered):
+            return AIMessage(content="Sure. Please share the event ID from your booking confirmation.")
+        elif SEARCH_WORDS.search(lowered):
+            call("tavily_search_results_json", query=text)
+        elif SYMPTOM_WORDS.search(lowered):
+            call("symptom_analysis_tool", symptoms=text)
+        else:
+            doctor, day = DOCTOR_NAME.search(text), ISO_DAY.search(text)
+            if SLOT_WORDS.search(lowered):
+                call("check_availability", doctor=doctor.group() if doctor else "", date=day.group() if day else "",
+                     department="" if doctor else "Cardiology")
+            if LOOKUP_WORDS.search(lowered):
+                call("hospital_info_tool", query=text)
+        if calls:
+            return AIMessage(content="", tool_calls=calls)
+        return AIMessage(content="Happy to help. You can ask me about doctors, symptoms or appointments.")
@@ -0,0 +1,20 @@
+# Local stand-in for langchain_community's TavilySearchResults: canned results after a fixed latency
+import threading
+import time
+
+class FakeTavily:
+    """`invoke({"query": ...})` sleeps `latency` seconds and returns `max_results` results shaped like Tavily's."""
+
+    def __init__(self, latency=0.3, max_results=1):
+        self.latency = latency
+        self.max_results = max_results
+        self.lock = threading.Lock()
+        self.calls = 0
+
+    def invoke(self, input, *args, **kwargs):
+        query = input["query"] if isinstance(input, dict) else str(input)
+        time.sleep(self.latency)
+        with self.lock:
+            self.calls += 1
+        return [{"url": f"https://news.example.com/{n}", "content": f"Health authorities report on: {query}."}
+                for n in range(self.max_results)]
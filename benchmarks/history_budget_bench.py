@@ -0,0 +1,68 @@
+# Estimated prompt tokens per turn over a long simulated chat, with the full history (the old
+# Assistant) against the HistoryPolicy budget used by the compact_history node.
+# Run from the repository root: python benchmarks/history_budget_bench.py [turns] [max_tokens] [keep_turns]
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, ToolMessage
+
+from history import HistoryPolicy, count_tokens
+
+SYSTEM_TOKENS = 650  # primary_assistant_prompt's system message
+
+SYMPTOM_ANALYSIS = (
+    "Possible conditions: viral fever, influenza, early bronchitis. Recommended department: General Medicine "
+    "with Dr. Neha Tripathi (General Physician, 10+ years). Seek urgent care if breathing becomes difficult, "
+    "chest pain appears or fever exceeds 103F for more than two days. Home care: rest, fluids, paracetamol "
+    "as directed; avoid self-medicating with antibiotics. "
+) * 6
+
+def turn_messages(n):
+    call_id = f"call_{n}"
+    return [
+        HumanMessage(content=f"I've had a fever and a cough for {n % 5 + 2} days, what could it be?", id=f"h{n}"),
+        AIMessage(content="", id=f"a{n}", tool_calls=[{"name": "symptom_analysis_tool", "args": {"symptoms": "fever, cough"}, "id": call_id}]),
+        ToolMessage(content=SYMPTOM_ANALYSIS, id=f"t{n}", tool_call_id=call_id, name="symptom_analysis_tool"),
+        AIMessage(content="It sounds like a viral infection. I'd suggest seeing Dr. Neha Tripathi in General Medicine; "
+                          "would you like me to book an appointment?", id=f"r{n}"),
+    ]
+
+def apply(messages, update):
+    removed = {message.id for message in update.get("messages", []) if isinstance(message, RemoveMessage)}
+    replaced = {message.id: message for message in update.get("messages", []) if not isinstance(message, RemoveMessage)}
+    return [replaced.get(message.id, message) for message in messages if message.id not in removed]
+
+if __name__ == "__main__":
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    policy = HistoryPolicy(
+        max_tokens=int(sys.argv[2]) if len(sys.argv) > 2 else 3000,
+        keep_turns=int(sys.argv[3]) if len(sys.argv) > 3 else 6,
+    )
+    full, budgeted, summary = [], [], None
+    full_total = budgeted_total = 0
+    compact_seconds = 0.0
+    report_at = {1, 5, 10, 20, turns}
+    print(f"{'turn':>5} {'full history':>13} {'with budget':>12}")
+    for n in range(1, turns + 1):
+        new = turn_messages(n)
+        full.extend(new)
+        budgeted.extend(new[:1])
+        started = time.perf_counter()
+        update = policy.compact(budgeted, summary)
+        compact_seconds += time.perf_counter() - started
+        budgeted = apply(budgeted, update)
+        summary = update.get("summary", summary)
+        # Two LLM calls per turn: up to the user's message, then again with the tool call and its result
+        full_tokens = 2 * SYSTEM_TOKENS + count_tokens(full[:-3]) + count_tokens(full[:-1])
+        summary_tokens = count_tokens([HumanMessage(content=summary)]) if summary else 0
+        budgeted_tokens = 2 * (SYSTEM_TOKENS + summary_tokens + count_tokens(budgeted)) + count_tokens(new[1:3])
+        budgeted.extend(new[1:])
+        full_total += full_tokens
+        budgeted_total += budgeted_tokens
+        if n in report_at:
+            print(f"{n:>5} {full_tokens:>13} {budgeted_tokens:>12}")
+    print(f"total prompt tokens over {turns} turns: full {full_total}, with budget {budgeted_total} "
+          f"({budgeted_total / full_total:.0%}); compaction {compact_seconds / turns * 1000:.2f} ms/turn")
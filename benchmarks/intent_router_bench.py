@@ -0,0 +1,83 @@
+# Share of turns the intent router answers without an LLM call, on a labelled corpus of user messages
+# that are not among its training examples. Expected None means the turn needs the assistant. Also
+# counts the two kinds of mistakes: an FAQ sent to the LLM (a missed saving) and a turn that needed the
+# LLM but got a canned answer (a wrong reply), and times training and routing. The LLM turns include
+# near-misses written to trip the router: FAQ words in questions the FAQ answers don't cover ("what is
+# the emergency room wait time", "are you open on diwali", "does dr verma speak hindi").
+# Run from the repository root: python benchmarks/intent_router_bench.py [min_confidence]
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from clinic_index import load_clinic_index
+from intent_router import IntentRouter
+
+CORPUS = [
+    ("Hello!", "greeting"), ("hey", "greeting"), ("Good afternoon", "greeting"),
+    ("Thanks, that helps", "thanks"), ("thank you very much!", "thanks"), ("Thanks, bye", "goodbye"), ("ok bye", "goodbye"),
+    ("What are your hours on Saturday?", "hours"), ("what are the visiting hours?", "hours"),
+    ("what time do you open tomorrow", "hours"), ("Are you open on Sundays?", "hours"),
+    ("What's the emergency number?", "emergency"), ("Please send an ambulance", "emergency"),
+    ("what's your email", "contact"), ("How do I contact the hospital?", "contact"), ("phone number of the clinic?", "contact"),
+    ("What's your address?", "location"), ("where is the hospital", "location"), ("Where exactly is Sunrise Medical Center?", "location"),
+    ("Do you do MRI scans?", "services"), ("Do you offer home visits?", "services"), ("Can I get a video consultation?", "services"),
+    ("Which departments does the hospital have?", "departments"), ("what specialties are there", "departments"),
+    ("Who are the cardiologists at Sunrise?", "doctors"), ("what is the fee of dr verma", "doctors"),
+    ("Is there a neurologist?", "doctors"), ("Who is Dr. Kavita Iyer?", "doctors"), ("list all dermatologists", "doctors"),
+    ("Do you accept UPI payments?", "payment"), ("Can I pay by card?", "payment"),
+    ("What should I bring to my appointment?", "documents"), ("Do I need to bring ID?", "documents"),
+    ("What is the refund if I cancel a day before?", "policy"), ("What's your cancellation policy?", "policy"),
+    ("I want to book an appointment", None), ("book appointment", None), ("2030-01-09", None), ("14:30", None),
+    ("Rahul Mehta", None), ("9876543210", None), ("rahul@example.com", None), ("Pune", None), ("yes", None),
+    ("I need to reschedule my appointment", None), ("Cancel my appointment please", None),
+    ("I've had chest pain and shortness of breath since yesterday", None), ("my son has a high fever", None),
+    ("I keep getting dizzy and tired", None), ("Is there any latest news about a flu outbreak in Pune?", None),
+    ("Does Dr. Priya Sharma have free slots on 2030-01-10?", None), ("Can I cancel and get my money back?", None),
+    ("which hospital is best for heart surgery", None), ("can you recommend a good diet", None),
+    ("What does a high creatinine level mean?", None), ("Should I take my blood pressure medicine before the test?", None),
+    ("I'd like to see a specialist about my knee", None), ("Is Dr. Verma free next Monday?", None),
+    ("The event ID is 0f8e2c1d9b7a4e3f8a6b5c4d3e2f1a0b, move it to 2030-02-01 at 10:00", None),
+    ("do you have parking", None), ("do you treat cancer", None), ("what does a cardiologist do", None),
+    ("I need a doctor for my 5 years old", None), ("Is there a blood bank?", None),
+    ("does dr verma speak hindi", None), ("Dr Verma qualifications", None), ("is dr rao available on monday", None),
+    ("is Dr. Sharma good with migraines", None),
+    ("I was in an emergency last week, what follow-up should I do?", None), ("what is the emergency room wait time", None),
+    ("I had an emergency c-section last month, when can I exercise?", None), ("Can I get emergency dental care?", None),
+    ("are you open on diwali", None), ("visiting hours for ICU patients", None), ("are you open on christmas day", None),
+    ("visiting hours for the maternity ward", None), ("Is there a doctor who speaks Tamil?", None),
+    ("I need an ambulance right now", "emergency"), ("This is an emergency!", "emergency"),
+]
+
+if __name__ == "__main__":
+    min_confidence = float(sys.argv[1]) if len(sys.argv) > 1 else 0.6
+    clinic_index = load_clinic_index("clinic.json")
+    started = time.perf_counter()
+    router = IntentRouter(clinic_index, min_confidence=min_confidence)
+    training_ms = (time.perf_counter() - started) * 1000
+
+    local = correct = missed = wrong = 0
+    started = time.perf_counter()
+    routed = [router.route(text) for text, _ in CORPUS]
+    per_turn_us = (time.perf_counter() - started) / len(CORPUS) * 1e6
+    print(f"{len(CORPUS)} messages, min_confidence {min_confidence}; trained in {training_ms:.0f} ms, {per_turn_us:.0f} us per message\n")
+    for (text, expected), result in zip(CORPUS, routed):
+        intent = result["intent"] if result else None
+        if result:
+            local += 1
+        if intent == expected:
+            correct += 1
+            continue
+        if result is None:
+            missed += 1
+            label = "missed (sent to LLM)"
+        else:
+            wrong += 1
+            label = f"wrong ({intent})"
+        print(f"  {label:<22} {text!r} expected {expected or 'LLM'}")
+    faq = sum(1 for _, expected in CORPUS if expected)
+    faq_local = sum(1 for (_, expected), result in zip(CORPUS, routed) if expected and result and result["intent"] == expected)
+    print(f"\nserved without an LLM call: {local}/{len(CORPUS)} turns ({local / len(CORPUS):.0%}); "
+          f"FAQ turns answered correctly: {faq_local}/{faq}")
+    print(f"routed as labelled: {correct}/{len(CORPUS)}; FAQs sent to the LLM: {missed}; wrong local answers: {wrong}")
@@ -0,0 +1,87 @@
+# Hot reload under load: reader threads answer hospital-info lookups from KnowledgeManager.current while
+# a writer keeps editing a copy of clinic.json (adding a doctor each time) and the watcher swaps in
+# rebuilt indexes. Reports reader latency with and without reloads, and checks that every lookup saw a
+# consistent snapshot (the doctor count of the roster it answered from matches the snapshot's JSON).
+# Run from the repository root: python benchmarks/knowledge_reload_bench.py [seconds] [readers]
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from knowledge import KnowledgeManager
+
+QUERIES = ["doctors in cardiology", "who are the neurologists", "pediatrics doctors", "consultation fee for dermatology"]
+
+if __name__ == "__main__":
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 3.0
+    readers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    with tempfile.TemporaryDirectory() as directory:
+        clinic_path = os.path.join(directory, "clinic.json")
+        shutil.copy("clinic.json", clinic_path)
+        with open(clinic_path, encoding="utf-8") as f:
+            base = json.load(f)
+        knowledge = KnowledgeManager(clinic_path, interval=0.05)
+        knowledge.load()
+        reloads = []
+        knowledge.listeners.append(lambda snapshot: reloads.append(time.perf_counter()))
+        knowledge.start()
+
+        def run(with_writer):
+            stop = threading.Event()
+            latencies, inconsistent = [], [0]
+            lock = threading.Lock()
+
+            def reader(n):
+                local = []
+                while not stop.is_set():
+                    started = time.perf_counter()
+                    snapshot = knowledge.current
+                    snapshot.clinic_index.answer(QUERIES[n % len(QUERIES)])
+                    listed = sum(len(doctors) for doctors in snapshot.clinic_index.doctors_by_department.values())
+                    local.append(time.perf_counter() - started)
+                    if listed > len(snapshot.clinic_index.data.get("doctors", [])):
+                        inconsistent[0] += 1
+                    n += 1
+                with lock:
+                    latencies.extend(local)
+
+            def writer():
+                edits = 0
+                while not stop.wait(0.2):
+                    edits += 1
+                    data = dict(base, doctors=base["doctors"] + [
+                        {"name": f"Dr. Test {i}", "specialty": "Cardiologist", "experience": "5 years"} for i in range(edits)])
+                    temp_path = f"{clinic_path}.tmp"
+                    with open(temp_path, "w", encoding="utf-8") as f:
+                        json.dump(data, f)
+                    os.replace(temp_path, clinic_path)
+
+            threads = [threading.Thread(target=reader, args=(n,)) for n in range(readers)]
+            if with_writer:
+                threads.append(threading.Thread(target=writer))
+            for thread in threads:
+                thread.start()
+            time.sleep(seconds)
+            stop.set()
+            for thread in threads:
+                thread.join()
+            return latencies, inconsistent[0]
+
+        for label, with_writer in [("no reloads", False), ("reloading", True)]:
+            reloads.clear()
+            latencies, inconsistent = run(with_writer)
+            cuts = statistics.quantiles(latencies, n=1000)
+            print(f"{label:<11} {len(latencies):>6} lookups, {len(reloads):>2} reloads, {inconsistent} inconsistent | "
+                  f"p50 {cuts[499] * 1e6:5.0f} us  p99 {cuts[989] * 1e6:6.0f} us  p99.9 {cuts[998] * 1e6:6.0f} us")
+        knowledge.stop()
+
+        started = time.perf_counter()
+        knowledge.check()
+        print(f"{readers} readers, {seconds:.0f} s per run; now generation {knowledge.current.generation}, "
+              f"version {knowledge.current.version}; unchanged-file check {(time.perf_counter() - started) * 1000:.2f} ms")
@@ -0,0 +1,80 @@
+# Success rate and latency percentiles of LLM calls against the fault-injecting FakeChatModel: a single
+# invoke with no client timeout (the old Assistant, which gave up on the first exception) against
+# ResilientLLM with a per-request timeout, jittered backoff, the circuit breaker and a fallback model.
+# Latencies are scaled down (20 ms median, one request per user every 50 ms) so the run takes seconds.
+# Run from the repository root: python benchmarks/llm_resilience_bench.py [threads] [seconds]
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_llm import FakeChatModel
+from llm_resilience import CircuitBreaker, ResilientLLM
+
+FLAKY = {"error_rate": 0.08, "rate_limit_rate": 0.05, "tail_rate": 0.03, "tail_latency": 1.5}
+
+def naive(model):
+    return model
+
+def resilient(primary, fallback=None, reset_timeout=0.5):
+    return ResilientLLM(primary, fallback,
+                        breaker=CircuitBreaker("primary", failure_threshold=5, reset_timeout=reset_timeout),
+                        fallback_breaker=CircuitBreaker("fallback", failure_threshold=5, reset_timeout=reset_timeout),
+                        max_attempts=3, deadline=1.0, base_delay=0.05, max_delay=0.4)
+
+def run(client, threads, seconds, interval=0.05):
+    """Each thread is a user sending a request every `interval` seconds (or as soon as the last one returns)."""
+    latencies, failures = [], []
+    lock = threading.Lock()
+    stop_at = time.monotonic() + seconds
+
+    def worker():
+        while time.monotonic() < stop_at:
+            started = time.perf_counter()
+            try:
+                client.invoke([{"role": "user", "content": "I have a fever"}])
+                ok = True
+            except Exception:
+                ok = False
+            elapsed = time.perf_counter() - started
+            with lock:
+                (latencies if ok else failures).append(elapsed)
+            time.sleep(max(0.0, interval - elapsed))
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return latencies, failures
+
+def report(label, latencies, failures, extra=""):
+    total = len(latencies) + len(failures)
+    everything = sorted(latencies + failures)
+    cuts = statistics.quantiles(everything, n=100) if len(everything) > 1 else everything * 99
+    print(f"{label:<34} calls {total:>5}  success {len(latencies) / total:6.1%}  "
+          f"p50 {cuts[49] * 1000:6.0f} ms  p95 {cuts[94] * 1000:6.0f} ms  p99 {cuts[98] * 1000:6.0f} ms{extra}")
+
+if __name__ == "__main__":
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 3.0
+
+    print(f"flaky primary (8% 5xx, 5% 429, 3% of requests stall 1.5 s), {threads} threads, {seconds:.0f} s each")
+    report("before: single call, no timeout", *run(naive(FakeChatModel(seed=1, **FLAKY)), threads, seconds))
+    report("after: timeout + retries", *run(resilient(FakeChatModel(seed=1, timeout=0.25, **FLAKY)), threads, seconds))
+
+    window = (seconds / 3, 2 * seconds / 3)
+    print(f"\nprimary outage (every call 503s from {window[0]:.0f} s to {window[1]:.0f} s)")
+    for label, make in [
+        ("before: single call", lambda primary, fallback: naive(primary)),
+        ("after: retries + breaker", lambda primary, fallback: resilient(primary)),
+        ("after: retries + breaker + fallback", lambda primary, fallback: resilient(primary, fallback)),
+    ]:
+        primary = FakeChatModel(seed=2, timeout=0.25, fail_between=window)
+        fallback = FakeChatModel(seed=3, timeout=0.25, median_latency=0.03)
+        latencies, failures = run(make(primary, fallback), threads, seconds)
+        report(label, latencies, failures,
+               f"  503s sent to primary {primary.calls['503']:>5}, fallback calls {fallback.calls['requests']}")
@@ -0,0 +1,92 @@
+# Wall-clock time of the tools node for one turn in which the model calls symptom_analysis_tool and
+# hospital_info_tool (plus a booking), with each tool's own LLM call replaced by a stub with fixed latency.
+# Sequential (one worker, as LangGraph's ToolNode ran them here) against ParallelToolNode's pool.
+# Run from the repository root: python benchmarks/parallel_tools_bench.py [llm_seconds] [rounds]
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import AIMessage
+from langchain_core.tools import tool
+
+from tool_runner import ParallelToolNode
+
+LLM_SECONDS = float(sys.argv[1]) if len(sys.argv) > 1 else 0.5
+writes = []
+
+def stub_llm(prompt):
+    time.sleep(LLM_SECONDS)
+    return f"analysis of: {prompt}"
+
+@tool
+def symptom_analysis_tool(symptoms: str) -> str:
+    """Analyzes symptoms."""
+    return stub_llm(symptoms)
+
+@tool
+def hospital_info_tool(query: str) -> str:
+    """Answers questions about the hospital."""
+    return stub_llm(query)
+
+@tool
+def check_availability(department: str = "") -> str:
+    """Lists free slots."""
+    time.sleep(0.002)
+    return f"free slots in {department}"
+
+@tool
+def book_appointment_with_user_details(date: str, time: str) -> str:
+    """Books an appointment."""
+    writes.append(("book", date, time))
+    return "Appointment successfully booked."
+
+@tool
+def cancel_google_calendar_appointment(event_id: str) -> str:
+    """Cancels an appointment."""
+    writes.append(("cancel", event_id))
+    return "Appointment cancelled."
+
+TOOLS = [symptom_analysis_tool, hospital_info_tool, check_availability,
+         book_appointment_with_user_details, cancel_google_calendar_appointment]
+WRITES = ["book_appointment_with_user_details", "cancel_google_calendar_appointment"]
+
+TURNS = {
+    "symptoms + hospital info": [
+        ("symptom_analysis_tool", {"symptoms": "chest pain"}),
+        ("hospital_info_tool", {"query": "which cardiologists do you have?"}),
+    ],
+    "3 lookups + cancel + book": [
+        ("symptom_analysis_tool", {"symptoms": "knee pain"}),
+        ("hospital_info_tool", {"query": "orthopedics visiting hours"}),
+        ("check_availability", {"department": "Orthopedics"}),
+        ("cancel_google_calendar_appointment", {"event_id": "old"}),
+        ("book_appointment_with_user_details", {"date": "2030-01-09", "time": "15:00"}),
+    ],
+}
+
+def turn_state(calls):
+    return {"messages": [AIMessage(content="", tool_calls=[
+        {"name": name, "args": args, "id": f"call_{n}"} for n, (name, args) in enumerate(calls)])]}
+
+def timed(node, calls, rounds):
+    config = {"configurable": {"thread_id": "bench"}}
+    started = time.perf_counter()
+    for _ in range(rounds):
+        writes.clear()
+        result = node(turn_state(calls), config)
+    elapsed = (time.perf_counter() - started) / rounds
+    assert [message.tool_call_id for message in result["messages"]] == [f"call_{n}" for n in range(len(calls))]
+    return elapsed, list(writes)
+
+if __name__ == "__main__":
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    sequential = ParallelToolNode(TOOLS, ordered_tools=WRITES, max_workers=1)
+    parallel = ParallelToolNode(TOOLS, ordered_tools=WRITES, max_workers=4)
+    print(f"stub LLM latency {LLM_SECONDS * 1000:.0f} ms per tool call")
+    for label, calls in TURNS.items():
+        before, _ = timed(sequential, calls, rounds)
+        after, order = timed(parallel, calls, rounds)
+        print(f"{label:<28} sequential {before * 1000:6.0f} ms   parallel {after * 1000:6.0f} ms   "
+              f"({before / after:.1f}x)" + (f"   writes in order: {order}" if order else ""))
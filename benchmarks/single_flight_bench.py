@@ -0,0 +1,98 @@
+# Upstream LLM calls for a burst of identical questions, with and without SingleFlight. The burst sends
+# a few symptom and hospital questions, differing only in case and punctuation ("Fever and cough?"),
+# many times at once through app1's symptom_analysis_tool and hospital_info_tool, with the fake model from the
+# end-to-end benchmark; the response cache is cleared before each run. A second burst does the same
+# with asyncio tasks against a synthetic upstream, through SingleFlight.do_async.
+# Run from the repository root: python benchmarks/single_flight_bench.py [requests] [concurrency]
+import asyncio
+import io
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from functools import partial
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from e2e_bench import LLM_SECONDS, import_app
+from fake_llm import FakeChatGroq
+from response_cache import normalize_query
+from single_flight import SingleFlight
+
+QUESTIONS = [
+    ("symptom_analysis_tool", "symptoms", "fever and cough"),
+    ("symptom_analysis_tool", "symptoms", "Fever and  cough?"),
+    ("symptom_analysis_tool", "symptoms", "my child has a fever and a cough"),
+    ("symptom_analysis_tool", "symptoms", "headache and nausea"),
+    ("hospital_info_tool", "query", "Does the hospital have an ICU?"),
+    ("hospital_info_tool", "query", "does the hospital have an icu"),
+    ("hospital_info_tool", "query", "Which doctor is best for a child with asthma?"),
+]
+
+class NoCoalescing:
+    def do(self, key, fn, timeout=None):
+        return fn()
+
+def burst(app1, requests, concurrency):
+    before = FakeChatGroq.calls["text"]
+    app1.response_cache.clear()
+    items = [QUESTIONS[n % len(QUESTIONS)] for n in range(requests)]
+    latencies = []
+
+    def ask(item):
+        tool, argument, text = item
+        started = time.perf_counter()
+        getattr(app1, tool).invoke({argument: text})
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(ask, items))
+    latencies.sort()
+    return FakeChatGroq.calls["text"] - before, time.perf_counter() - started, latencies[int(len(latencies) * 0.95)] * 1000
+
+async def async_burst(flights, requests, latency):
+    upstream = 0
+
+    async def call(text):
+        nonlocal upstream
+        upstream += 1
+        await asyncio.sleep(latency)
+        return text.upper()
+
+    texts = [QUESTIONS[n % len(QUESTIONS)][2] for n in range(requests)]
+    started = time.perf_counter()
+    if flights is None:
+        await asyncio.gather(*(call(text) for text in texts))
+    else:
+        await asyncio.gather(*(flights.do_async(normalize_query(text), partial(call, text)) for text in texts))
+    return upstream, time.perf_counter() - started
+
+if __name__ == "__main__":
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    print(f"{requests} requests, {concurrency} at once, {len(QUESTIONS)} wordings of "
+          f"{len({normalize_query(text) for _, _, text in QUESTIONS})} questions; LLM {LLM_SECONDS * 1000:.0f} ms per call\n")
+
+    quiet = partial(redirect_stdout, io.StringIO())
+    with tempfile.TemporaryDirectory() as directory:
+        app1, _ = import_app(directory, quiet)
+        flights = app1.tool_flights
+        with quiet():
+            app1.tool_flights = NoCoalescing()
+            calls, total, p95 = burst(app1, requests, concurrency)
+        print(f"threads, no coalescing:   {calls:>4} LLM calls, {total:5.2f} s, p95 {p95:6.1f} ms")
+        with quiet():
+            app1.tool_flights = flights
+            calls, total, p95 = burst(app1, requests, concurrency)
+        print(f"threads, SingleFlight:    {calls:>4} LLM calls, {total:5.2f} s, p95 {p95:6.1f} ms "
+              f"({flights.stats['joined']} joined)")
+
+    upstream, total = asyncio.run(async_burst(None, requests, LLM_SECONDS))
+    print(f"\nasyncio, no coalescing:   {upstream:>4} upstream calls, {total:5.2f} s")
+    flights = SingleFlight()
+    upstream, total = asyncio.run(async_burst(flights, requests, LLM_SECONDS))
+    print(f"asyncio, SingleFlight:    {upstream:>4} upstream calls, {total:5.2f} s ({flights.stats['joined']} joined)")
@@ -0,0 +1,80 @@
+# Cold-start cost. Part 1 runs `python -X importtime` on app1 (or another module) and lists the slowest
+# top-level imports, plus the cost of the imports that app1 now defers (PyMuPDF, langchain_community's
+# Tavily tool). Part 2 times the hospital PDF load: the old startup (parse twice, chunk, index) against
+# KnowledgeBase with an empty cache (first start) and with a warm cache (restarts, extra workers).
+# Run from the repository root: python benchmarks/startup_bench.py [pdf_path] [module]
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from knowledge import KnowledgeBase, extract_pdf_text
+from retrieval import BM25Index, chunk_text
+
+DEFAULT_PDF = "Sunrise Medical Center - AI-Powered Chatbot & Hospital Information.pdf"
+DEFERRED_IMPORTS = ["fitz", "langchain_community.tools.tavily_search"]
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+def import_times(module):
+    """Top-level imports (name, cumulative microseconds) of a fresh interpreter importing `module`."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    top_level = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match and not match.group(3):
+            top_level.append((match.group(4), int(match.group(2))))
+    return top_level
+
+def report_imports(module):
+    try:
+        top_level = import_times(module)
+    except RuntimeError as e:
+        print(f"import {module} failed: {e}")
+        return
+    print(f"import {module}: {sum(us for _, us in top_level) / 1000:.0f} ms total; slowest top-level imports:")
+    for name, us in sorted(top_level, key=lambda item: item[1], reverse=True)[:12]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+def timed(fn):
+    started = time.perf_counter()
+    fn()
+    return (time.perf_counter() - started) * 1000
+
+if __name__ == "__main__":
+    pdf_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_PDF
+    module = sys.argv[2] if len(sys.argv) > 2 else "app1"
+
+    report_imports(module)
+    print("deferred until first use:")
+    for name in DEFERRED_IMPORTS:
+        try:
+            print(f"  {sum(us for _, us in import_times(name)) / 1000:8.1f} ms  {name}")
+        except RuntimeError as e:
+            print(f"  {name}: not installed ({e})")
+
+    if not os.path.exists(pdf_path):
+        print(f"\n{pdf_path} not found; pass a PDF path to time the knowledge load")
+        sys.exit(0)
+
+    def old_startup():
+        medical_data = extract_pdf_text(pdf_path)
+        extract_pdf_text(pdf_path)
+        BM25Index(chunk_text(medical_data))
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        old_ms = timed(old_startup)
+        cold_ms = timed(lambda: KnowledgeBase(pdf_path, cache_dir=cache_dir).index)
+        warm_ms = min(timed(lambda: KnowledgeBase(pdf_path, cache_dir=cache_dir).index) for _ in range(5))
+        text_only_ms = min(timed(lambda: KnowledgeBase(pdf_path, cache_dir=cache_dir).text) for _ in range(5))
+    print(f"\nknowledge load for {os.path.basename(pdf_path)} ({os.path.getsize(pdf_path) // 1024} KB):")
+    print(f"  before (parse twice + chunk + index):  {old_ms:8.1f} ms  (includes importing PyMuPDF)")
+    print(f"  KnowledgeBase, empty cache:            {cold_ms:8.1f} ms")
+    print(f"  KnowledgeBase, warm cache:             {warm_ms:8.1f} ms  (text only: {text_only_ms:.1f} ms)")
@@ -0,0 +1,61 @@
+# Micro-benchmark: substring scan from the old respond_to_symptoms vs the precompiled SymptomMatcher
+# Run from the repository root: python benchmarks/symptom_matcher_bench.py [count]
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from clinic_index import load_clinic_index
+
+FILLERS = [
+    "I have been having", "for the last few days", "and also some", "my mother has",
+    "since yesterday", "it gets worse at night", "along with", "please help",
+]
+
+def old_scan(common_symptoms, user_input):
+    matching_departments = []
+    for department, symptoms in common_symptoms.items():
+        if any(symptom.lower() in user_input.lower() for symptom in symptoms):
+            matching_departments.append(department)
+    return matching_departments
+
+def synthetic_inputs(common_symptoms, count, seed=7):
+    rng = random.Random(seed)
+    all_symptoms = [symptom for symptoms in common_symptoms.values() for symptom in symptoms]
+    inputs = []
+    for _ in range(count):
+        parts = []
+        for _ in range(rng.randint(1, 4)):
+            parts.append(rng.choice(FILLERS))
+            symptom = rng.choice(all_symptoms).lower()
+            plural = rng.random() < 0.2 and not symptom.endswith("s")
+            parts.append(symptom + "s" if plural else symptom)
+        inputs.append(" ".join(parts))
+    return inputs
+
+def timed(fn, inputs):
+    started = time.perf_counter()
+    for text in inputs:
+        fn(text)
+    return time.perf_counter() - started
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    index = load_clinic_index("clinic.json")
+    common_symptoms = index.symptoms_by_department
+    inputs = synthetic_inputs(common_symptoms, count)
+
+    old_seconds = timed(lambda text: old_scan(common_symptoms, text), inputs)
+    new_seconds = timed(index.symptom_matcher.match, inputs)
+    missed = sum(
+        1 for text in inputs
+        if set(old_scan(common_symptoms, text)) - {match["department"] for match in index.symptom_matcher.match(text)}
+    )
+
+    print(f"inputs: {count}")
+    print(f"old substring scan: {old_seconds * 1000:.1f} ms ({old_seconds / count * 1e6:.1f} us/input)")
+    print(f"precompiled matcher: {new_seconds * 1000:.1f} ms ({new_seconds / count * 1e6:.1f} us/input)")
+    print(f"speedup: {old_seconds / new_seconds:.1f}x")
+    print(f"inputs where the matcher missed a department the scan found: {missed}")
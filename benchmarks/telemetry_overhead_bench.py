@@ -0,0 +1,102 @@
+# Cost of tracing. Times a turn-shaped tree of spans (node -> tools -> 2 tool calls -> LLM call each)
+# with metrics only and with JSONL export, against the same code with no spans, and runs one traced turn
+# through ParallelToolNode and ResilientLLM (stub model with fake token usage) to show the exported
+# spans and /metrics lines.
+# Run from the repository root: python benchmarks/telemetry_overhead_bench.py [turns]
+import json
+import os
+import sys
+import tempfile
+import time
+from contextlib import nullcontext
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import AIMessage
+from langchain_core.tools import tool
+
+from llm_resilience import ResilientLLM
+from telemetry import Tracer, TracedNode, tracer
+from tool_runner import ParallelToolNode
+
+SPANS_PER_TURN = 6
+
+def turn(span):
+    with span("node.assistant"):
+        with span("llm.assistant") as current:
+            current.set(prompt_tokens=900, completion_tokens=40)
+    with span("node.tools"):
+        for name in ("tool.symptom_analysis_tool", "tool.hospital_info_tool"):
+            with span(name) as current:
+                current.set(cache="miss")
+
+def per_turn_us(span, turns):
+    started = time.perf_counter()
+    for _ in range(turns):
+        turn(span)
+    return (time.perf_counter() - started) / turns * 1e6
+
+class NoSpan:
+    def set(self, **attributes):
+        pass
+
+def no_span(name):
+    return nullcontext(NoSpan())
+
+class UsageReply:
+    def __init__(self, content):
+        self.content = content
+        self.tool_calls = []
+        self.usage_metadata = {"input_tokens": 850, "output_tokens": 60}
+
+class StubModel:
+    def invoke(self, messages, *args, **kwargs):
+        time.sleep(0.01)
+        return UsageReply("analysis")
+
+stub_llm = ResilientLLM(StubModel(), name="tools")
+
+@tool
+def symptom_analysis_tool(symptoms: str) -> str:
+    """Analyzes symptoms."""
+    return stub_llm.invoke(symptoms).content
+
+@tool
+def hospital_info_tool(query: str) -> str:
+    """Answers questions about the hospital."""
+    return stub_llm.invoke(query).content
+
+if __name__ == "__main__":
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    with tempfile.TemporaryDirectory() as directory:
+        baseline = per_turn_us(no_span, turns)
+        metrics_only = per_turn_us(Tracer().span, turns)
+        exporting = Tracer().configure(spans_path=os.path.join(directory, "bench_spans.jsonl"))
+        with_export = per_turn_us(exporting.span, turns)
+        print(f"{SPANS_PER_TURN} spans per turn, {turns} turns")
+        print(f"  no tracing:          {baseline:7.1f} us per turn")
+        print(f"  metrics:             {metrics_only:7.1f} us per turn ({(metrics_only - baseline) / SPANS_PER_TURN:.1f} us per span)")
+        print(f"  metrics + JSONL:     {with_export:7.1f} us per turn ({(with_export - baseline) / SPANS_PER_TURN:.1f} us per span), "
+              f"{exporting.writer.dropped} spans dropped")
+        print("  (a real turn spends 1-10 s in Groq, Tavily and Google Calendar)")
+
+        spans_path = os.path.join(directory, "turn_spans.jsonl")
+        tracer.configure(spans_path=spans_path)
+        node = TracedNode("tools", ParallelToolNode([symptom_analysis_tool, hospital_info_tool]), tracer)
+        state = {"messages": [AIMessage(content="", tool_calls=[
+            {"name": "symptom_analysis_tool", "args": {"symptoms": "chest pain"}, "id": "call_0"},
+            {"name": "hospital_info_tool", "args": {"query": "cardiologists"}, "id": "call_1"}])]}
+        with tracer.span("chat", thread_id="bench"):
+            node(state, {"configurable": {"thread_id": "bench"}})
+        time.sleep(0.2)  # let the writer thread flush
+        print("\nspans of one traced turn:")
+        with open(spans_path, encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                extra = {key: value for key, value in record.items()
+                         if key not in ("trace_id", "span_id", "parent_id", "name", "start", "duration_ms", "status")}
+                print(f"  {record['name']:<30} {record['duration_ms']:7.1f} ms  parent={record['parent_id']}  id={record['span_id']}  {extra}")
+        print("\n/metrics (excerpt):")
+        for line in tracer.metrics.render().splitlines():
+            if "_bucket" not in line and not line.startswith("#"):
+                print(f"  {line}")
@@ -0,0 +1,88 @@
+# Multi-process load test: conversations are routed round-robin across worker processes that share
+# only the SQLite thread registry and checkpointer, and must resume each other's conversations.
+# Run from the repository root: python benchmarks/thread_routing_load.py [workers] [conversations] [turns]
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def worker(path, requests, results):
+    from langgraph.checkpoint.base import empty_checkpoint
+
+    from checkpointer import SQLiteCheckpointer
+    from thread_store import ThreadStore
+
+    saver = SQLiteCheckpointer(path, max_cached_threads=100)
+    store = ThreadStore(path)
+    while True:
+        request = requests.get()
+        if request is None:
+            break
+        conversation, turn, thread_id = request
+        # Same lookup as resolve_thread_id in app1.py
+        if not thread_id or not store.touch(thread_id):
+            thread_id = str(uuid.uuid4())
+            store.register(thread_id)
+        config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+        latest = saver.get_tuple(config)
+        messages = list(latest.checkpoint["channel_values"]["messages"]) if latest else []
+        messages.append(f"conversation {conversation} turn {turn} pid {os.getpid()}")
+        checkpoint = empty_checkpoint()
+        checkpoint["id"] = str(uuid.uuid1())
+        checkpoint["channel_values"] = {"messages": messages}
+        saver.put(latest.config if latest else config, checkpoint, {"step": turn}, {})
+        results.put((conversation, turn, thread_id))
+
+def main(worker_count, conversation_count, turns):
+    from checkpointer import SQLiteCheckpointer
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "shared.db")
+        SQLiteCheckpointer(path)  # create the schema before workers race for it
+        queues = [multiprocessing.Queue() for _ in range(worker_count)]
+        results = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=worker, args=(path, queue, results)) for queue in queues]
+        for process in processes:
+            process.start()
+
+        thread_ids = [None] * conversation_count
+        reissued = 0
+        started = time.perf_counter()
+        for turn in range(turns):
+            for conversation in range(conversation_count):
+                queues[(conversation + turn) % worker_count].put((conversation, turn, thread_ids[conversation]))
+            for _ in range(conversation_count):
+                conversation, _, thread_id = results.get()
+                if thread_ids[conversation] and thread_ids[conversation] != thread_id:
+                    reissued += 1
+                thread_ids[conversation] = thread_id
+        elapsed = time.perf_counter() - started
+        for queue in queues:
+            queue.put(None)
+        for process in processes:
+            process.join()
+
+        saver = SQLiteCheckpointer(path)
+        intact = 0
+        for conversation, thread_id in enumerate(thread_ids):
+            latest = saver.get_tuple({"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}})
+            messages = latest.checkpoint["channel_values"]["messages"] if latest else []
+            expected = [f"conversation {conversation} turn {turn}" for turn in range(turns)]
+            if [message.rsplit(" pid ", 1)[0] for message in messages] == expected:
+                intact += 1
+
+    print(f"workers: {worker_count}, conversations: {conversation_count}, turns: {turns}")
+    print(f"turns/s: {conversation_count * turns / elapsed:.0f}")
+    print(f"thread ids reissued: {reissued}")
+    print(f"conversations with complete, ordered history: {intact}/{conversation_count}")
+    return reissued == 0 and intact == conversation_count
+
+if __name__ == "__main__":
+    worker_count = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    conversation_count = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    turns = int(sys.argv[3]) if len(sys.argv) > 3 else 6
+    sys.exit(0 if main(worker_count, conversation_count, turns) else 1)
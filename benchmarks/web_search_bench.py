@@ -0,0 +1,79 @@
+# Upstream searches and latency for a burst of web searches, calling FakeTavily directly versus through
+# WebSearch (hospital data first, result cache, joining identical in-flight searches, rate limits).
+# The burst mixes repeated news queries, questions the hospital data answers and one chatty conversation.
+# Run from the repository root: python benchmarks/web_search_bench.py [searches] [concurrency] [search_ms]
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from clinic_index import load_clinic_index
+from fake_tavily import FakeTavily
+from response_cache import ResponseCache, SQLiteStore
+from web_search import SearchRateLimiter, WebSearch
+
+NEWS = [
+    "latest news about dengue outbreak in Pune",
+    "current flu season advisory India",
+    "recent heatwave health warnings Maharashtra",
+    "Latest news about the dengue outbreak in Pune?",
+]
+LOCAL = [
+    "Which doctors work in cardiology?",
+    "Dr. Priya Sharma consultation fee",
+]
+
+def workload(searches):
+    """(query, thread_id) pairs: most threads ask one or two questions, thread "chatty" asks many."""
+    items = []
+    for n in range(searches):
+        if n % 10 == 9:
+            items.append((f"news about new vaccine number {n}", "chatty"))
+        elif n % 5 == 4:
+            items.append((LOCAL[n % len(LOCAL)], f"thread-{n // 2}"))
+        else:
+            items.append((NEWS[n % len(NEWS)], f"thread-{n // 2}"))
+    return items
+
+def run(search, items, concurrency):
+    latencies = []
+    started = time.perf_counter()
+
+    def timed(item):
+        begun = time.perf_counter()
+        search(*item)
+        latencies.append(time.perf_counter() - begun)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(timed, items))
+    latencies.sort()
+    return time.perf_counter() - started, latencies[len(latencies) // 2] * 1000, latencies[int(len(latencies) * 0.95)] * 1000
+
+if __name__ == "__main__":
+    searches = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    latency = (float(sys.argv[3]) if len(sys.argv) > 3 else 300) / 1000
+    items = workload(searches)
+    clinic_index = load_clinic_index("clinic.json")
+    print(f"{searches} searches, {concurrency} at once, {latency * 1000:.0f} ms per upstream search\n")
+
+    raw = FakeTavily(latency=latency)
+    total, p50, p95 = run(lambda query, thread_id: raw.invoke({"query": query}), items, concurrency)
+    print(f"direct:     {raw.calls:>4} upstream searches, {total:6.2f} s, p50 {p50:6.1f} ms, p95 {p95:6.1f} ms")
+
+    with tempfile.TemporaryDirectory() as directory:
+        backend = FakeTavily(latency=latency)
+        searcher = WebSearch(
+            lambda: backend,
+            cache=ResponseCache(SQLiteStore(os.path.join(directory, "web_search_cache.db")), ttl=3600),
+            limiter=SearchRateLimiter(global_per_minute=30, thread_per_minute=4),
+            local_answer=clinic_index.answer,
+        )
+        total, p50, p95 = run(lambda query, thread_id: searcher.search(query, thread_id), items, concurrency)
+        print(f"WebSearch:  {backend.calls:>4} upstream searches, {total:6.2f} s, p50 {p50:6.1f} ms, p95 {p95:6.1f} ms")
+        stats = dict(searcher.stats, joined=searcher.flights.stats["joined"])
+        print("  " + ", ".join(f"{name} {count}" for name, count in stats.items()))
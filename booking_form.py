@@ -0,0 +1,395 @@
+import calendar
+import re
+from datetime import datetime, timedelta
+
+from clinic_index import singularize
+
+# Asked in this order; "doctor" covers both department and doctor
+FIELDS = ["doctor", "date", "time", "name", "phone", "email", "city", "reason"]
+
+QUESTIONS = {
+    "doctor": "Which department or doctor would you like to see? If you're not sure, tell me your symptoms and I'll suggest one.",
+    "date": "What date would you like? Please use YYYY-MM-DD (for example, 2025-12-25).",
+    "time": "What time would you like on {date}? Please use HH:MM (for example, 14:30).",
+    "name": "May I have your full name?",
+    "phone": "What's your phone number?",
+    "email": "What's your email address?",
+    "city": "Which city are you in?",
+    "reason": "Briefly, what's the reason for your visit?",
+}
+
+BOOKING_INTENT = re.compile(r"\b(book|schedule|appointment|appoint|consultation)\b")
+OTHER_INTENT = re.compile(r"\b(cancel|reschedule|update|change|move|postpone|fee|fees|cost|price|how)\b")
+STOP_WORDS = re.compile(r"\b(never ?mind|forget it|stop booking|don'?t book|not now)\b")
+YES = re.compile(r"^\s*(yes|yeah|yep|yup|sure|ok|okay|confirm|confirmed|correct|go ahead|please do|book it)\b")
+
+EMAIL = re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b")
+PHONE = re.compile(r"(?<![\w@.])\+?\d[\d\s().-]{7,}\d(?![\w@])")
+ISO_DATE = re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b")
+NUMERIC_DATE = re.compile(r"\b(\d{1,2})[/.-](\d{1,2})[/.-](\d{4})\b")
+CLOCK_TIME = re.compile(r"\b(\d{1,2})(?:[:.](\d{2}))?\s*(am|pm|a\.m\.|p\.m\.)?(?![\d-])", re.IGNORECASE)
+MONTHS = {name.lower(): number for number, name in enumerate(calendar.month_name) if name}
+MONTHS.update({name.lower(): number for number, name in enumerate(calendar.month_abbr) if name})
+MONTH_NAMES = "|".join(sorted(MONTHS, key=len, reverse=True))
+DAY_MONTH = re.compile(rf"\b(\d{{1,2}})(?:st|nd|rd|th)?\s+(?:of\s+)?({MONTH_NAMES})\.?(?:,?\s+(\d{{4}}))?\b", re.IGNORECASE)
+MONTH_DAY = re.compile(rf"\b({MONTH_NAMES})\.?\s+(\d{{1,2}})(?:st|nd|rd|th)?(?:,?\s+(\d{{4}}))?\b", re.IGNORECASE)
+WEEKDAY_NAMES = [name.lower() for name in calendar.day_name]
+# Full month names; "May" is also a first name
+MONTH_WORDS = {name.lower() for name in calendar.month_name if name} - {"may"}
+# Explicit introductions, accepted whichever field is being asked for
+NAME_PHRASE = re.compile(r"\b(?:my name is|name is|call me)\s+([A-Za-z][A-Za-z.'-]*(?:\s+[A-Za-z][A-Za-z.'-]*){0,3})", re.IGNORECASE)
+CITY_PHRASE = re.compile(r"\b(?:i live in|i'm from|i am from|from the city of|city is|my city is|living in|based in)\s+([A-Za-z][A-Za-z.'-]*(?:\s+[A-Za-z][A-Za-z.'-]*){0,2})", re.IGNORECASE)
+# Loose ones, only tried when the form has just asked for that field. "I'm John Smith" but not
+# "I'm having chest pain": only capitalised words count
+NAME_INTRO = re.compile(r"\b(?i:i am|i'm|this is)\s+([A-Z][a-z.'-]+(?:\s+[A-Z][a-z.'-]+){0,3})\b")
+CITY_INTRO = re.compile(r"\b(?i:from|in)\s+([A-Z][a-z.'-]+(?:\s+[A-Z][a-z.'-]+){0,2})\b")
+WORDS_ONLY = re.compile(r"^[A-Za-z][A-Za-z.'-]*(?:\s+[A-Za-z][A-Za-z.'-]*)*$")
+LEADING_FILLER = re.compile(r"^(?:it'?s|it is|sure,?|ok,?|okay,?|my \w+ is|the \w+ is)\s+", re.IGNORECASE)
+FILLER_WORDS = {"yes", "no", "ok", "okay", "sure", "hi", "hello", "thanks", "thank", "you", "please", "yeah", "yep",
+                "nope", "nothing", "none", "idk", "hmm", "fine", "same", "sorry", "just", "not", "wait"}
+NOT_A_NAME = FILLER_WORDS | {
+    "what", "why", "how", "when", "where", "which", "who", "can", "could", "is", "are", "do", "does", "the", "a",
+    "i", "i'm", "im", "my", "me", "live", "from", "in", "urgent", "emergency", "feeling", "feel", "having", "sick",
+    "unwell", "ill", "today", "tomorrow", "appointment", "doctor", "dr", "hospital", "clinic",
+}
+# Fields whose answer is free text; a date or time in it ("fever since Tuesday") is part of the answer
+FREE_TEXT_FIELDS = ("name", "city", "reason")
+CHANGE_REQUEST = re.compile(r"\b(?:change|move|switch|make it|instead|reschedule)\b", re.IGNORECASE)
+DATE_TIME_WORDS = re.compile(rf"\b(?:on|at|for|the|of|day|after|next|this|today|tomorrow|morning|afternoon|evening|"
+                             rf"{'|'.join(WEEKDAY_NAMES)}|am|pm|a\.m\.|p\.m\.)\b", re.IGNORECASE)
+
+class BookingForm:
+    """Deterministic booking dialogue: pulls fields out of each user message, validates them locally and
+    asks for the next missing one from a template, so the LLM only sees turns it is actually needed for.
+
+    `step()` returns {"booking", "action", "reply", "args"}; action is "reply" (send `reply`), "book"
+    (call the booking tool with `args`), or "llm" (let the assistant handle this turn). The booking dict
+    is plain JSON so it can live in the graph state and the checkpointer.
+    """
+
+    def __init__(self, clinic_index, availability=None, now=datetime.now):
+        self.clinic_index = clinic_index
+        self.availability = availability
+        self.now = now
+
+    # Field parsers: each returns (value, error); value None and error None means "not present"
+
+    def parse_date(self, text):
+        today = self.now().date()
+        lowered = text.lower()
+        date = None
+        match = ISO_DATE.search(text)
+        if match:
+            date = self._make_date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+        elif NUMERIC_DATE.search(text):
+            day, month, year = map(int, NUMERIC_DATE.search(text).groups())
+            date = self._make_date(year, month, day)
+        elif DAY_MONTH.search(text) or MONTH_DAY.search(text):
+            match = DAY_MONTH.search(text)
+            if match:
+                day, month, year = match.group(1), match.group(2), match.group(3)
+            else:
+                month, day, year = MONTH_DAY.search(text).groups()
+            month = MONTHS[month.lower().rstrip(".")]
+            date = self._make_date(int(year) if year else today.year, month, int(day))
+            if date and not year and date < today:
+                date = self._make_date(today.year + 1, month, int(day))
+        elif "day after tomorrow" in lowered:
+            date = today + timedelta(days=2)
+        elif re.search(r"\btomorrow\b", lowered):
+            date = today + timedelta(days=1)
+        elif re.search(r"\btoday\b", lowered):
+            date = today
+        else:
+            for weekday, name in enumerate(WEEKDAY_NAMES):
+                if re.search(rf"\b(?:next\s+|this\s+|on\s+)?{name}\b", lowered):
+                    date = today + timedelta(days=(weekday - today.weekday() - 1) % 7 + 1)
+                    break
+        if date is None:
+            return None, None
+        if date is False:
+            return None, "That doesn't look like a valid date. Please use YYYY-MM-DD (for example, 2025-12-25)."
+        if date < today:
+            return None, "That date has already passed. Please choose a future date."
+        if self.availability and date.weekday() not in self.availability.hours:
+            return None, f"We're closed on {calendar.day_name[date.weekday()]}s. Please choose another date."
+        return date.strftime("%Y-%m-%d"), None
+
+    @staticmethod
+    def _make_date(year, month, day):
+        try:
+            return datetime(year, month, day).date()
+        except ValueError:
+            return False
+
+    def parse_time(self, text, lenient=False):
+        for match in CLOCK_TIME.finditer(text):
+            hours, minutes, meridiem = int(match.group(1)), match.group(2), (match.group(3) or "").replace(".", "").lower()
+            if not minutes and not meridiem and not lenient:
+                continue
+            if meridiem:
+                if not 1 <= hours <= 12:
+                    continue
+                hours = hours % 12 + (12 if meridiem == "pm" else 0)
+            elif not minutes and 1 <= hours <= 7:
+                # A bare "3" during opening hours (8 AM - 8 PM) can only mean the afternoon
+                hours += 12
+            minutes = int(minutes or 0)
+            if hours > 23 or minutes > 59:
+                return None, "That doesn't look like a valid time. Please use HH:MM (for example, 14:30)."
+            return f"{hours:02d}:{minutes:02d}", None
+        return None, None
+
+    @staticmethod
+    def parse_phone(text):
+        for match in PHONE.finditer(text):
+            if ISO_DATE.fullmatch(match.group().strip()) or NUMERIC_DATE.fullmatch(match.group().strip()):
+                continue
+            digits = re.sub(r"\D", "", match.group())
+            if 10 <= len(digits) <= 15:
+                return match.group().strip(), None
+            return None, "That phone number looks incomplete. Please include all digits."
+        return None, None
+
+    @staticmethod
+    def parse_email(text):
+        match = EMAIL.search(text)
+        if match:
+            return match.group(), None
+        if "@" in text:
+            return None, "That email address doesn't look right. Please check it (for example, name@example.com)."
+        return None, None
+
+    def _bare_words(self, text, max_words):
+        candidate = LEADING_FILLER.sub("", text.strip().rstrip(".!"))
+        words = candidate.split()
+        if 1 <= len(words) <= max_words and WORDS_ONLY.match(candidate) \
+                and not any(self._not_a_name(word.lower().strip(".'")) for word in words):
+            return " ".join(word[:1].upper() + word[1:] for word in words)
+        return None
+
+    def _not_a_name(self, word):
+        """Filler, date, department and symptom words are never part of a name or city."""
+        return word in NOT_A_NAME or word in MONTH_WORDS or word in WEEKDAY_NAMES \
+            or word in self.clinic_index.medical_words or singularize(word) in self.clinic_index.medical_words
+
+    def parse_name(self, text, asked=False, lenient=False):
+        match = NAME_PHRASE.search(text) or (NAME_INTRO.search(text) if asked else None)
+        if match:
+            name = self._bare_words(match.group(1), 4)
+            if name:
+                return name, None
+        return (self._bare_words(text, 4) if lenient else None), None
+
+    def parse_city(self, text, asked=False, lenient=False):
+        match = CITY_PHRASE.search(text) or (CITY_INTRO.search(text) if asked else None)
+        if match:
+            return self._bare_words(match.group(1), 3), None
+        return (self._bare_words(text, 3) if lenient else None), None
+
+    @staticmethod
+    def parse_reason(text):
+        words = re.findall(r"[a-z']+", text.lower())
+        if not words or all(word in FILLER_WORDS for word in words):
+            return None, "I still need a short reason for the visit, for example \"fever and cough\"."
+        return text.strip(), None
+
+    @staticmethod
+    def only_date_time(text):
+        """True for a message that is just a date and/or time ("next Friday at 3 pm")."""
+        for pattern in (ISO_DATE, NUMERIC_DATE, DAY_MONTH, MONTH_DAY, CLOCK_TIME):
+            text = pattern.sub(" ", text)
+        text = re.sub(r"\bday after\b", " ", text, flags=re.IGNORECASE)
+        return not re.search(r"\w", DATE_TIME_WORDS.sub(" ", text))
+
+    def parse_doctor(self, text):
+        """Returns ({"doctor", "department"}, error) from a doctor name or a department/specialty mention."""
+        doctors = self.clinic_index.find_doctors(text)
+        if len(doctors) == 1:
+            doctor = doctors[0]
+            return {"doctor": doctor["name"], "department": self.clinic_index.department_for_specialty(doctor["specialty"])}, None
+        if doctors:
+            names = " or ".join(f"{doctor['name']} ({doctor['specialty']})" for doctor in doctors)
+            return None, f"Did you mean {names}?"
+        departments = self.clinic_index.resolve_departments(text, fuzzy=False)
+        if not departments:
+            # A typo-corrected department is only a guess: ask rather than pick its doctor
+            guessed = self.clinic_index.resolve_departments(text)
+            if len(guessed) == 1:
+                return None, f"Did you mean {guessed[0]}? Please type the department or doctor's name."
+        if len(departments) == 1:
+            department = departments[0]
+            listed = self.clinic_index.doctors_by_department.get(department, [])
+            if len(listed) == 1:
+                return {"doctor": listed[0]["name"], "department": department}, None
+            if listed:
+                names = ", ".join(doctor["name"] for doctor in listed)
+                return {"department": department}, f"In {department} you can see {names}. Which doctor would you prefer?"
+            return {"doctor": "", "department": department}, None
+        return None, None
+
+    # Dialogue
+
+    def wants_booking(self, text):
+        lowered = text.lower()
+        return bool(BOOKING_INTENT.search(lowered)) and not OTHER_INTENT.search(lowered)
+
+    @staticmethod
+    def missing(booking):
+        return [field for field in FIELDS if field not in booking]
+
+    def _extract(self, booking, text, expecting):
+        """Fills fields from text. Loose formats (a bare name, city, hour or free text) are only accepted
+        for the field that was just asked for; corrections to earlier fields overwrite them."""
+        found, errors = [], []
+        def accept(field, value, error):
+            if value is not None:
+                booking[field] = value
+                found.append(field)
+            elif error:
+                errors.append(error)
+
+        email, error = self.parse_email(text)
+        accept("email", email, error)
+        scrubbed = EMAIL.sub(" ", text)
+        phone, error = self.parse_phone(scrubbed)
+        accept("phone", phone, error if expecting == "phone" else None)
+        if phone:
+            scrubbed = scrubbed.replace(phone, " ")
+        # While a free-text field is being asked for, a date or time only counts as a change to the booking
+        # when the message asks for one or is nothing but a date; otherwise it belongs to the answer
+        if expecting not in FREE_TEXT_FIELDS or CHANGE_REQUEST.search(text) or self.only_date_time(scrubbed):
+            accept("date", *self.parse_date(scrubbed))
+            for pattern in (ISO_DATE, NUMERIC_DATE, DAY_MONTH, MONTH_DAY):
+                scrubbed = pattern.sub(" ", scrubbed)
+            accept("time", *self.parse_time(scrubbed, lenient=expecting == "time"))
+
+        if expecting in (None, "doctor"):
+            choice, error = self.parse_doctor(text)
+            if choice:
+                booking.pop("doctor", None)
+                booking.update(choice)
+                if "doctor" in choice:
+                    found.append("doctor")
+            if error:
+                errors.append(error)
+        if expecting == "phone" and "phone" not in found and re.search(r"\d", scrubbed) and not errors:
+            errors.append("That phone number looks incomplete. Please include all digits.")
+        accept("name", *self.parse_name(text, asked=expecting == "name"))
+        accept("city", *self.parse_city(text, asked=expecting == "city"))
+        if found or errors:
+            return found, errors
+
+        if expecting == "name":
+            accept("name", *self.parse_name(text, asked=True, lenient=True))
+        elif expecting == "city":
+            accept("city", *self.parse_city(text, asked=True, lenient=True))
+        elif expecting == "reason":
+            accept("reason", *self.parse_reason(text))
+        return found, errors
+
+    def _within_hours(self, date, time):
+        opening, closing = self.availability.hours.get(datetime.strptime(date, "%Y-%m-%d").weekday(), (0, 0))
+        start = int(time[:2]) * 60 + int(time[3:])
+        return opening <= start <= closing - self.availability.duration \
+            and datetime.strptime(f"{date} {time}", "%Y-%m-%d %H:%M") > self.now()
+
+    def _check_slot(self, booking):
+        """Drops a requested time that is outside opening hours or already taken, returning why."""
+        if not self.availability or "date" not in booking or "time" not in booking:
+            return None
+        doctor, date = booking.get("doctor") or "", booking["date"]
+        if self._within_hours(date, booking["time"]) and (not doctor or self.availability.is_free(doctor, date, booking["time"])):
+            return None
+        del booking["time"]
+        free = self.availability.free_slots(doctor, date, after=self.now())
+        if not free:
+            del booking["date"]
+            return "There are no free slots left on that date. Please choose another date."
+        return f"That time isn't available. Free slots: {', '.join(free[:8])}."
+
+    @staticmethod
+    def _describe(booking, field):
+        if field == "doctor":
+            return booking["doctor"] or f"any available doctor in {booking['department']}"
+        return f"{field} {booking[field]}"
+
+    def question(self, booking, field):
+        text = QUESTIONS[field].format(**booking)
+        if field == "time" and self.availability and booking.get("doctor"):
+            free = self.availability.free_slots(booking["doctor"], booking["date"], after=self.now())
+            if free:
+                text += f" Free slots with {booking['doctor']}: {', '.join(free[:8])}."
+        return text
+
+    def summary(self, booking):
+        with_doctor = booking["doctor"] or "the next available doctor"
+        department = f" ({booking['department']})" if booking.get("department") else ""
+        return (f"Please confirm your appointment: {booking['date']} at {booking['time']} with {with_doctor}{department}. "
+                f"Name: {booking['name']}, phone: {booking['phone']}, email: {booking['email']}, city: {booking['city']}, "
+                f"reason: {booking['reason']}. Shall I book it? (yes/no)")
+
+    def step(self, booking, text, recent_text=""):
+        """Advances the booking dialogue by one user message."""
+        if booking is None:
+            if not self.wants_booking(text):
+                return {"booking": None, "action": "llm", "reply": None, "args": None}
+            booking, intro = {}, None
+            # Carry over a doctor the assistant just recommended (e.g. after symptom analysis)
+            recommended = self.clinic_index.find_doctors(recent_text) if recent_text else []
+            if len(recommended) == 1 and not self.clinic_index.find_doctors(text):
+                doctor = recommended[0]
+                booking.update(doctor=doctor["name"], department=self.clinic_index.department_for_specialty(doctor["specialty"]))
+                intro = f"I'll book you with {booking['doctor']} ({booking['department']})."
+            expecting = None
+        else:
+            intro = None
+            booking = {key: value for key, value in booking.items()}
+            expecting = booking.pop("_expecting", None)
+
+        if STOP_WORDS.search(text.lower()):
+            return {"booking": None, "action": "reply", "reply": "No problem, I've stopped the booking. Anything else I can help with?", "args": None}
+
+        if expecting == "confirm":
+            if YES.match(text.lower()):
+                return {"booking": dict(booking, _expecting="booking"), "action": "book", "reply": None, "args": self.tool_args(booking)}
+            # Changes at this point are free-form; the assistant takes over the rest of this booking
+            return {"booking": None, "action": "llm", "reply": None, "args": None}
+
+        found, errors = self._extract(booking, text, expecting)
+        slot_error = self._check_slot(booking)
+        if slot_error:
+            errors.append(slot_error)
+            found = [field for field in found if field in booking]
+        if expecting and not found and not errors:
+            # Nothing we understand (a question, a change of mind, symptoms...): the assistant takes this turn
+            return {"booking": dict(booking, _expecting=expecting), "action": "llm", "reply": None, "args": None}
+
+        missing = self.missing(booking)
+        parts = [intro] if intro else []
+        if found:
+            parts.append("Got it: " + ", ".join(self._describe(booking, field) for field in found) + ".")
+        parts.extend(errors)
+        if not missing:
+            parts.append(self.summary(booking))
+            next_expecting = "confirm"
+        else:
+            next_expecting = missing[0]
+            if not any(error.endswith("?") for error in errors):
+                parts.append(self.question(booking, next_expecting))
+        return {"booking": dict(booking, _expecting=next_expecting), "action": "reply", "reply": " ".join(parts), "args": None}
+
+    @staticmethod
+    def tool_args(booking):
+        return {
+            "date": booking["date"], "time": booking["time"], "name": booking["name"], "phone": booking["phone"],
+            "email": booking["email"], "city": booking["city"], "user_message": booking["reason"],
+            "department": booking.get("department") or "", "doctor": booking.get("doctor") or "",
+        }
+
+    def after_booking(self, booking, result):
+        """Turns the booking tool's result into the reply; on a slot clash, asks for another time."""
+        if result.startswith("Not booked") and booking:
+            booking = {key: value for key, value in booking.items() if key not in ("time", "_expecting")}
+            return {"booking": dict(booking, _expecting="time"), "reply": f"{result} Which time would you like instead?"}
+        return {"booking": None, "reply": result}
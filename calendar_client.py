@@ -0,0 +1,111 @@
+import os
+import pickle
+import threading
+from datetime import datetime, timedelta
+
+class CalendarClient:
+    """Process-wide Google Calendar handle: credentials are unpickled once, refreshed ahead of expiry in
+    the background, and one service object is shared by all request threads.
+
+    The discovery-built service is reused across threads; each request it creates is bound to an
+    HTTP connection owned by the calling thread, since httplib2 connections are not thread-safe.
+    """
+
+    def __init__(self, client_config, scopes, token_path="token.pickle", refresh_margin=300, build_service=None):
+        self.client_config = client_config
+        self.scopes = scopes
+        self.token_path = token_path
+        self.refresh_margin = refresh_margin
+        self.build_service = build_service or self._build_google_service
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.creds = None
+        self._service = None
+        self._refresher = None
+        self._stop = threading.Event()
+
+    # Credentials
+
+    def _save(self):
+        with open(self.token_path, 'wb') as token:
+            pickle.dump(self.creds, token)
+
+    def _refresh(self):
+        from google.auth.transport.requests import Request
+        self.creds.refresh(Request())
+        self._save()
+
+    def credentials(self):
+        """Returns valid credentials, loading token.pickle only on first use."""
+        with self.lock:
+            if self.creds is None and os.path.exists(self.token_path):
+                with open(self.token_path, 'rb') as token:
+                    self.creds = pickle.load(token)
+            if self.creds and not self.creds.valid and self.creds.expired and self.creds.refresh_token:
+                try:
+                    self._refresh()
+                except Exception as e:
+                    print(f"Error refreshing credentials: {str(e)}")
+            if not self.creds or not self.creds.valid:
+                from google_auth_oauthlib.flow import InstalledAppFlow
+                flow = InstalledAppFlow.from_client_config(self.client_config, self.scopes)
+                self.creds = flow.run_local_server(port=8080)
+                self._save()
+                self._service = None
+                self.local = threading.local()
+            self._start_refresher()
+            return self.creds
+
+    def _seconds_until_refresh(self):
+        expiry = getattr(self.creds, "expiry", None)
+        if not expiry:
+            return self.refresh_margin
+        # google-auth stores expiry as a naive UTC datetime
+        return max((expiry - timedelta(seconds=self.refresh_margin) - datetime.utcnow()).total_seconds(), 5)
+
+    def _start_refresher(self):
+        if self._refresher is not None or not getattr(self.creds, "refresh_token", None):
+            return
+        def run():
+            while not self._stop.wait(self._seconds_until_refresh()):
+                try:
+                    # Refresh outside the lock so requests keep using the still-valid token meanwhile
+                    from google.auth.transport.requests import Request
+                    self.creds.refresh(Request())
+                    with self.lock:
+                        self._save()
+                except Exception as e:
+                    print(f"Error refreshing credentials in background: {str(e)}")
+        self._refresher = threading.Thread(target=run, name="calendar-credentials-refresh", daemon=True)
+        self._refresher.start()
+
+    # Service
+
+    def _thread_http(self):
+        http = getattr(self.local, "http", None)
+        if http is None:
+            import google_auth_httplib2
+            import httplib2
+            http = google_auth_httplib2.AuthorizedHttp(self.creds, http=httplib2.Http())
+            self.local.http = http
+        return http
+
+    def _build_google_service(self, creds):
+        from googleapiclient.discovery import build
+        from googleapiclient.http import HttpRequest
+
+        def build_request(http, *args, **kwargs):
+            return HttpRequest(self._thread_http(), *args, **kwargs)
+        return build('calendar', 'v3', credentials=creds, requestBuilder=build_request, cache_discovery=False)
+
+    def service(self):
+        """Returns the shared Calendar service, building it on first use."""
+        creds = self.credentials()
+        if self._service is None:
+            with self.lock:
+                if self._service is None:
+                    self._service = self.build_service(creds)
+        return self._service
+
+    def close(self):
+        self._stop.set()
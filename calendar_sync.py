@@ -0,0 +1,154 @@
+import json
+import os
+import random
+import threading
+import time
+import uuid
+
+from telemetry import span
+
+# Statuses worth retrying; anything else in the 4xx range is a permanent rejection
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+# Google Calendar accepts at most 50 calls per batch request
+MAX_BATCH = 50
+
+def error_status(error):
+    """HTTP status of a googleapiclient HttpError (or anything shaped like one), else None."""
+    return getattr(getattr(error, "resp", None), "status", None)
+
+class CalendarSyncWorker:
+    """Drains the calendar_outbox table in the background, so booking, rescheduling and cancelling
+    only wait for the local SQLite commit.
+
+    Entries for the same event are applied in order. Every operation is idempotent: inserts carry the
+    client-generated event ID (a 409 means an earlier attempt already landed), patches set absolute
+    times, and a missing event on delete counts as done. Transient failures back off exponentially
+    with full jitter; after max_attempts, or on a permanent error, the appointment is marked failed.
+    When several entries are due they go out as Calendar batch requests, one round-trip per 50 changes.
+
+    Every gunicorn worker runs one of these on the same database. Each claims the entries it sends
+    (AppointmentRepository.claim_outbox) for lease_seconds, so a change is sent by one worker, and a
+    claim left by a worker that died is picked up again once its lease runs out.
+    """
+
+    def __init__(self, repo, get_service, calendar_id="primary", poll_interval=1.0, batch_size=MAX_BATCH,
+                 max_attempts=8, base_delay=1.0, max_delay=300.0, lease_seconds=300.0):
+        self.repo = repo
+        self.get_service = get_service
+        self.calendar_id = calendar_id
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.lease_seconds = lease_seconds
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.random = random.Random()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _request(self, events, entry):
+        event_id = entry["event_id"]
+        payload = json.loads(entry["payload"]) if entry["payload"] else None
+        if entry["operation"] == "insert":
+            return events.insert(calendarId=self.calendar_id, body=dict(payload, id=event_id))
+        if entry["operation"] == "update":
+            return events.patch(calendarId=self.calendar_id, eventId=event_id, body=payload)
+        if entry["operation"] == "delete":
+            return events.delete(calendarId=self.calendar_id, eventId=event_id)
+        raise ValueError(f"Unknown outbox operation: {entry['operation']}")
+
+    def _backoff(self, attempts):
+        return self.random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempts)))
+
+    def _settle(self, entry, error):
+        """Records the outcome of one outbox entry: done, retry later, or failed."""
+        status = error_status(error) if error is not None else None
+        if error is None or (entry["operation"] == "insert" and status == 409) \
+                or (entry["operation"] == "delete" and status in (404, 410)):
+            self.repo.finish_outbox(entry["id"], entry["event_id"], "done")
+            return
+        attempts = entry["attempts"] + 1
+        retryable = status is None or status in RETRYABLE_STATUSES
+        if retryable and attempts < self.max_attempts:
+            self.repo.retry_outbox(entry["id"], attempts, time.time() + self._backoff(attempts), str(error))
+        else:
+            print(f"Calendar sync failed for event {entry['event_id']} ({entry['operation']}): {str(error)}")
+            self.repo.finish_outbox(entry["id"], entry["event_id"], "failed", str(error))
+
+    def _send_batch(self, service, entries):
+        """Sends up to MAX_BATCH entries as one batch HTTP request; each part succeeds or fails on its own."""
+        outcomes = {}
+        def callback(request_id, response, exception):
+            outcomes[request_id] = exception
+        batch = service.new_batch_http_request(callback=callback)
+        for entry in entries:
+            batch.add(self._request(service.events(), entry), request_id=str(entry["id"]))
+        try:
+            batch.execute()
+        except Exception as e:
+            # The batch itself failed (network, 5xx on the batch endpoint): nothing is known to have applied
+            for entry in entries:
+                outcomes.setdefault(str(entry["id"]), e)
+        for entry in entries:
+            self._settle(entry, outcomes.get(str(entry["id"])))
+
+    def process_due(self):
+        """Claims and applies due outbox entries once; returns the number of entries that were attempted.
+
+        Claimed entries never include two for the same event, so they can share a batch request safely.
+        """
+        entries = self.repo.claim_outbox(self.owner, self.batch_size, self.lease_seconds)
+        if not entries:
+            return 0
+        with span("calendar.sync", entries=len(entries)):
+            self._process(entries)
+        return len(entries)
+
+    def _process(self, entries):
+        try:
+            service = self.get_service()
+        except Exception as e:
+            for entry in entries:
+                self._settle(entry, e)
+            return
+        if len(entries) > 1 and hasattr(service, "new_batch_http_request"):
+            for start in range(0, len(entries), MAX_BATCH):
+                self._send_batch(service, entries[start:start + MAX_BATCH])
+        else:
+            for entry in entries:
+                try:
+                    self._request(service.events(), entry).execute()
+                except Exception as e:
+                    self._settle(entry, e)
+                else:
+                    self._settle(entry, None)
+
+    def notify(self):
+        """Wakes the worker so a freshly committed entry is sent without waiting for the next poll."""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                processed = self.process_due()
+            except Exception as e:
+                print(f"Calendar sync error: {str(e)}")
+                processed = 0
+            if processed < self.batch_size:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="calendar-sync", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
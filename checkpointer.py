@@ -0,0 +1,267 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from langgraph.checkpoint.base import WRITES_IDX_MAP, BaseCheckpointSaver, CheckpointTuple, get_checkpoint_id
+
+class SQLiteCheckpointer(BaseCheckpointSaver):
+    """LangGraph checkpointer on SQLite (WAL) with an LRU memory tier and capped per-thread history.
+
+    The latest checkpoint row of recently active threads is kept in memory, still serialized so
+    callers always get a fresh copy, and is checked against the table so several workers can
+    share one file; idle threads are evicted from memory but stay on disk.
+    A background thread compacts each thread down to its newest `history_limit` checkpoints
+    and, if `idle_ttl` is set, deletes threads idle for longer.
+    """
+
+    def __init__(self, path="checkpoints.db", max_cached_threads=1000, history_limit=20, idle_ttl=0, compaction_interval=300):
+        super().__init__()
+        self.path = path
+        self.max_cached_threads = max_cached_threads
+        self.history_limit = history_limit
+        self.idle_ttl = idle_ttl
+        self.compaction_interval = compaction_interval
+        self.lock = threading.RLock()
+        self.cache = OrderedDict()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute('''CREATE TABLE IF NOT EXISTS checkpoints (
+            thread_id TEXT NOT NULL,
+            checkpoint_ns TEXT NOT NULL DEFAULT '',
+            checkpoint_id TEXT NOT NULL,
+            parent_checkpoint_id TEXT,
+            type TEXT,
+            checkpoint BLOB,
+            metadata_type TEXT,
+            metadata BLOB,
+            created_at REAL NOT NULL,
+            PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+        )''')
+        self.conn.execute('''CREATE TABLE IF NOT EXISTS writes (
+            thread_id TEXT NOT NULL,
+            checkpoint_ns TEXT NOT NULL DEFAULT '',
+            checkpoint_id TEXT NOT NULL,
+            task_id TEXT NOT NULL,
+            idx INTEGER NOT NULL,
+            channel TEXT NOT NULL,
+            type TEXT,
+            value BLOB,
+            task_path TEXT NOT NULL DEFAULT '',
+            PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+        )''')
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_checkpoints_created_at ON checkpoints (created_at)")
+        self.conn.commit()
+        self._stop = threading.Event()
+        self._compactor = None
+
+    # Memory tier
+
+    def _remember(self, key, row, writes):
+        self.cache[key] = (row, writes)
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.max_cached_threads:
+            self.cache.popitem(last=False)
+
+    def _forget(self, thread_id):
+        for key in [key for key in self.cache if key[0] == thread_id]:
+            del self.cache[key]
+
+    # Reads
+
+    def _load_writes(self, thread_id, checkpoint_ns, checkpoint_id):
+        return self.conn.execute(
+            '''SELECT task_id, channel, type, value FROM writes
+            WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx''',
+            (thread_id, checkpoint_ns, checkpoint_id)).fetchall()
+
+    def _load_tuple(self, row, writes=None):
+        thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type_, checkpoint, metadata_type, metadata = row
+        if writes is None:
+            writes = self._load_writes(thread_id, checkpoint_ns, checkpoint_id)
+        return CheckpointTuple(
+            config={"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}},
+            checkpoint=self.serde.loads_typed((type_, checkpoint)),
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config={"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": parent_checkpoint_id}}
+            if parent_checkpoint_id else None,
+            pending_writes=[(task_id, channel, self.serde.loads_typed((value_type, value))) for task_id, channel, value_type, value in writes],
+        )
+
+    def get_tuple(self, config):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+        key = (thread_id, checkpoint_ns)
+        with self.lock:
+            if not checkpoint_id and key in self.cache:
+                # Another worker may have written a newer checkpoint; the primary key makes this check cheap
+                latest = self.conn.execute(
+                    "SELECT MAX(checkpoint_id) FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?",
+                    (thread_id, checkpoint_ns)).fetchone()[0]
+                row, writes = self.cache[key]
+                if latest == row[2]:
+                    self.cache.move_to_end(key)
+                    return self._load_tuple(row, writes)
+                del self.cache[key]
+            columns = "thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata"
+            if checkpoint_id:
+                row = self.conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id)).fetchone()
+            else:
+                row = self.conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns)).fetchone()
+            if row is None:
+                return None
+            writes = self._load_writes(*row[:3])
+            if not checkpoint_id:
+                self._remember(key, row, writes)
+            return self._load_tuple(row, writes)
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        query = '''SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata
+            FROM checkpoints'''
+        clauses, params = [], []
+        if config:
+            clauses.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            checkpoint_ns = config["configurable"].get("checkpoint_ns")
+            if checkpoint_ns is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(get_checkpoint_id(config))
+        if before and get_checkpoint_id(before):
+            clauses.append("checkpoint_id < ?")
+            params.append(get_checkpoint_id(before))
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY checkpoint_id DESC"
+        if limit is not None and not filter:
+            query += f" LIMIT {int(limit)}"
+        with self.lock:
+            rows = self.conn.execute(query, params).fetchall()
+        yielded = 0
+        for row in rows:
+            with self.lock:
+                checkpoint_tuple = self._load_tuple(row)
+            if filter and not all(checkpoint_tuple.metadata.get(k) == v for k, v in filter.items()):
+                continue
+            yield checkpoint_tuple
+            yielded += 1
+            if limit is not None and yielded >= limit:
+                break
+
+    # Writes
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        parent_checkpoint_id = config["configurable"].get("checkpoint_id")
+        type_, serialized_checkpoint = self.serde.dumps_typed(checkpoint)
+        metadata_type, serialized_metadata = self.serde.dumps_typed(metadata)
+        with self.lock:
+            self.conn.execute(
+                '''INSERT OR REPLACE INTO checkpoints
+                (thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                (thread_id, checkpoint_ns, checkpoint["id"], parent_checkpoint_id, type_, serialized_checkpoint,
+                 metadata_type, serialized_metadata, time.time()))
+            self.conn.commit()
+            self._remember((thread_id, checkpoint_ns), (
+                thread_id, checkpoint_ns, checkpoint["id"], parent_checkpoint_id,
+                type_, serialized_checkpoint, metadata_type, serialized_metadata
+            ), [])
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        verb = "INSERT OR REPLACE" if all(channel in WRITES_IDX_MAP for channel, _ in writes) else "INSERT OR IGNORE"
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            value_type, serialized_value = self.serde.dumps_typed(value)
+            rows.append((thread_id, checkpoint_ns, checkpoint_id, task_id, WRITES_IDX_MAP.get(channel, idx),
+                         channel, value_type, serialized_value, task_path))
+        with self.lock:
+            self.conn.executemany(
+                f'''{verb} INTO writes
+                (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, value, task_path)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''', rows)
+            self.conn.commit()
+            # Pending writes change the latest tuple; reload it from disk next time
+            self.cache.pop((thread_id, checkpoint_ns), None)
+
+    def delete_thread(self, thread_id):
+        with self.lock:
+            self.conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+            self.conn.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+            self.conn.commit()
+            self._forget(thread_id)
+
+    # The graph is run synchronously from Flask; async callers share the same code paths
+
+    async def aget_tuple(self, config):
+        return self.get_tuple(config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        for checkpoint_tuple in self.list(config, filter=filter, before=before, limit=limit):
+            yield checkpoint_tuple
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        return self.put(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        return self.put_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id):
+        return self.delete_thread(thread_id)
+
+    # Compaction
+
+    def compact(self):
+        """Trims each thread to its newest checkpoints and drops expired threads; returns rows deleted."""
+        with self.lock:
+            deleted = self.conn.execute('''DELETE FROM checkpoints WHERE rowid IN (
+                SELECT rowid FROM (
+                    SELECT rowid, ROW_NUMBER() OVER (
+                        PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC
+                    ) AS position FROM checkpoints
+                ) WHERE position > ?
+            )''', (self.history_limit,)).rowcount
+            if self.idle_ttl:
+                expired = [row[0] for row in self.conn.execute(
+                    "SELECT thread_id FROM checkpoints GROUP BY thread_id HAVING MAX(created_at) < ?",
+                    (time.time() - self.idle_ttl,))]
+                for thread_id in expired:
+                    deleted += self.conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,)).rowcount
+                    self._forget(thread_id)
+            self.conn.execute('''DELETE FROM writes WHERE NOT EXISTS (
+                SELECT 1 FROM checkpoints c WHERE c.thread_id = writes.thread_id
+                AND c.checkpoint_ns = writes.checkpoint_ns AND c.checkpoint_id = writes.checkpoint_id
+            )''')
+            self.conn.commit()
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            return deleted
+
+    def start_compaction(self):
+        if self._compactor is not None:
+            return
+        def run():
+            while not self._stop.wait(self.compaction_interval):
+                try:
+                    deleted = self.compact()
+                    if deleted:
+                        print(f"Checkpoint compaction removed {deleted} checkpoints")
+                except Exception as e:
+                    print(f"Error compacting checkpoints: {str(e)}")
+        self._compactor = threading.Thread(target=run, name="checkpoint-compaction", daemon=True)
+        self._compactor.start()
+
+    def stop_compaction(self):
+        self._stop.set()
@@ -0,0 +1,281 @@
+import difflib
+import functools
+import json
+import re
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+# Lay terms patients use for each department
+DEPARTMENT_ALIASES = {
+    "General Medicine": ["general physician", "gp", "family doctor", "physician", "general practitioner"],
+    "Pediatrics": ["child", "children", "kid", "kids", "baby", "babies", "infant", "pediatric", "paediatric"],
+    "Cardiology": ["heart", "cardiac", "cardio", "chest pain", "blood pressure"],
+    "Neurology": ["brain", "nerve", "nerves", "neuro", "seizure", "migraine"],
+    "Orthopedics": ["bone", "bones", "joint", "joints", "fracture", "ortho", "orthopedic", "spine"],
+    "Dermatology": ["skin", "hair", "rash", "acne"],
+    "Gastroenterology": ["stomach", "digestive", "digestion", "gut", "liver", "gastro"],
+    "Oncology": ["cancer", "tumor", "tumour"],
+    "Nephrology": ["kidney", "kidneys", "renal"],
+    "Endocrinology": ["hormone", "hormones", "thyroid", "diabetes", "diabetic"],
+    "ENT": ["ear", "ears", "nose", "throat", "sinus"],
+    "Urology": ["urinary", "bladder", "prostate"],
+    "Pulmonology": ["lung", "lungs", "breathing", "respiratory", "asthma"],
+    "Psychiatry & Psychology": ["mental health", "mental", "psychiatrist", "psychologist", "therapist", "anxiety", "depression"],
+    "Ophthalmology": ["eye", "eyes", "vision", "eye doctor"],
+    "General Surgery": ["surgery", "surgeon", "operation"],
+    "Gynecology & Obstetrics": ["women", "pregnancy", "pregnant", "obstetrician", "gynaecologist", "maternity"],
+    "Radiology": ["x ray", "xray", "scan", "mri", "ct scan", "ultrasound", "imaging"],
+    "Emergency Medicine": ["emergency", "er", "casualty"],
+    "Physiotherapy & Rehabilitation": ["physio", "physiotherapy", "rehab", "rehabilitation"],
+    "Dental Care": ["teeth", "tooth", "dentist", "dental"],
+}
+
+DOCTOR_WORDS = {"doctor", "doctors", "dr", "specialist", "specialists", "physician", "physicians", "consultant", "consultants", "who"}
+SYMPTOM_WORDS = {"symptom", "symptoms", "signs"}
+DEPARTMENT_LIST_WORDS = {"departments", "specialties", "specialities"}
+FEE_WORDS = {"fee", "fees", "cost", "costs", "charge", "charges", "price", "consultation"}
+# The structured lookup answers "who / which specialty / how experienced / what fee" and lists; a query
+# with any other word left over, once doctor names and department terms are taken out, goes to the LLM
+LOOKUP_WORDS = DOCTOR_WORDS | SYMPTOM_WORDS | DEPARTMENT_LIST_WORDS | FEE_WORDS | {
+    "what", "which", "whom", "whose", "is", "are", "the", "a", "an", "of", "for", "in", "at", "and", "or", "s",
+    "your", "you", "there", "any", "all", "list", "show", "me", "tell", "about", "name", "names", "please",
+    "do", "does", "have", "has", "work", "works", "working", "treat", "treats", "treating", "see", "sees",
+    "specialty", "speciality", "specialization", "specialisation", "department", "experience", "experienced",
+    "how", "much", "many", "year", "hospital", "clinic", "common",
+}
+
+# Everyday words that sit close to an alias ("years" ~ "ears", "rental" ~ "renal") and are never typo-corrected
+COMMON_WORDS = {
+    "years", "tears", "hears", "heard", "hearing", "hearty", "bloody", "brainy", "rental", "lunges", "sleeps",
+    "service", "services", "doctors", "nearly", "nearest", "jointly", "skinny", "hairy", "operator", "general",
+    "mentor", "imagine", "images", "scanned", "kidding", "visionary", "therapy", "painful", "wonder",
+}
+# Fuzzy matching only for longer words, where a close match is unlikely to be a different word
+FUZZY_MIN_LENGTH = 6
+FUZZY_CUTOFF = 0.9
+
+def normalize(text):
+    return " ".join(WORD_RE.findall(text.lower()))
+
+@functools.lru_cache(maxsize=8192)
+def singularize(word):
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith("s") and not word.endswith(("ss", "us", "is")) and len(word) > 3:
+        return word[:-1]
+    return word
+
+def normalize_tokens(text):
+    return [singularize(word) for word in WORD_RE.findall(text.lower())]
+
+def symptom_variants(symptom):
+    """Expands 'Swelling in legs or face' and 'Foamy/bloody urine' into every phrase a patient may type."""
+    tokens = [singularize(token) for token in re.findall(r"[a-z0-9]+|/", symptom.lower())]
+    variants = {tuple(token for token in tokens if token != "/")}
+    for i, token in enumerate(tokens):
+        if token in ("or", "/") and 0 < i < len(tokens) - 1:
+            # Keep one single-word alternative either side of the separator
+            left, right = tokens[:i], tokens[i + 1:]
+            variants.add(tuple(left + right[1:]))
+            variants.add(tuple(left[:-1] + right))
+    return variants
+
+class SymptomMatcher:
+    """Token trie over every normalized symptom phrase in clinic.json, compiled once."""
+
+    def __init__(self, symptoms_by_department):
+        departments_per_symptom = {}
+        # Nested dicts keyed by token; the None key holds the (department, symptom) pairs ending there
+        self.trie = {}
+        for department, symptoms in symptoms_by_department.items():
+            for symptom in symptoms:
+                departments_per_symptom.setdefault(symptom, set()).add(department)
+                for phrase in symptom_variants(symptom):
+                    node = self.trie
+                    for token in phrase:
+                        node = node.setdefault(token, {})
+                    node.setdefault(None, []).append((department, symptom))
+        # Multi-word symptoms are more specific, shared ones ("Fatigue", "Dizziness") less so
+        self.weights = {
+            symptom: min(len(variant) for variant in symptom_variants(symptom)) / len(departments)
+            for symptom, departments in departments_per_symptom.items()
+        }
+
+    def match(self, text):
+        """Returns departments ranked by score, each with the symptoms that matched."""
+        tokens = normalize_tokens(text)
+        results = {}
+        for start in range(len(tokens)):
+            # Walking on from each token reports overlapping matches, e.g. "chronic back pain" and "back pain"
+            node = self.trie
+            for token in tokens[start:]:
+                node = node.get(token)
+                if node is None:
+                    break
+                for department, symptom in node.get(None, ()):
+                    entry = results.setdefault(department, {"department": department, "score": 0.0, "symptoms": []})
+                    if symptom not in entry["symptoms"]:
+                        entry["symptoms"].append(symptom)
+                        entry["score"] += self.weights[symptom]
+        return sorted(results.values(), key=lambda entry: entry["score"], reverse=True)
+
+def _common_prefix_length(a, b):
+    length = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        length += 1
+    return length
+
+# Load clinic.json and build the index from it
+def load_clinic_index(file_path):
+    try:
+        with open(file_path, "r", encoding="utf-8") as file:
+            return ClinicIndex(json.load(file))
+    except Exception as e:
+        print(f"Error loading clinic index: {e}")
+        return ClinicIndex({})
+
+class ClinicIndex:
+    """In-memory lookups over clinic.json: specialties, departments, symptoms and doctors."""
+
+    def __init__(self, data):
+        self.data = data
+        self.departments = list(data.get("departments", []))
+        self.symptoms_by_department = {
+            department: list(symptoms) for department, symptoms in data.get("common_symptoms", {}).items()
+        }
+        for department in self.symptoms_by_department:
+            if department not in self.departments:
+                self.departments.append(department)
+
+        self.symptom_matcher = SymptomMatcher(self.symptoms_by_department)
+
+        self.doctors_by_department = {department: [] for department in self.departments}
+        self.doctors_by_name = {}
+        self.doctors_by_surname = {}
+        for doctor in data.get("doctors", []):
+            department = self.department_for_specialty(doctor["specialty"])
+            if department:
+                self.doctors_by_department[department].append(doctor)
+            name = normalize(doctor["name"]).removeprefix("dr ")
+            self.doctors_by_name[name] = doctor
+            self.doctors_by_surname.setdefault(name.split()[-1], []).append(doctor)
+
+        # Phrase -> department, covering department names, specialties and lay aliases
+        self.aliases = {}
+        for department in self.departments:
+            self.aliases[normalize(department)] = department
+            for part in department.split("&"):
+                self.aliases[normalize(part)] = department
+            for alias in DEPARTMENT_ALIASES.get(department, []):
+                self.aliases[normalize(alias)] = department
+            for doctor in self.doctors_by_department[department]:
+                self.aliases[normalize(doctor["specialty"])] = department
+        self.alias_words = sorted({word for phrase in self.aliases for word in phrase.split()})
+        self.specialty_words = {
+            word for doctor in data.get("doctors", []) for word in normalize(doctor["specialty"]).split()
+        } - {"general", "specialist"}
+        self.department_words = set(self.alias_words) | self.specialty_words
+        self.hospital_words = set(normalize(data.get("hospital", {}).get("name", "")).split())
+        # Words that name a department, specialty or symptom, so are never a patient's name or city
+        self.medical_words = self.department_words | {
+            singularize(word) for symptoms in self.symptoms_by_department.values()
+            for symptom in symptoms for word in normalize(symptom).split() if len(word) > 2
+        }
+
+    def department_for_specialty(self, specialty):
+        """Maps a doctor specialty such as 'Cardiologist' to its department ('Cardiology')."""
+        specialty = specialty.lower()
+        best, best_length = None, 0
+        for department in self.departments:
+            for part in department.lower().split("&"):
+                length = _common_prefix_length(specialty, part.strip())
+                if length > best_length:
+                    best, best_length = department, length
+        return best if best_length >= 3 else None
+
+    def resolve_departments(self, text, fuzzy=True):
+        """Returns departments mentioned in text, matching aliases exactly (or as plurals) and, with fuzzy,
+        long single words that are close to an alias but not everyday words."""
+        # Plurals match their singular alias exactly ("cardiologists" -> "cardiologist")
+        words = [word if word in self.alias_words or singularize(word) not in self.alias_words else singularize(word)
+                 for word in normalize(text).split()]
+        if fuzzy:
+            # Fix typos word by word ("cardiolgy" -> "cardiology") before phrase matching
+            corrected = []
+            for word in words:
+                if len(word) >= FUZZY_MIN_LENGTH and word not in self.alias_words and word not in COMMON_WORDS:
+                    close = difflib.get_close_matches(word, self.alias_words, n=1, cutoff=FUZZY_CUTOFF)
+                    word = close[0] if close else word
+                corrected.append(word)
+            words = corrected
+        padded = f" {' '.join(words)} "
+        found = []
+        for phrase in sorted(self.aliases, key=len, reverse=True):
+            if f" {phrase} " in padded:
+                department = self.aliases[phrase]
+                if department not in found:
+                    found.append(department)
+                padded = padded.replace(f" {phrase} ", " | ")
+        return found
+
+    def find_doctors(self, text):
+        """Returns doctor records named in text, by full name or unambiguous surname."""
+        normalized = f" {normalize(text)} "
+        found = [doctor for name, doctor in self.doctors_by_name.items() if f" {name} " in normalized]
+        if found:
+            return found
+        for surname, doctors in self.doctors_by_surname.items():
+            if f" {surname} " in normalized:
+                found.extend(doctors)
+        return found
+
+    def answer(self, query):
+        """Answers doctor and department lookups from the structured data; returns None when an LLM is needed."""
+        words = set(normalize(query).split())
+        doctors = self.find_doctors(query)
+        named = {word for doctor in doctors for word in normalize(doctor["name"]).split()}
+        if any(word not in LOOKUP_WORDS and singularize(word) not in LOOKUP_WORDS and word not in named
+               and word not in self.hospital_words and singularize(word) not in self.department_words for word in words):
+            return None
+        wants_fee = bool(words & FEE_WORDS)
+
+        if doctors:
+            return "\n".join(self._describe_doctor(doctor, wants_fee) for doctor in doctors)
+
+        # Only exact mentions are answered here; a typo-corrected match goes to the LLM, which sees the original
+        departments = self.resolve_departments(query, fuzzy=False)
+        if not departments:
+            if words & DEPARTMENT_LIST_WORDS and not self.resolve_departments(query):
+                return "Our departments are: " + ", ".join(self.departments) + "."
+            return None
+
+        if words & SYMPTOM_WORDS:
+            lines = []
+            for department in departments:
+                symptoms = self.symptoms_by_department.get(department)
+                if symptoms:
+                    lines.append(f"Common symptoms treated in {department}: {', '.join(symptoms)}.")
+                else:
+                    lines.append(f"We don't have a symptom list for {department}.")
+            return "\n".join(lines)
+
+        names_specialty = any(word.rstrip("s") in self.specialty_words for word in words)
+        if words & DOCTOR_WORDS or names_specialty or wants_fee or len(words) <= 3:
+            lines = []
+            for department in departments:
+                listed = self.doctors_by_department.get(department, [])
+                if not listed:
+                    lines.append(f"We don't currently have a listed doctor in {department}.")
+                    continue
+                lines.append(f"Doctors in {department}:")
+                lines.extend(f"- {self._describe_doctor(doctor, wants_fee)}" for doctor in listed)
+            return "\n".join(lines)
+        return None
+
+    def _describe_doctor(self, doctor, with_fee=False):
+        text = f"{doctor['name']} - {doctor['specialty']} ({doctor['experience']} experience)"
+        if with_fee:
+            text += f", consultation fee {doctor['fee']}"
+        return text
@@ -0,0 +1,48 @@
+# gunicorn -c gunicorn.conf.py wsgi:app
+import glob
+import os
+import signal
+
+bind = os.getenv("BIND", "0.0.0.0:5000")
+workers = int(os.getenv("WEB_WORKERS", "2"))
+# Threaded workers: a chat spends most of its time waiting on Groq and Google, not on the CPU. Each
+# worker needs a thread per running chat (CHAT_CONCURRENCY), per queued chat (CHAT_QUEUE), and some
+# spare for /appointments, /health and static files.
+worker_class = "gthread"
+threads = int(os.getenv("WEB_THREADS", "48"))
+# Chats can take a while; the per-call LLM deadline (LLM_DEADLINE) bounds them well below this
+timeout = int(os.getenv("WEB_TIMEOUT", "120"))
+# On SIGTERM a worker stops accepting connections and gets this long to finish in-flight chats
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+# Every worker imports app1 itself, so each runs its own calendar sync, knowledge watcher and purge
+# threads. The knowledge watcher reloads that worker's in-memory copy. The other two share SQLite
+# tables and take their rows first: the sync claims outbox entries, and a purge only expires the
+# threads it deleted, so each Calendar change is sent once and each idle thread is expired once.
+preload_app = False
+# Workers publish their metrics here so /metrics on any of them reports the whole server
+os.environ.setdefault("METRICS_DIR", ".metrics")
+
+def on_starting(server):
+    # Totals start from zero with each server start; Prometheus treats that as a counter reset
+    for path in glob.glob(os.path.join(os.environ["METRICS_DIR"], "metrics-*.json")):
+        os.remove(path)
+
+def post_worker_init(worker):
+    # Refuse queued and new chats as soon as SIGTERM arrives. gunicorn itself only stops accepting
+    # connections, then waits up to graceful_timeout for every request, including chats still queued
+    # for a slot, before worker_exit runs.
+    from app1 import chat_admission
+    handle_exit = worker.handle_exit
+
+    def stop_admitting_and_exit(sig, frame):
+        chat_admission.stop_admitting()
+        handle_exit(sig, frame)
+
+    worker.handle_exit = stop_admitting_and_exit
+    signal.signal(signal.SIGTERM, stop_admitting_and_exit)
+
+def worker_exit(server, worker):
+    # By now gunicorn has waited graceful_timeout for in-flight requests; only stop the background threads
+    from app1 import shutdown
+    shutdown(timeout=1)
@@ -0,0 +1,116 @@
+import json
+import re
+
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, ToolMessage
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+DIGEST_TAG = "result, shortened]"
+
+def estimate_tokens(text):
+    """Local approximation of a BPE token count: about one token per 4 characters of each word,
+    one per punctuation mark. Within ~10-15% of the Llama/Qwen tokenizers on English chat text."""
+    if not text:
+        return 0
+    return sum((len(piece) + 3) // 4 if piece[0].isalnum() or piece[0] == "_" else 1
+               for piece in TOKEN_PATTERN.findall(text))
+
+def message_text(message):
+    content = message.content
+    if isinstance(content, list):
+        content = " ".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+    return content or ""
+
+def message_tokens(message):
+    # Chat templates add a few tokens of role markup per message
+    tokens = 4 + estimate_tokens(message_text(message))
+    for call in getattr(message, "tool_calls", None) or []:
+        tokens += estimate_tokens(call["name"]) + estimate_tokens(json.dumps(call.get("args", {})))
+    return tokens
+
+def count_tokens(messages):
+    return sum(message_tokens(message) for message in messages)
+
+def split_turns(messages):
+    """Groups messages into turns, each starting at a HumanMessage."""
+    turns = []
+    for message in messages:
+        if isinstance(message, HumanMessage) or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+def _clip(text, max_tokens):
+    words = text.split()
+    clipped = []
+    used = 0
+    for word in words:
+        used += estimate_tokens(word)
+        if used > max_tokens:
+            return " ".join(clipped) + " ..."
+        clipped.append(word)
+    return " ".join(clipped)
+
+def digest_tool_message(message, max_tokens):
+    text = message_text(message)
+    return f"[{message.name or 'tool'} {DIGEST_TAG} {_clip(' '.join(text.split()), max_tokens)}"
+
+def extractive_summary(summary, turns, max_tokens):
+    """Appends one line per folded turn (what the user asked, what the assistant answered, tools used)
+    and keeps the most recent lines that fit in max_tokens."""
+    lines = summary.splitlines() if summary else []
+    for turn in turns:
+        asked = " ".join(message_text(message) for message in turn if isinstance(message, HumanMessage))
+        answers = [message_text(message) for message in turn if isinstance(message, AIMessage) and message_text(message)]
+        tools = sorted({call["name"] for message in turn for call in getattr(message, "tool_calls", None) or []})
+        line = f"User: {_clip(asked, 40)}"
+        if tools:
+            line += f" | Tools: {', '.join(tools)}"
+        if answers:
+            line += f" | Assistant: {_clip(answers[-1], 60)}"
+        lines.append(line)
+    while len(lines) > 1 and estimate_tokens("\n".join(lines)) > max_tokens:
+        lines.pop(0)
+    return "\n".join(lines)
+
+class HistoryPolicy:
+    """Token budget for the conversation kept in graph state.
+
+    Tool results from earlier turns are replaced in place by short digests. When the whole history
+    (plus summary) is over max_tokens, turns older than the last keep_turns are removed from state and
+    folded into a running summary, which the assistant prompt carries instead.
+    """
+
+    def __init__(self, max_tokens=3000, keep_turns=6, tool_digest_tokens=120, summary_tokens=400, summarize=None):
+        self.max_tokens = max_tokens
+        self.keep_turns = keep_turns
+        self.tool_digest_tokens = tool_digest_tokens
+        self.summary_tokens = summary_tokens
+        self.summarize = summarize or (lambda summary, turns: extractive_summary(summary, turns, self.summary_tokens))
+
+    def compact(self, messages, summary):
+        """Returns the state update: replacement and RemoveMessage entries, and the new summary if it changed."""
+        turns = split_turns(messages)
+        updates = []
+        # Earlier turns' tool output has already been answered; a digest is enough context
+        for turn in turns[:-1]:
+            for message in turn:
+                if isinstance(message, ToolMessage) and message_tokens(message) > self.tool_digest_tokens + 30 \
+                        and DIGEST_TAG not in message_text(message)[:80]:
+                    updates.append(ToolMessage(content=digest_tool_message(message, self.tool_digest_tokens),
+                                               id=message.id, tool_call_id=message.tool_call_id, name=message.name))
+        replaced = {message.id: message for message in updates}
+        current = [replaced.get(message.id, message) for message in messages]
+
+        total = count_tokens(current) + estimate_tokens(summary or "")
+        folded = []
+        remaining = split_turns(current)
+        while total > self.max_tokens and len(remaining) > self.keep_turns:
+            turn = remaining.pop(0)
+            folded.append(turn)
+            total -= count_tokens(turn)
+        if not folded:
+            return {"messages": updates} if updates else {}
+        folded_ids = {message.id for turn in folded for message in turn}
+        updates = [message for message in updates if message.id not in folded_ids]
+        updates.extend(RemoveMessage(id=message_id) for message_id in folded_ids)
+        return {"messages": updates, "summary": self.summarize(summary, folded)}
@@ -0,0 +1,317 @@
+import calendar
+import math
+import random
+import re
+
+from clinic_index import DEPARTMENT_LIST_WORDS, DOCTOR_WORDS, normalize, normalize_tokens
+
+# Labelled examples the classifier is trained on at startup. "other" is everything the assistant LLM
+# should handle: bookings, changes, symptoms and open-ended questions.
+EXAMPLES = [
+    ("hi", "greeting"), ("hello", "greeting"), ("hey there", "greeting"), ("good morning", "greeting"),
+    ("good evening", "greeting"), ("hello, is anyone there?", "greeting"), ("hi, I have a question", "greeting"),
+    ("namaste", "greeting"),
+    ("thanks", "thanks"), ("thank you", "thanks"), ("thanks a lot", "thanks"), ("thank you so much", "thanks"),
+    ("great, thanks", "thanks"), ("ok thank you, that helps", "thanks"), ("that was helpful, thanks", "thanks"),
+    ("bye", "goodbye"), ("goodbye", "goodbye"), ("see you", "goodbye"), ("that's all, bye", "goodbye"),
+    ("have a nice day, bye", "goodbye"),
+    ("what are your opening hours", "hours"), ("when are you open", "hours"), ("what time do you close", "hours"),
+    ("are you open on saturday", "hours"), ("what are the visiting hours", "hours"), ("hospital timings", "hours"),
+    ("is the clinic open on sunday", "hours"), ("what time does the hospital open", "hours"),
+    ("until what time are you open today", "hours"), ("working hours of the hospital", "hours"),
+    ("what is the emergency number", "emergency"), ("emergency contact", "emergency"), ("I need an ambulance", "emergency"),
+    ("is the emergency department open 24/7", "emergency"), ("who do I call in an emergency", "emergency"),
+    ("ambulance phone number", "emergency"), ("emergency helpline", "emergency"),
+    ("what is the emergency line", "emergency"), ("number to call for an ambulance", "emergency"),
+    ("emergency hotline", "emergency"),
+    ("what's your phone number", "contact"), ("how can I contact you", "contact"), ("hospital email id", "contact"),
+    ("what is your website", "contact"), ("customer care number", "contact"), ("how do I reach the front desk", "contact"),
+    ("can I call the hospital", "contact"), ("give me your contact details", "contact"), ("what's the phone number", "contact"),
+    ("where are you located", "location"), ("what's the address", "location"), ("how do I get to the hospital", "location"),
+    ("location of sunrise medical center", "location"), ("directions to the hospital", "location"),
+    ("which city is the hospital in", "location"), ("hospital address please", "location"),
+    ("what is your address", "location"), ("address of the clinic", "location"),
+    ("what services do you offer", "services"), ("do you do diagnostic tests", "services"),
+    ("do you offer home healthcare", "services"), ("do you have maternity care", "services"),
+    ("what facilities are available", "services"), ("do you offer video consultations", "services"),
+    ("can I consult online", "services"), ("do you perform surgeries", "services"),
+    ("can I have a video call with the doctor", "services"),
+    ("what departments do you have", "departments"), ("list of specialties", "departments"),
+    ("which departments are there", "departments"), ("what specialities does the hospital have", "departments"),
+    ("show me all departments", "departments"),
+    ("who are the cardiologists", "doctors"), ("doctors in neurology", "doctors"), ("tell me about dr priya sharma", "doctors"),
+    ("which doctor treats skin problems", "doctors"), ("how experienced is dr verma", "doctors"),
+    ("list the pediatricians", "doctors"), ("who is the orthopedic surgeon", "doctors"),
+    ("what is the consultation fee for dr kapoor", "doctors"), ("is there an ent specialist", "doctors"),
+    ("is there a gynecologist", "doctors"), ("do you have a dermatologist", "doctors"),
+    ("what payment methods do you accept", "payment"), ("can I pay by UPI", "payment"), ("do you take credit cards", "payment"),
+    ("payment options", "payment"), ("can I pay with net banking", "payment"),
+    ("what documents do I need to bring", "documents"), ("do I need an id proof", "documents"),
+    ("should I bring my medical reports", "documents"), ("documents required for the visit", "documents"),
+    ("what is your cancellation policy", "policy"), ("do I get a refund if I cancel", "policy"),
+    ("refund policy", "policy"), ("how late can I reschedule", "policy"), ("what happens if I miss my appointment", "policy"),
+    ("is there a fee for cancelling late", "policy"), ("what are the cancellation rules", "policy"),
+    ("I want to book an appointment", "other"), ("book me with a cardiologist tomorrow", "other"),
+    ("I need to reschedule my appointment", "other"), ("please cancel my appointment", "other"),
+    ("cancel booking 4f2a9c", "other"), ("move my appointment to friday", "other"),
+    ("I have chest pain and fever", "other"), ("my child has had a fever for three days, what should I do", "other"),
+    ("I feel dizzy when I stand up", "other"), ("is it safe to take ibuprofen with paracetamol", "other"),
+    ("can you explain what my MRI results mean", "other"), ("should I see a cardiologist or a neurologist", "other"),
+    ("what's the latest news on dengue", "other"), ("do you accept insurance", "other"),
+    ("how much does an MRI cost", "other"), ("tell me a joke", "other"), ("can I change the doctor for my visit", "other"),
+    ("what should I eat after surgery", "other"), ("my back hurts after lifting weights", "other"),
+    ("check availability for dr sharma next week", "other"), ("are there free slots on monday", "other"),
+    ("I want to see a doctor", "other"), ("what is the best treatment for diabetes", "other"),
+    ("my appointment id is 7c1e and I want a later time", "other"),
+    # Facilities and treatments clinic.json doesn't list: the services answer would be a non-answer
+    ("is there parking at the hospital", "other"), ("do you have a pharmacy", "other"), ("is there a cafeteria", "other"),
+    ("do you treat kidney stones", "other"), ("can you treat arthritis", "other"), ("do you do knee replacements", "other"),
+    ("what does a neurologist do", "other"),
+    # Mentions of emergencies and hours that aren't asking for the emergency numbers or opening hours
+    ("I was in an emergency last week, what follow-up should I do", "other"),
+    ("what is the emergency room wait time", "other"), ("how long is the wait in casualty", "other"),
+    ("I was taken to casualty by ambulance yesterday", "other"), ("who pays for the ambulance ride", "other"),
+    ("my father had an emergency surgery, how is he doing", "other"),
+    ("are you open on diwali", "other"), ("visiting hours for ICU patients", "other"),
+    ("can I visit a patient in the ward at night", "other"), ("is the pharmacy open all night", "other"),
+]
+
+# Whole-message pleasantries and emergency wording are decided by rules; the classifier handles the rest
+GREETING = re.compile(r"^\s*(hi|hello|hey|hii+|good (morning|afternoon|evening)|namaste)( there)?[\s!.,]*$", re.IGNORECASE)
+THANKS = re.compile(r"^\s*(ok(ay)?,?\s*)?(thanks|thank you|thx|ty)( (so|very) much| a lot)?[\s!.,]*$", re.IGNORECASE)
+GOODBYE = re.compile(r"^\s*((ok(ay)?|thanks|thank you),?\s*)*(bye|goodbye|see you|that'?s all)[\s!.,]*$", re.IGNORECASE)
+# Someone asking for help now, not a mention ("I was in an emergency last week", "emergency room wait time").
+# Questions about the emergency numbers are left to the classifier.
+EMERGENCY = re.compile(
+    r"\b(need|send|call|get|want)\b(\s+\w+){0,3}\s+(an?\s+)?ambulance\b"
+    r"|\b(this|it)\s*(is|'s)\s+(an?\s+)?(medical\s+)?emergency\b"
+    r"|\bi\s*(have|'ve got)\s+an?\s+emergency\b"
+    r"|^\s*(emergency|ambulance|help)[\s!.]*$", re.IGNORECASE)
+# Turns about the user's own booking always go to the LLM and its tools
+LLM_ONLY = re.compile(r"\b(book|booking|schedule|my appointment|my booking|available|availability|slots?|free)\b|\b[0-9a-f]{32}\b", re.IGNORECASE)
+MAX_WORDS = 20
+# Words of a services question that say nothing about which service is meant
+SERVICE_QUESTION_WORDS = {
+    "what", "which", "do", "you", "we", "i", "can", "get", "is", "are", "there", "any", "a", "an", "the", "of", "all",
+    "your", "have", "ha", "offer", "provide", "service", "facility", "available", "hospital", "clinic", "kind", "type",
+    "list", "at", "here", "sunrise", "medical", "center", "please",
+}
+# Words of an opening-hours question; anything else ("on diwali", "for ICU patients") asks about hours
+# clinic.json doesn't list
+HOURS_QUESTION_WORDS = {
+    "what", "which", "when", "are", "is", "do", "does", "you", "your", "the", "a", "on", "at", "of", "in", "until",
+    "till", "time", "timing", "hour", "open", "opening", "close", "closing", "closed", "working", "visiting",
+    "hospital", "clinic", "sunrise", "medical", "center", "today", "tomorrow", "weekend", "weekday", "day",
+    "please", "tell", "me", "still", "now",
+} | {name.lower() for name in calendar.day_name}
+# Everyday names for the services clinic.json lists
+SERVICE_SYNONYMS = {
+    "mri": "diagnostic", "scan": "diagnostic", "xray": "diagnostic", "ultrasound": "diagnostic", "lab": "diagnostic",
+    "checkup": "check", "operation": "surgery", "surgical": "surgery", "visit": "home", "online": "video",
+    "call": "video", "pregnancy": "maternity", "delivery": "maternity",
+}
+
+class IntentClassifier:
+    """TF-IDF over word unigrams and bigrams feeding a multinomial logistic regression, trained with SGD
+    on `examples` ((text, label) pairs). Training on EXAMPLES takes about 50 ms."""
+
+    def __init__(self, examples, epochs=15, learning_rate=1.0, l2=1e-4, seed=0):
+        self.labels = sorted({label for _, label in examples})
+        documents = [self._terms(text) for text, _ in examples]
+        document_frequency = {}
+        for terms in documents:
+            for term in set(terms):
+                document_frequency[term] = document_frequency.get(term, 0) + 1
+        n = len(documents)
+        self.idf = {term: math.log((1 + n) / (1 + count)) + 1 for term, count in document_frequency.items()}
+        self.weights = {term: [0.0] * len(self.labels) for term in self.idf}
+        self.bias = [0.0] * len(self.labels)
+        samples = [(self._vector(terms), self.labels.index(label)) for terms, (_, label) in zip(documents, examples)]
+        order = random.Random(seed)
+        for epoch in range(epochs):
+            order.shuffle(samples)
+            rate = learning_rate / (1 + epoch * 0.1)
+            decay = 1 - rate * l2
+            for vector, target in samples:
+                steps = [rate * (probability - (k == target)) for k, probability in enumerate(self._probabilities(vector))]
+                self.bias = [bias - step for bias, step in zip(self.bias, steps)]
+                for term, value in vector.items():
+                    self.weights[term] = [weight * decay - step * value for weight, step in zip(self.weights[term], steps)]
+
+    @staticmethod
+    def _terms(text):
+        tokens = normalize_tokens(text)
+        return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+    def _vector(self, terms):
+        counts = {}
+        for term in terms:
+            if term in self.idf:
+                counts[term] = counts.get(term, 0) + 1
+        vector = {term: count * self.idf[term] for term, count in counts.items()}
+        norm = math.sqrt(sum(value * value for value in vector.values())) or 1.0
+        return {term: value / norm for term, value in vector.items()}
+
+    def _probabilities(self, vector):
+        scores = list(self.bias)
+        for term, value in vector.items():
+            for k, weight in enumerate(self.weights[term]):
+                scores[k] += weight * value
+        top = max(scores)
+        exps = [math.exp(score - top) for score in scores]
+        total = sum(exps)
+        return [value / total for value in exps]
+
+    def predict(self, text):
+        """Returns (label, probability) of the most likely intent."""
+        probabilities = self._probabilities(self._vector(self._terms(text)))
+        best = max(range(len(probabilities)), key=probabilities.__getitem__)
+        return self.labels[best], probabilities[best]
+
+def _listed(items):
+    items = list(items)
+    return ", ".join(items[:-1]) + f" and {items[-1]}" if len(items) > 1 else "".join(items)
+
+class IntentRouter:
+    """Answers FAQ turns (greetings, hours, contact, emergency numbers, services, departments, doctors,
+    payment, documents, policies) from clinic.json without calling the LLM.
+
+    `route()` returns {"intent", "reply", "by"} (by "rule" or "model"), or None when the turn should go
+    to the assistant: anything about the user's own booking, symptoms, long messages, predictions below
+    `min_confidence`, and intents the structured data can't answer for this message.
+    """
+
+    def __init__(self, clinic_index, examples=EXAMPLES, min_confidence=0.6):
+        self.clinic_index = clinic_index
+        self.min_confidence = min_confidence
+        self.classifier = IntentClassifier(examples)
+
+    def classify(self, text):
+        """Returns (intent, probability, by); intent "other" means the LLM should answer."""
+        if not text.strip() or len(text.split()) > MAX_WORDS:
+            return "other", 1.0, "rule"
+        for pattern, intent in ((GREETING, "greeting"), (THANKS, "thanks"), (GOODBYE, "goodbye")):
+            if pattern.match(text):
+                return intent, 1.0, "rule"
+        if LLM_ONLY.search(text):
+            return "other", 1.0, "rule"
+        if EMERGENCY.search(text):
+            return "emergency", 1.0, "rule"
+        # Symptoms need the symptom analysis tool, even when phrased like a doctor lookup
+        if self.clinic_index.symptom_matcher.match(text):
+            return "other", 1.0, "rule"
+        intent, probability = self.classifier.predict(text)
+        return intent, probability, "model"
+
+    def route(self, text):
+        intent, probability, by = self.classify(text)
+        if intent != "other" and probability >= self.min_confidence:
+            reply = getattr(self, f"_answer_{intent}")(text)
+            if reply:
+                return {"intent": intent, "reply": reply, "by": by}
+        # Lookups the classifier recognised but not confidently ("list all dermatologists")
+        if by == "model" and intent in ("doctors", "departments") and self._names_lookup(text):
+            reply = self.clinic_index.answer(text)
+            if reply:
+                intent = "departments" if set(normalize(text).split()) & DEPARTMENT_LIST_WORDS else "doctors"
+                return {"intent": intent, "reply": reply, "by": "rule"}
+        return None
+
+    def _names_lookup(self, text):
+        words = set(normalize(text).split())
+        return bool(words & (DOCTOR_WORDS | DEPARTMENT_LIST_WORDS)) \
+            or any(word.rstrip("s") in self.clinic_index.specialty_words for word in words)
+
+    # Answers, from clinic.json
+
+    @property
+    def hospital(self):
+        return self.clinic_index.data.get("hospital", {})
+
+    def _answer_greeting(self, text):
+        return (f"Hello! I'm the {self.hospital.get('name', 'hospital')} assistant. I can help you book, reschedule or "
+                "cancel an appointment, find a doctor, or suggest a department for your symptoms.")
+
+    def _answer_thanks(self, text):
+        return "You're welcome! Is there anything else I can help you with?"
+
+    def _answer_goodbye(self, text):
+        return "Goodbye, and take care!"
+
+    def _answer_hours(self, text):
+        hours = self.hospital.get("operating_hours")
+        if not hours or set(normalize_tokens(text)) - HOURS_QUESTION_WORDS:
+            return None
+        parts = []
+        for days, span in hours.items():
+            if days == "emergency":
+                parts.append(f"Emergency services are available {span}.")
+            else:
+                parts.append(f"{' to '.join(day.title() for day in days.split('_'))}: {span}.")
+        return f"Our opening hours are {' '.join(parts)}"
+
+    def _answer_emergency(self, text):
+        emergency = self.clinic_index.data.get("emergency_services", {})
+        number = self.hospital.get("emergency_contact")
+        if not number and not emergency:
+            return None
+        parts = ["If this is a medical emergency, call now:"]
+        if number:
+            parts.append(f"emergency line {number}")
+        if emergency.get("ambulance_contact"):
+            parts.append(f"{'and ' if number else ''}ambulance {emergency['ambulance_contact']}.")
+        if emergency.get("availability"):
+            parts.append(f"Emergency care is available {emergency['availability']}.")
+        return " ".join(parts)
+
+    def _answer_contact(self, text):
+        contact = self.hospital.get("contact")
+        if not contact:
+            return None
+        return "You can reach us " + ", ".join(f"by {kind} at {value}" if kind != "website" else f"online at {value}"
+                                               for kind, value in contact.items()) + "."
+
+    def _answer_location(self, text):
+        address = self.hospital.get("address")
+        return f"{self.hospital.get('name', 'We')} is at {address}." if address else None
+
+    def _answer_services(self, text):
+        services = self.hospital.get("services_offered")
+        if not services:
+            return None
+        # Only a general question or one naming a listed service gets the list; "do you have parking" doesn't
+        modes = self.clinic_index.data.get("appointment", {}).get("consultation_modes") or []
+        offered = set(normalize_tokens(" ".join(services + modes)))
+        asked = {SERVICE_SYNONYMS.get(token, token) for token in normalize_tokens(text)} - SERVICE_QUESTION_WORDS
+        if asked and not asked & offered:
+            return None
+        reply = f"We offer {_listed(services)}."
+        if modes:
+            reply += f" Consultations are available as {_listed(mode.lower() for mode in modes)}."
+        return reply
+
+    def _answer_departments(self, text):
+        departments = self.clinic_index.departments
+        return f"Our departments are: {', '.join(departments)}." if departments else None
+
+    def _answer_doctors(self, text):
+        return self.clinic_index.answer(text)
+
+    def _answer_payment(self, text):
+        options = self.clinic_index.data.get("appointment", {}).get("payment_options")
+        return f"We accept {_listed(options)}." if options else None
+
+    def _answer_documents(self, text):
+        documents = self.clinic_index.data.get("appointment", {}).get("documents_needed")
+        return f"Please bring {_listed(document.lower() for document in documents)}." if documents else None
+
+    def _answer_policy(self, text):
+        appointment = self.clinic_index.data.get("appointment", {})
+        parts = []
+        if appointment.get("rescheduling_policy"):
+            parts.append(f"Rescheduling: {appointment['rescheduling_policy'].lower()}.")
+        cancellation = appointment.get("cancellation_policy")
+        if cancellation:
+            parts.append("Cancellation: " + "; ".join(f"{when.replace('_', ' ')}: {refund.lower()}"
+                                                      for when, refund in cancellation.items()) + ".")
+        return " ".join(parts) or None
@@ -0,0 +1,260 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from datetime import datetime
+
+from clinic_index import ClinicIndex
+from retrieval import BM25Index, chunk_text
+
+CACHE_MAGIC = b"KBCACHE1"
+
+def file_digest(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def extract_pdf_text(path):
+    import fitz  # PyMuPDF is only imported when the cache misses
+    with fitz.open(path) as doc:
+        return "\n".join(page.get_text("text") for page in doc)
+
+# Cache file layout: magic, 4-byte header length, JSON header with the byte offsets of each blob, then the
+# UTF-8 blobs (full text first, then the chunks) back to back, so a reader can mmap it and slice
+def write_cache(path, text, chunks):
+    blobs = [text.encode("utf-8")] + [chunk.encode("utf-8") for chunk in chunks]
+    offsets = []
+    position = 0
+    for blob in blobs:
+        offsets.append([position, position + len(blob)])
+        position += len(blob)
+    header = json.dumps({"offsets": offsets}).encode("utf-8")
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(CACHE_MAGIC + struct.pack("<I", len(header)) + header)
+        for blob in blobs:
+            f.write(blob)
+    os.replace(temp_path, path)
+
+def read_cache(path):
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        if data[:len(CACHE_MAGIC)] != CACHE_MAGIC:
+            raise ValueError(f"{path} is not a knowledge cache file")
+        start = len(CACHE_MAGIC) + 4
+        (header_length,) = struct.unpack_from("<I", data, len(CACHE_MAGIC))
+        offsets = json.loads(data[start:start + header_length])["offsets"]
+        base = start + header_length
+        blobs = [data[base + begin:base + end].decode("utf-8") for begin, end in offsets]
+    return blobs[0], blobs[1:]
+
+class KnowledgeBase:
+    """The hospital PDF's extracted text, retrieval chunks and BM25 index, loaded on first use.
+
+    The PDF is parsed once per content: text and chunks are written to `cache_dir` under the file's
+    SHA-256 and the chunking settings, so restarts and additional workers read the cache instead of
+    running PyMuPDF again. `text` is None when the PDF is missing or cannot be read.
+    """
+
+    def __init__(self, pdf_path, cache_dir=".kb_cache", chunk_size=800, overlap=150, digest=None):
+        self.pdf_path = pdf_path
+        self.cache_dir = cache_dir
+        self.digest = digest
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.lock = threading.Lock()
+        self.loaded = False
+        self._text = None
+        self._chunks = []
+        self._index = None
+
+    def _cache_path(self, digest):
+        return os.path.join(self.cache_dir, f"{digest[:32]}-{self.chunk_size}-{self.overlap}.kb")
+
+    def _load(self):
+        if not os.path.exists(self.pdf_path):
+            print("PDF not found. Using fallback data.")
+            return
+        started = time.perf_counter()
+        self.digest = self.digest or file_digest(self.pdf_path)
+        cache_path = self._cache_path(self.digest)
+        try:
+            self._text, self._chunks = read_cache(cache_path)
+            source = "cache"
+        except (OSError, ValueError):
+            try:
+                self._text = extract_pdf_text(self.pdf_path)
+            except Exception as e:
+                print(f"Error loading PDF: {e}")
+                return
+            self._chunks = chunk_text(self._text, self.chunk_size, self.overlap)
+            source = "parsed"
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                write_cache(cache_path, self._text, self._chunks)
+            except OSError as e:
+                print(f"[knowledge] could not write cache {cache_path}: {e}")
+        print(f"[knowledge] {self.pdf_path}: {len(self._text)} chars, {len(self._chunks)} chunks "
+              f"({source} in {(time.perf_counter() - started) * 1000:.0f} ms)")
+
+    def ensure_loaded(self):
+        with self.lock:
+            if not self.loaded:
+                self._load()
+                self.loaded = True
+        return self
+
+    @property
+    def text(self):
+        return self.ensure_loaded()._text
+
+    @property
+    def chunks(self):
+        return self.ensure_loaded()._chunks
+
+    @property
+    def index(self):
+        """BM25 index over the chunks, built on first use; None without a PDF."""
+        self.ensure_loaded()
+        with self.lock:
+            if self._index is None and self._chunks:
+                self._index = BM25Index(self._chunks)
+            return self._index
+
+def file_signature(path):
+    try:
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        return None
+
+class KnowledgeSnapshot:
+    """One immutable generation of the hospital data: the clinic.json index and the PDF knowledge base."""
+
+    def __init__(self, generation, clinic_index, clinic_digest, knowledge_base, pdf_digest):
+        self.generation = generation
+        self.clinic_index = clinic_index
+        self.clinic_digest = clinic_digest
+        self.knowledge_base = knowledge_base
+        self.pdf_digest = pdf_digest
+        self.loaded_at = time.time()
+
+    @property
+    def version(self):
+        return f"{(self.clinic_digest or 'none')[:8]}-{(self.pdf_digest or 'none')[:8]}"
+
+    def describe(self):
+        return {
+            "version": self.version,
+            "generation": self.generation,
+            "loaded_at": datetime.fromtimestamp(self.loaded_at).isoformat(timespec="seconds"),
+            "doctors": len(self.clinic_index.data.get("doctors", [])),
+            "pdf_loaded": self.knowledge_base is not None and self.knowledge_base.loaded,
+        }
+
+class KnowledgeManager:
+    """Keeps clinic.json and the hospital PDF current without a restart.
+
+    `current` holds an immutable KnowledgeSnapshot. Readers take the reference once per request and
+    never lock; a reload builds a new snapshot off to the side and replaces the reference in a single
+    assignment, so in-flight requests finish on the generation they started with. A background thread
+    compares the files' mtime and size every `interval` seconds and, when one changed, its SHA-256: only
+    a source whose content changed is rebuilt, the other is carried over. A clinic.json that fails to
+    parse (e.g. mid-edit) keeps the previous snapshot. Listeners are called with each new snapshot.
+    """
+
+    def __init__(self, clinic_path, pdf_path=None, cache_dir=".kb_cache", interval=5.0):
+        self.clinic_path = clinic_path
+        self.pdf_path = pdf_path
+        self.cache_dir = cache_dir
+        self.interval = interval
+        self.listeners = []
+        self.reload_lock = threading.Lock()
+        self.signatures = {}
+        self.current = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _build_clinic(self):
+        with open(self.clinic_path, "rb") as f:
+            raw = f.read()
+        return ClinicIndex(json.loads(raw)), hashlib.sha256(raw).hexdigest()
+
+    def _build_pdf(self, warm):
+        if not self.pdf_path or not os.path.exists(self.pdf_path):
+            return None, None
+        digest = file_digest(self.pdf_path)
+        if self.current is not None and digest == self.current.pdf_digest:
+            return self.current.knowledge_base, digest
+        knowledge_base = KnowledgeBase(self.pdf_path, cache_dir=self.cache_dir, digest=digest)
+        if warm:
+            knowledge_base.index  # parse (or read the cache) and index before readers can see it
+        return knowledge_base, digest
+
+    def load(self):
+        """Builds the first snapshot; the PDF itself is still read lazily on first use."""
+        self.check(warm=False)
+        return self.current
+
+    def check(self, warm=True):
+        """Rebuilds whatever changed since the last check; returns True when a new snapshot was swapped in."""
+        with self.reload_lock:
+            previous = self.current
+            signatures = {path: file_signature(path) for path in (self.clinic_path, self.pdf_path) if path}
+            if previous is not None and signatures == self.signatures:
+                return False
+            changed = {path for path in signatures if previous is None or signatures[path] != self.signatures.get(path)}
+            self.signatures = signatures
+
+            clinic_index, clinic_digest = (previous.clinic_index, previous.clinic_digest) if previous else (ClinicIndex({}), None)
+            if self.clinic_path in changed:
+                try:
+                    clinic_index, clinic_digest = self._build_clinic()
+                except Exception as e:
+                    print(f"[knowledge] could not reload {self.clinic_path}, keeping the previous version: {e}" if previous
+                          else f"Error loading clinic index: {e}")
+            knowledge_base, pdf_digest = (previous.knowledge_base, previous.pdf_digest) if previous else (None, None)
+            if previous is None or self.pdf_path in changed:
+                try:
+                    knowledge_base, pdf_digest = self._build_pdf(warm)
+                except OSError as e:
+                    print(f"Error loading PDF: {e}")
+
+            if previous is not None:
+                if clinic_digest == previous.clinic_digest:
+                    clinic_index = previous.clinic_index
+                if (clinic_digest, pdf_digest) == (previous.clinic_digest, previous.pdf_digest):
+                    return False
+            snapshot = KnowledgeSnapshot(previous.generation + 1 if previous else 1,
+                                         clinic_index, clinic_digest, knowledge_base, pdf_digest)
+            self.current = snapshot
+        if previous is not None:
+            print(f"[knowledge] reloaded: version {previous.version} -> {snapshot.version}")
+        for listener in self.listeners:
+            try:
+                listener(snapshot)
+            except Exception as e:
+                print(f"[knowledge] listener failed: {e}")
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                print(f"[knowledge] watcher error: {e}")
+
+    def start(self):
+        if self._thread is None and self.interval > 0:
+            self._thread = threading.Thread(target=self._run, name="knowledge-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,185 @@
+import contextvars
+import random
+import threading
+import time
+
+from telemetry import count, span
+
+RETRYABLE_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a model whose circuit breaker is open."""
+
+class DeadlineExceeded(TimeoutError):
+    """The call's overall time budget ran out before the model answered."""
+
+def error_status(error):
+    """HTTP status of a Groq/OpenAI-style API error, else None."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+def is_retryable(error):
+    status = error_status(error)
+    if status is not None:
+        return status in RETRYABLE_STATUSES
+    name = type(error).__name__
+    return isinstance(error, (TimeoutError, ConnectionError)) or "Timeout" in name or "Connection" in name
+
+def retry_after(error):
+    """Seconds from a Retry-After header on a 429/503, if the server sent one."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive retryable failures; after `reset_timeout` seconds one
+    trial call is let through (half-open) and its outcome closes or re-opens the circuit."""
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    @property
+    def state(self):
+        with self.lock:
+            if self.opened_at is None:
+                return "closed"
+            return "half_open" if time.monotonic() - self.opened_at >= self.reset_timeout else "open"
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_timeout and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.trial_in_flight or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    print(f"[llm] circuit '{self.name}' opened after {self.failures} failures")
+                self.opened_at = time.monotonic()
+            self.trial_in_flight = False
+
+    def release_trial(self):
+        """Ends a half-open trial whose outcome says nothing about the model's health, so another can run."""
+        with self.lock:
+            self.trial_in_flight = False
+
+class ResilientLLM:
+    """Wraps anything with .invoke() (a chat model or a prompt | model chain).
+
+    Each call gets up to `max_attempts` tries within an overall `deadline` in seconds, shared with the
+    fallback. 429/5xx and timeouts are retried after full-jitter exponential backoff (or the server's
+    Retry-After); other errors are raised at once. The primary's circuit breaker skips it entirely while
+    it is failing; if a fallback is configured, calls go there instead. Per-request timeouts belong on
+    the model itself (ChatGroq's `timeout`, passed here as `request_timeout`), so a hung connection also
+    counts as a retryable failure; an attempt with less of the deadline left than that is abandoned
+    when the deadline passes.
+    """
+
+    def __init__(self, primary, fallback=None, breaker=None, fallback_breaker=None, max_attempts=3,
+                 deadline=30.0, base_delay=0.5, max_delay=8.0, sleep=time.sleep, name="llm", request_timeout=None):
+        self.name = name
+        self.request_timeout = request_timeout
+        self.primary = primary
+        self.fallback = fallback
+        self.breaker = breaker or CircuitBreaker("primary")
+        self.fallback_breaker = fallback_breaker or CircuitBreaker("fallback")
+        self.max_attempts = max_attempts
+        self.deadline = deadline
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+        self.random = random.Random()
+
+    def _invoke(self, runnable, input, timeout, *args, **kwargs):
+        """runnable.invoke, abandoned after `timeout` seconds when that is shorter than the model's own timeout."""
+        if self.request_timeout is None or timeout >= self.request_timeout:
+            return runnable.invoke(input, *args, **kwargs)
+        outcome = {}
+        context = contextvars.copy_context()
+
+        def call():
+            try:
+                outcome["result"] = context.run(runnable.invoke, input, *args, **kwargs)
+            except BaseException as e:
+                outcome["error"] = e
+
+        # The abandoned request finishes on its own within the model's timeout
+        worker = threading.Thread(target=call, name=f"llm-{self.name}", daemon=True)
+        worker.start()
+        worker.join(timeout)
+        if worker.is_alive():
+            raise DeadlineExceeded(f"LLM call '{self.name}' ran past its {self.deadline:g} s deadline")
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome["result"]
+
+    def _attempts(self, runnable, breaker, input, deadline_at, *args, **kwargs):
+        last_error = None
+        for attempt in range(self.max_attempts):
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                raise last_error or DeadlineExceeded(f"LLM call '{self.name}' ran past its {self.deadline:g} s deadline")
+            if not breaker.allow():
+                raise last_error or CircuitOpenError(f"LLM circuit '{breaker.name}' is open")
+            try:
+                result = self._invoke(runnable, input, remaining, *args, **kwargs)
+            except DeadlineExceeded:
+                # Running out of budget is the caller's limit, not evidence that the model is failing
+                breaker.release_trial()
+                raise
+            except Exception as e:
+                if not is_retryable(e):
+                    # A 4xx means the model is reachable; anything else leaves its health unknown
+                    if error_status(e) is not None:
+                        breaker.record_success()
+                    else:
+                        breaker.release_trial()
+                    raise
+                breaker.record_failure()
+                last_error = e
+                delay = retry_after(e) or self.random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+                if attempt + 1 >= self.max_attempts or time.monotonic() + delay >= deadline_at:
+                    break
+                count("retries")
+                self.sleep(delay)
+                continue
+            breaker.record_success()
+            return result
+        raise last_error
+
+    def invoke(self, input, *args, **kwargs):
+        with span(f"llm.{self.name}") as current:
+            deadline_at = time.monotonic() + self.deadline
+            try:
+                result = self._attempts(self.primary, self.breaker, input, deadline_at, *args, **kwargs)
+            except Exception as e:
+                if self.fallback is None or isinstance(e, DeadlineExceeded) or not (isinstance(e, CircuitOpenError) or is_retryable(e)):
+                    raise
+                print(f"[llm] primary unavailable ({type(e).__name__}: {e}); using fallback model")
+                current.set(fallback=True)
+                # The fallback gets whatever is left of the same deadline
+                result = self._attempts(self.fallback, self.fallback_breaker, input, deadline_at, *args, **kwargs)
+            usage = getattr(result, "usage_metadata", None) or {}
+            current.set(prompt_tokens=usage.get("input_tokens", 0), completion_tokens=usage.get("output_tokens", 0))
+            return result
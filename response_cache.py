@@ -0,0 +1,235 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from retrieval import TOKEN_RE
+
+# Normalize query text so differences in case, punctuation and spacing share one cache key. Word order
+# and repeats are kept: "no fever but cough" and "fever but no cough" are different questions.
+def normalize_query(text):
+    return " ".join(TOKEN_RE.findall(text.lower()))
+
+# Cheap version string for the files a cached answer was derived from
+def source_fingerprint(paths):
+    parts = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            parts.append(f"{stat.st_mtime_ns}-{stat.st_size}")
+        except OSError:
+            parts.append("missing")
+    return format(zlib.crc32("|".join(parts).encode()), "08x")
+
+# Unit-length vector of hashed character trigrams for near-duplicate lookups
+def ngram_vector(text, dims=256, n=3):
+    padded = f" {text} "
+    vector = [0.0] * dims
+    for i in range(len(padded) - n + 1):
+        vector[zlib.crc32(padded[i:i + n].encode()) % dims] += 1.0
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return [value / norm for value in vector]
+
+class MemoryStore:
+    """In-process LRU store bounded by entry count and total value size."""
+
+    def __init__(self, max_entries=1000, max_bytes=5_000_000):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        self.entries.move_to_end(key)
+        return entry[0], entry[1]
+
+    def set(self, key, value, expires_at):
+        self.delete(key)
+        size = len(key) + len(value.encode("utf-8"))
+        self.entries[key] = (value, expires_at, size)
+        self.total_bytes += size
+        return self._evict()
+
+    def delete(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry[2]
+
+    def keys(self):
+        return list(self.entries)
+
+    def clear(self):
+        self.entries.clear()
+        self.total_bytes = 0
+
+    def _evict(self):
+        evicted = []
+        while self.entries and (len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes):
+            key, entry = self.entries.popitem(last=False)
+            self.total_bytes -= entry[2]
+            evicted.append(key)
+        return evicted
+
+class SQLiteStore:
+    """SQLite-backed store so cached answers survive restarts; LRU by last access time."""
+
+    def __init__(self, path="response_cache.db", max_entries=10000, max_bytes=50_000_000):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute('''CREATE TABLE IF NOT EXISTS response_cache (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            expires_at REAL NOT NULL,
+            last_access REAL NOT NULL,
+            size INTEGER NOT NULL
+        )''')
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_response_cache_last_access ON response_cache (last_access)")
+        self.conn.commit()
+
+    def get(self, key):
+        row = self.conn.execute("SELECT value, expires_at FROM response_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        self.conn.execute("UPDATE response_cache SET last_access = ? WHERE key = ?", (time.time(), key))
+        self.conn.commit()
+        return row[0], row[1]
+
+    def set(self, key, value, expires_at):
+        size = len(key) + len(value.encode("utf-8"))
+        self.conn.execute(
+            "INSERT OR REPLACE INTO response_cache (key, value, expires_at, last_access, size) VALUES (?, ?, ?, ?, ?)",
+            (key, value, expires_at, time.time(), size))
+        evicted = self._evict()
+        self.conn.commit()
+        return evicted
+
+    def delete(self, key):
+        self.conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+        self.conn.commit()
+
+    def keys(self):
+        return [row[0] for row in self.conn.execute("SELECT key FROM response_cache")]
+
+    def clear(self):
+        self.conn.execute("DELETE FROM response_cache")
+        self.conn.commit()
+
+    def _evict(self):
+        count, total = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM response_cache").fetchone()
+        evicted = []
+        if count <= self.max_entries and total <= self.max_bytes:
+            return evicted
+        for key, size in self.conn.execute("SELECT key, size FROM response_cache ORDER BY last_access").fetchall():
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            evicted.append(key)
+            count -= 1
+            total -= size
+        self.conn.executemany("DELETE FROM response_cache WHERE key = ?", [(key,) for key in evicted])
+        return evicted
+
+class ResponseCache:
+    """TTL cache for LLM tool answers, keyed on normalized query text and invalidated when source files change."""
+
+    def __init__(self, store, sources=(), ttl=3600, near_duplicate_threshold=0.0):
+        self.store = store
+        self.sources = list(sources)
+        self.ttl = ttl
+        self.near_duplicate_threshold = near_duplicate_threshold
+        self.lock = threading.Lock()
+        self.version = source_fingerprint(self.sources)
+        self.vectors = {}
+        self.stats = {"hits": 0, "near_hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+        if self.near_duplicate_threshold:
+            for key in self.store.keys():
+                if key.startswith(f"{self.version}|"):
+                    self.vectors[key] = ngram_vector(key.split("|", 2)[2])
+
+    def _check_sources(self):
+        version = source_fingerprint(self.sources)
+        if version != self.version:
+            self.version = version
+            self.store.clear()
+            self.vectors.clear()
+            self.stats["invalidations"] += 1
+
+    def _key(self, namespace, text):
+        return f"{self.version}|{namespace}|{normalize_query(text)}"
+
+    def _nearest(self, namespace, key):
+        vector = ngram_vector(key.split("|", 2)[2])
+        prefix = f"{self.version}|{namespace}|"
+        best_key, best_score = None, self.near_duplicate_threshold
+        for other, other_vector in self.vectors.items():
+            if other.startswith(prefix):
+                score = sum(a * b for a, b in zip(vector, other_vector))
+                if score >= best_score:
+                    best_key, best_score = other, score
+        return best_key
+
+    def get(self, namespace, text):
+        """Returns the cached answer for text, or None on a miss."""
+        with self.lock:
+            self._check_sources()
+            key = self._key(namespace, text)
+            entry = self.store.get(key)
+            near = False
+            if entry is None and self.near_duplicate_threshold:
+                nearest = self._nearest(namespace, key)
+                if nearest:
+                    key, entry, near = nearest, self.store.get(nearest), True
+            if entry is None:
+                self.vectors.pop(key, None)
+                self.stats["misses"] += 1
+                return None
+            value, expires_at = entry
+            if expires_at < time.time():
+                self.store.delete(key)
+                self.vectors.pop(key, None)
+                self.stats["expirations"] += 1
+                self.stats["misses"] += 1
+                return None
+            self.stats["near_hits" if near else "hits"] += 1
+            return value
+
+    def set(self, namespace, text, value):
+        with self.lock:
+            self._check_sources()
+            key = self._key(namespace, text)
+            evicted = self.store.set(key, value, time.time() + self.ttl)
+            if self.near_duplicate_threshold:
+                self.vectors[key] = ngram_vector(key.split("|", 2)[2])
+            for old_key in evicted:
+                self.vectors.pop(old_key, None)
+            self.stats["evictions"] += len(evicted)
+
+    def clear(self):
+        with self.lock:
+            self.store.clear()
+            self.vectors.clear()
+
+# Build the cache selected by environment settings; returns None when caching is off
+def create_response_cache(sources):
+    backend = os.getenv("RESPONSE_CACHE", "memory").lower()
+    if backend == "off":
+        return None
+    max_entries = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+    max_bytes = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", "5000000"))
+    if backend == "sqlite":
+        store = SQLiteStore(os.getenv("RESPONSE_CACHE_PATH", "response_cache.db"), max_entries, max_bytes)
+    else:
+        store = MemoryStore(max_entries, max_bytes)
+    return ResponseCache(
+        store,
+        sources=sources,
+        ttl=int(os.getenv("RESPONSE_CACHE_TTL", "3600")),
+        near_duplicate_threshold=float(os.getenv("RESPONSE_CACHE_NEAR_DUPLICATE", "0")),
+    )
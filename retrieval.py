@@ -0,0 +1,83 @@
+import math
+import re
+from collections import Counter, defaultdict
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Words that carry no signal for matching hospital/medical questions
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from",
+    "have", "i", "in", "is", "it", "me", "my", "of", "on", "or", "that", "the", "this",
+    "to", "what", "which", "who", "with", "you", "your", "am", "has", "been", "any",
+}
+
+def tokenize(text):
+    return [tok for tok in TOKEN_RE.findall(text.lower()) if tok not in STOPWORDS]
+
+# Split extracted PDF text into overlapping chunks of whole lines
+def chunk_text(text, chunk_size=800, overlap=150):
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    chunks = []
+    current = []
+    current_len = 0
+    for line in lines:
+        if current and current_len + len(line) > chunk_size:
+            chunks.append("\n".join(current))
+            # Carry trailing lines over so facts split across a boundary stay retrievable
+            carried = []
+            carried_len = 0
+            for prev in reversed(current):
+                if carried_len + len(prev) > overlap:
+                    break
+                carried.insert(0, prev)
+                carried_len += len(prev)
+            current = carried
+            current_len = carried_len
+        current.append(line)
+        current_len += len(line)
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+class BM25Index:
+    """Okapi BM25 over a list of text chunks, backed by an inverted index."""
+
+    def __init__(self, chunks, k1=1.5, b=0.75):
+        self.chunks = list(chunks)
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(list)
+        self.doc_lengths = []
+        for doc_id, chunk in enumerate(self.chunks):
+            counts = Counter(tokenize(chunk))
+            self.doc_lengths.append(sum(counts.values()))
+            for term, freq in counts.items():
+                self.postings[term].append((doc_id, freq))
+        n_docs = len(self.chunks)
+        self.avg_length = (sum(self.doc_lengths) / n_docs) if n_docs else 0.0
+        self.idf = {
+            term: math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    def search(self, query, top_k=4):
+        """Returns up to top_k (score, chunk) pairs, best first."""
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_id, freq in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / self.avg_length)
+                scores[doc_id] += idf * freq * (self.k1 + 1) / (freq + norm)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        # Keep document order so the LLM reads chunks the way they appear in the PDF
+        ranked.sort(key=lambda item: item[0])
+        return [(score, self.chunks[doc_id]) for doc_id, score in ranked]
+
+    def context_for(self, query, top_k=4):
+        """Returns the top_k chunks joined for a prompt, or None when nothing matches."""
+        hits = self.search(query, top_k)
+        if not hits:
+            return None
+        return "\n---\n".join(chunk for _, chunk in hits)
@@ -0,0 +1,95 @@
+import asyncio
+import threading
+
+from telemetry import annotate
+
+class SingleFlight:
+    """Registry of calls in progress, so concurrent identical requests share one upstream call.
+
+    The first caller for a key (the leader) runs the call; callers arriving with the same key while it
+    runs wait for it and get its result, or its exception re-raised. A waiter that gives up after
+    `timeout` seconds gets a TimeoutError; the leader's call carries on for the others. `do` is for
+    threads and `do_async` for coroutines on an event loop; the two keep separate registries, since a
+    thread can't await a future on another thread's loop.
+    """
+
+    def __init__(self, timeout=30.0):
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.async_calls = {}
+        self.stats = {"calls": 0, "joined": 0, "timeouts": 0, "errors": 0}
+
+    def _count(self, stat):
+        with self.lock:
+            self.stats[stat] += 1
+
+    def do(self, key, fn, timeout=None):
+        """Returns fn(), sharing one call among threads that ask for the same key at the same time."""
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = {"done": threading.Event(), "result": None, "error": None}
+        if not leader:
+            return self._join(key, call, timeout)
+
+        self._count("calls")
+        try:
+            call["result"] = fn()
+            return call["result"]
+        except BaseException as e:
+            call["error"] = e
+            self._count("errors")
+            raise
+        finally:
+            with self.lock:
+                self.calls.pop(key, None)
+            call["done"].set()
+
+    def _join(self, key, call, timeout):
+        self._count("joined")
+        annotate(single_flight="joined")
+        timeout = self.timeout if timeout is None else timeout
+        if not call["done"].wait(timeout):
+            self._count("timeouts")
+            raise TimeoutError(f"Shared call for {key!r} did not finish within {timeout} s")
+        if call["error"] is not None:
+            raise call["error"]
+        return call["result"]
+
+    async def do_async(self, key, fn, timeout=None):
+        """Awaits fn(), sharing one call among tasks on the same event loop that ask for the same key.
+
+        The leader's call is cancelled after `timeout` seconds, and every waiter gets the TimeoutError.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+        future = self.async_calls.get((loop, key))
+        if future is not None:
+            self._count("joined")
+            annotate(single_flight="joined")
+            try:
+                # shield: one waiter timing out or being cancelled must not cancel the shared call
+                return await asyncio.wait_for(asyncio.shield(future), timeout)
+            except asyncio.TimeoutError:
+                self._count("timeouts")
+                raise
+
+        future = self.async_calls[(loop, key)] = loop.create_future()
+        self._count("calls")
+        try:
+            result = await asyncio.wait_for(fn(), timeout)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            self._count("timeouts" if isinstance(e, asyncio.TimeoutError) else "errors")
+            future.set_exception(e)
+            # Marks the exception as retrieved when no one else was waiting for it
+            future.exception()
+            raise
+        finally:
+            self.async_calls.pop((loop, key), None)
@@ -0,0 +1,288 @@
+import contextvars
+import glob
+import inspect
+import json
+import os
+import queue
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+class Metrics:
+    """Counters and histograms rendered in the Prometheus text format; `collectors` are called at
+    scrape time for gauges (queue lengths, outbox counts) as (name, labels dict, value) tuples.
+
+    With `directory` (one per deployment, shared by its worker processes), each process writes its
+    counters and histograms there every `flush_interval` seconds and render() sums every process's
+    file, so a scrape through any worker sees the whole deployment. Gauges stay per process.
+    """
+
+    def __init__(self, prefix="mediease_", buckets=DURATION_BUCKETS, directory=None, flush_interval=5.0):
+        self.prefix = prefix
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.collectors = []
+        self.directory = None
+        self.path = None
+        self.flush_interval = flush_interval
+        self.stop_event = threading.Event()
+        if directory:
+            self.share(directory)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            histogram[0][bisect_left(self.buckets, value)] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def share(self, directory):
+        """Starts publishing this process's metrics to `directory` and aggregating from it."""
+        os.makedirs(directory, exist_ok=True)
+        # pid plus start time: a later process reusing the pid must not overwrite (and shrink) these totals
+        self.directory = directory
+        self.path = os.path.join(directory, f"metrics-{os.getpid()}-{time.time_ns()}.json")
+        self.flush()
+        threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True).start()
+
+    def _snapshot(self):
+        with self.lock:
+            return {
+                "counters": [[name, labels, value] for (name, labels), value in self.counters.items()],
+                "histograms": [[name, labels, list(counts), total, count]
+                               for (name, labels), (counts, total, count) in self.histograms.items()],
+            }
+
+    def flush(self):
+        # The flush thread and a scrape can flush at once; each writes its own temporary file
+        temporary = f"{self.path}.{threading.get_ident()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(self._snapshot(), f)
+        os.replace(temporary, self.path)
+
+    def _flush_loop(self):
+        while not self.stop_event.wait(self.flush_interval):
+            try:
+                self.flush()
+            except OSError as e:
+                print(f"[telemetry] metrics flush failed: {e}")
+
+    def stop(self):
+        """Stops the flush thread after a last flush, so the totals this process counted are kept."""
+        self.stop_event.set()
+        if self.directory:
+            self.flush()
+
+    def _totals(self):
+        """(counters, histograms) for this process, or summed over every process sharing the directory."""
+        if not self.directory:
+            with self.lock:
+                return dict(self.counters), {key: (list(counts), total, count)
+                                             for key, (counts, total, count) in self.histograms.items()}
+        self.flush()
+        counters, histograms = {}, {}
+        for path in glob.glob(os.path.join(self.directory, "metrics-*.json")):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for name, labels, value in snapshot["counters"]:
+                key = (name, tuple(tuple(pair) for pair in labels))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, counts, total, count in snapshot["histograms"]:
+                key = (name, tuple(tuple(pair) for pair in labels))
+                merged = histograms.setdefault(key, ([0] * len(counts), 0.0, 0))
+                histograms[key] = ([a + b for a, b in zip(merged[0], counts)], merged[1] + total, merged[2] + count)
+        return counters, histograms
+
+    def render(self):
+        lines = []
+        counters, histograms = self._totals()
+        counters = sorted(counters.items())
+        histograms = sorted(histograms.items())
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {self.prefix}{name} counter")
+            lines.append(f"{self.prefix}{name}{_label_text(labels)} {value}")
+        for (name, labels), (counts, total, count) in histograms:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {self.prefix}{name} histogram")
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.prefix}{name}_bucket{_label_text(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{self.prefix}{name}_sum{_label_text(labels)} {total:.6f}")
+            lines.append(f"{self.prefix}{name}_count{_label_text(labels)} {count}")
+        for collector in self.collectors:
+            try:
+                gauges = list(collector())
+            except Exception as e:
+                print(f"[telemetry] metrics collector failed: {e}")
+                continue
+            for name, labels, value in gauges:
+                if name not in typed:
+                    typed.add(name)
+                    lines.append(f"# TYPE {self.prefix}{name} gauge")
+                lines.append(f"{self.prefix}{name}{_label_text(tuple(sorted(labels.items())))} {value}")
+        return "\n".join(lines) + "\n"
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "started_at", "attributes", "status")
+
+    def __init__(self, name, trace_id, span_id, parent_id, attributes):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.status = "ok"
+        self.started_at = time.time()
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def add(self, name, value=1):
+        self.attributes[name] = self.attributes.get(name, 0) + value
+
+class SpanWriter:
+    """Appends finished spans to a JSONL file from a background thread; drops spans when it falls behind."""
+
+    def __init__(self, path, max_pending=10000):
+        self.path = path
+        self.pending = queue.Queue(maxsize=max_pending)
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name="span-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, record):
+        try:
+            self.pending.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                records = [self.pending.get()]
+                while len(records) < 500:
+                    try:
+                        records.append(self.pending.get_nowait())
+                    except queue.Empty:
+                        break
+                f.write("".join(json.dumps(record, default=str) + "\n" for record in records))
+                f.flush()
+
+class Tracer:
+    """Spans for graph nodes, tool calls, LLM calls and Calendar batches.
+
+    A span's parent is whatever span is open in the current context (contextvars, so it follows the
+    tool pool's copied contexts). Every finished span feeds `span_duration_seconds{span}` and, from
+    well-known attributes, the token, retry and cache counters; with a spans path it is also written
+    as one JSON line. Costs a few microseconds per span.
+    """
+
+    def __init__(self, metrics=None):
+        self.metrics = metrics or Metrics()
+        self.writer = None
+        self.current = contextvars.ContextVar("current_span", default=None)
+
+    def configure(self, spans_path=None, metrics_dir=None):
+        if spans_path and self.writer is None:
+            self.writer = SpanWriter(spans_path)
+        if metrics_dir and self.metrics.directory is None:
+            self.metrics.share(metrics_dir)
+        return self
+
+    @contextmanager
+    def span(self, name, **attributes):
+        parent = self.current.get()
+        span = Span(name, parent.trace_id if parent else f"{random.getrandbits(64):016x}",
+                    f"{random.getrandbits(32):08x}", parent.span_id if parent else None, attributes)
+        token = self.current.set(span)
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.attributes.setdefault("error", type(e).__name__)
+            raise
+        finally:
+            self.current.reset(token)
+            self._finish(span, time.perf_counter() - started)
+
+    def annotate(self, **attributes):
+        """Sets attributes on the innermost open span, if any."""
+        span = self.current.get()
+        if span is not None:
+            span.attributes.update(attributes)
+
+    def count(self, name, value=1):
+        """Adds to a numeric attribute of the innermost open span, if any."""
+        span = self.current.get()
+        if span is not None:
+            span.add(name, value)
+
+    def _finish(self, span, duration):
+        metrics = self.metrics
+        metrics.observe("span_duration_seconds", duration, span=span.name)
+        attributes = span.attributes
+        if span.status != "ok":
+            metrics.inc("span_errors_total", span=span.name)
+        for kind in ("prompt", "completion"):
+            tokens = attributes.get(f"{kind}_tokens")
+            if tokens:
+                metrics.inc("llm_tokens_total", tokens, span=span.name, type=kind)
+        if attributes.get("retries"):
+            metrics.inc("llm_retries_total", attributes["retries"], span=span.name)
+        if "cache" in attributes:
+            metrics.inc("cache_lookups_total", span=span.name, result=attributes["cache"])
+        if self.writer is not None:
+            self.writer.write({"trace_id": span.trace_id, "span_id": span.span_id, "parent_id": span.parent_id,
+                               "name": span.name, "start": span.started_at, "duration_ms": round(duration * 1000, 3),
+                               "status": span.status, **attributes})
+
+class TracedNode:
+    """Wraps a LangGraph node so each run is a `node.<name>` span; passes `config` through when the node takes it."""
+
+    def __init__(self, name, node, tracer):
+        self.name = f"node.{name}"
+        self.node = node
+        self.tracer = tracer
+        self.takes_config = "config" in inspect.signature(node).parameters
+
+    def __call__(self, state, config):
+        with self.tracer.span(self.name):
+            return self.node(state, config) if self.takes_config else self.node(state)
+
+# Process-wide tracer; app1 points it at a spans file and serves its metrics on /metrics
+tracer = Tracer()
+span = tracer.span
+annotate = tracer.annotate
+count = tracer.count
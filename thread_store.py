@@ -0,0 +1,80 @@
+import sqlite3
+import threading
+import time
+
+class ThreadStore:
+    """Registry of live conversation thread ids shared by every worker through SQLite, with idle expiry."""
+
+    def __init__(self, path="checkpoints.db", ttl=86400):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA busy_timeout=30000")
+        self.conn.execute('''CREATE TABLE IF NOT EXISTS conversation_threads (
+            thread_id TEXT PRIMARY KEY,
+            created_at REAL NOT NULL,
+            last_seen REAL NOT NULL
+        )''')
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_conversation_threads_last_seen ON conversation_threads (last_seen)")
+        self.conn.commit()
+        self._stop = threading.Event()
+        self._purger = None
+
+    def register(self, thread_id):
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO conversation_threads (thread_id, created_at, last_seen) VALUES (?, ?, ?)",
+                (thread_id, now, now))
+            self.conn.commit()
+
+    def touch(self, thread_id):
+        """Marks a live thread as active; returns False if it is unknown or has expired."""
+        now = time.time()
+        with self.lock:
+            updated = self.conn.execute(
+                "UPDATE conversation_threads SET last_seen = ? WHERE thread_id = ? AND last_seen >= ?",
+                (now, thread_id, now - self.ttl)).rowcount
+            self.conn.commit()
+        return updated == 1
+
+    def remove(self, thread_id):
+        with self.lock:
+            self.conn.execute("DELETE FROM conversation_threads WHERE thread_id = ?", (thread_id,))
+            self.conn.commit()
+
+    def purge_expired(self):
+        """Deletes threads idle for longer than the TTL and returns the ids this process deleted.
+
+        Every worker purges the same table; a thread another worker already removed, or that was
+        touched since the SELECT, is not deleted here and not returned, so it is expired only once.
+        """
+        cutoff = time.time() - self.ttl
+        with self.lock:
+            candidates = [row[0] for row in self.conn.execute(
+                "SELECT thread_id FROM conversation_threads WHERE last_seen < ?", (cutoff,))]
+            expired = [
+                thread_id for thread_id in candidates
+                if self.conn.execute("DELETE FROM conversation_threads WHERE thread_id = ? AND last_seen < ?",
+                                     (thread_id, cutoff)).rowcount == 1
+            ]
+            self.conn.commit()
+        return expired
+
+    def start_purging(self, interval=600, on_expire=None):
+        if self._purger is not None:
+            return
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    for thread_id in self.purge_expired():
+                        if on_expire:
+                            on_expire(thread_id)
+                except Exception as e:
+                    print(f"Error purging expired threads: {str(e)}")
+        self._purger = threading.Thread(target=run, name="thread-purge", daemon=True)
+        self._purger.start()
+
+    def stop_purging(self):
+        self._stop.set()
@@ -0,0 +1,64 @@
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import ToolMessage
+
+from telemetry import span
+
+class ParallelToolNode:
+    """Graph node that runs the tool calls of the last AI message, in place of LangGraph's ToolNode.
+
+    Read-only calls (symptom analysis, hospital info, search, availability) run concurrently on a shared,
+    bounded thread pool. Calls to `ordered_tools` (bookings, updates, cancellations) run one after another
+    in the order the model issued them, holding a lock for the conversation thread so two requests on the
+    same thread cannot interleave their writes. ToolMessages are returned in call order.
+    """
+
+    def __init__(self, tools, ordered_tools=(), max_workers=4, lock_stripes=64):
+        self.tools = {tool.name: tool for tool in tools}
+        self.ordered_tools = set(ordered_tools)
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tools")
+        self.write_locks = [threading.Lock() for _ in range(lock_stripes)]
+
+    def _write_lock(self, config):
+        thread_id = config.get("configurable", {}).get("thread_id")
+        return self.write_locks[hash(thread_id) % len(self.write_locks)]
+
+    def _run_one(self, call, config):
+        tool = self.tools.get(call["name"])
+        # Unknown names (model mistakes) share one span name to keep metric labels bounded
+        with span(f"tool.{call['name'] if tool else 'unknown'}") as current:
+            if tool is None:
+                current.status = "error"
+                return ToolMessage(content=f"Error: {call['name']} is not a valid tool, try one of [{', '.join(self.tools)}].",
+                                   name=call["name"], tool_call_id=call["id"], status="error")
+            try:
+                return tool.invoke({**call, "type": "tool_call"}, config)
+            except Exception as e:
+                current.status = "error"
+                current.set(error=type(e).__name__)
+                return ToolMessage(content=f"Error: {repr(e)}\n Please fix your mistakes.",
+                                   name=call["name"], tool_call_id=call["id"], status="error")
+
+    def _submit(self, call, config):
+        # Copy the context so callbacks (e.g. /chat/stream's message stream) and tracing spans still see the graph run
+        context = contextvars.copy_context()
+        return self.pool.submit(context.run, self._run_one, call, config)
+
+    def __call__(self, state, config):
+        calls = state["messages"][-1].tool_calls
+        ordered = [n for n, call in enumerate(calls) if call["name"] in self.ordered_tools]
+        parallel = [n for n, call in enumerate(calls) if call["name"] not in self.ordered_tools]
+        results = {}
+        if len(parallel) == 1 and not ordered:
+            results[parallel[0]] = self._run_one(calls[parallel[0]], config)
+        else:
+            futures = {n: self._submit(calls[n], config) for n in parallel}
+            if ordered:
+                with self._write_lock(config):
+                    for n in ordered:
+                        results[n] = self._run_one(calls[n], config)
+            for n, future in futures.items():
+                results[n] = future.result()
+        return {"messages": [results[n] for n in range(len(calls))]}
@@ -0,0 +1,146 @@
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from response_cache import normalize_query
+from retrieval import tokenize
+from single_flight import SingleFlight
+from telemetry import annotate
+
+# Questions about what is happening now always go to the web, even when the local data mentions the topic
+TIME_SENSITIVE = re.compile(r"\b(news|latest|today|current|currently|recent|recently|outbreak|this (week|month|year))\b", re.IGNORECASE)
+
+class RateLimited(Exception):
+    def __init__(self, scope, retry_after):
+        super().__init__(f"{scope} web search limit reached")
+        self.scope = scope
+        self.retry_after = retry_after
+
+class TokenBucket:
+    """`rate_per_minute` searches on average, with bursts of up to `burst`."""
+
+    def __init__(self, rate_per_minute, burst, clock=time.monotonic):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.clock = clock
+        self.tokens = float(burst)
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self):
+        """Seconds until a token is available (0 when one is available now)."""
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+class SearchRateLimiter:
+    """A global bucket for the search API quota plus one bucket per conversation thread, so one chat
+    can't spend the whole quota. Idle thread buckets beyond `max_threads` are dropped, oldest first."""
+
+    def __init__(self, global_per_minute=30, thread_per_minute=4, burst=None, max_threads=10000, clock=time.monotonic):
+        self.global_bucket = TokenBucket(global_per_minute, burst or max(1, global_per_minute // 4), clock)
+        self.thread_per_minute = thread_per_minute
+        self.thread_burst = max(1, min(thread_per_minute, 2))
+        self.max_threads = max_threads
+        self.clock = clock
+        self.threads = OrderedDict()
+        self.lock = threading.Lock()
+
+    def acquire(self, thread_id):
+        """Takes one search from both budgets, or raises RateLimited without taking either."""
+        with self.lock:
+            bucket = self.threads.get(thread_id)
+            if bucket is None:
+                bucket = self.threads[thread_id] = TokenBucket(self.thread_per_minute, self.thread_burst, self.clock)
+                while len(self.threads) > self.max_threads:
+                    self.threads.popitem(last=False)
+            else:
+                self.threads.move_to_end(thread_id)
+            thread_wait = bucket.wait_time()
+            if thread_wait:
+                raise RateLimited("per-conversation", thread_wait)
+            global_wait = self.global_bucket.wait_time()
+            if global_wait:
+                raise RateLimited("global", global_wait)
+            bucket.take()
+            self.global_bucket.take()
+
+def local_hit(index, query, min_coverage=0.75):
+    """Best BM25 chunk for query when it contains at least `min_coverage` of the query's terms, else None."""
+    terms = set(tokenize(query))
+    if index is None or not terms:
+        return None
+    hits = index.search(query, top_k=1)
+    if not hits:
+        return None
+    chunk_terms = set(tokenize(hits[0][1]))
+    return hits[0][1] if len(terms & chunk_terms) / len(terms) >= min_coverage else None
+
+class WebSearch:
+    """Web search for the assistant's `tavily_search_results_json` tool.
+
+    In order: questions the hospital's own data answers (`local_answer`) never reach the web; results
+    are cached by normalized query; a search already running for the same query is joined rather than
+    repeated; and new searches are rate limited per conversation and globally. The backend (Tavily)
+    is built by `backend_factory` on first use.
+    """
+
+    def __init__(self, backend_factory, cache=None, limiter=None, local_answer=None, wait_timeout=30.0):
+        self.backend_factory = backend_factory
+        self.backend = None
+        self.cache = cache
+        self.limiter = limiter
+        self.local_answer = local_answer
+        self.lock = threading.Lock()
+        self.flights = SingleFlight(wait_timeout)
+        self.stats = {"local": 0, "cache_hits": 0, "searches": 0, "rate_limited": 0}
+
+    def _count(self, stat):
+        with self.lock:
+            self.stats[stat] += 1
+
+    def _backend(self):
+        if self.backend is None:
+            with self.lock:
+                if self.backend is None:
+                    self.backend = self.backend_factory()
+        return self.backend
+
+    def search(self, query, thread_id=None):
+        if self.local_answer and not TIME_SENSITIVE.search(query):
+            answer = self.local_answer(query)
+            if answer:
+                self._count("local")
+                annotate(cache="local")
+                return f"From Sunrise Medical Center's own information (no web search needed):\n{answer}"
+        cached = self.cache.get("web_search", query) if self.cache else None
+        annotate(cache="hit" if cached else "miss")
+        if cached:
+            self._count("cache_hits")
+            return cached
+
+        return self.flights.do(normalize_query(query), lambda: self._fetch(query, thread_id))
+
+    def _fetch(self, query, thread_id):
+        try:
+            if self.limiter:
+                self.limiter.acquire(thread_id)
+        except RateLimited as e:
+            self._count("rate_limited")
+            annotate(rate_limited=e.scope)
+            return (f"Web search is not available right now ({e}; try again in {e.retry_after:.0f} s). "
+                    "Answer from the hospital information or general knowledge instead.")
+        self._count("searches")
+        results = self._backend().invoke({"query": query})
+        result = results if isinstance(results, str) else json.dumps(results)
+        if self.cache:
+            self.cache.set("web_search", query, result)
+        return result
@@ -104,28 +104,21 @@
 #         response = agent.run(user_input)
 #         print(f"Chatbot: {response}")
 
-import json
 from langchain.chat_models import AzureChatOpenAI
 from langchain.tools import Tool
 from langchain.agents import initialize_agent, AgentType
 from langchain.schema import SystemMessage, HumanMessage
 import os
 from dotenv import load_dotenv
+from knowledge import KnowledgeManager
 
 load_dotenv()
 
-# Load JSON data from file
-def load_json_data(file_path):
-    try:
-        with open(file_path, "r", encoding="utf-8") as file:
-            return json.load(file)
-    except Exception as e:
-        print(f"Error loading JSON: {e}")
-        return {}
-
-# Load clinic.json dynamically
+# Load clinic.json dynamically; it is reloaded in the background whenever the file changes
 json_file_path = "clinic.json"
-medical_data = load_json_data(json_file_path)
+knowledge = KnowledgeManager(json_file_path, interval=float(os.getenv("KNOWLEDGE_RELOAD_INTERVAL", "5")))
+knowledge.load()
+knowledge.start()
 
 # Initializing Azure Chat Model
 llm = AzureChatOpenAI(
@@ -138,11 +131,8 @@ llm = AzureChatOpenAI(
 # Function to analyze symptoms and suggest relevant departments
 def respond_to_symptoms(user_input: str) -> str:
     """Generates a medical response based on symptoms using JSON data."""
-    matching_departments = []
-    
-    for department, symptoms in medical_data.get("common_symptoms", {}).items():
-        if any(symptom.lower() in user_input.lower() for symptom in symptoms):
-            matching_departments.append(department)
+    matches = knowledge.current.clinic_index.symptom_matcher.match(user_input)
+    matching_departments = [match["department"] for match in matches]
 
     if not matching_departments:
         return "No matching department found for the given symptoms."
@@ -162,7 +152,13 @@ def respond_to_symptoms(user_input: str) -> str:
 # Function to fetch doctor details from JSON
 def get_hospital_info(query: str) -> str:
     """Fetches hospital-related information using JSON data."""
-    relevant_doctors = [doc for doc in medical_data.get("doctors", []) if query.lower() in doc["specialty"].lower()]
+    # Lookups the structured index answers fully are templated without an LLM round-trip
+    clinic_index = knowledge.current.clinic_index
+    answer = clinic_index.answer(query)
+    if answer:
+        return answer
+
+    relevant_doctors = [doc for doc in clinic_index.data.get("doctors", []) if query.lower() in doc["specialty"].lower()]
 
     if not relevant_doctors:
         return "No doctors found for the requested department."